@@ -23,6 +23,27 @@ import typing
 DIR_KEY: str = 'save_dir'
 FILE_KEY: str = 'file_name'
 DARK_KEY: str = 'dark_mode'
+SIMPLIFY_KEY: str = 'simplify_tolerance'
+MIN_MOVE_KEY: str = 'min_move_distance'
+COMPRESS_KEY: str = 'compress_moves'
+TILE_SIZE_KEY: str = 'tile_size'
+TILE_THREADS_KEY: str = 'tile_threads'
+HISTORY_KEY: str = 'history_budget'
+HISTORY_DEPTH_KEY: str = 'history_depth'
+FLATTEN_LINES_KEY: str = 'flatten_lines'
+FLATTEN_POINTS_KEY: str = 'flatten_points'
+FLATTEN_BYTES_KEY: str = 'flatten_bytes'
+VARIABLE_WIDTH_KEY: str = 'variable_width'
+SMOOTH_KEY: str = 'smooth_lines'
+SMOOTH_SIMPLIFY_KEY: str = 'smooth_simplify_tolerance'
+REFINE_DELAY_KEY: str = 'refine_delay'
+FRAME_RATE_KEY: str = 'frame_rate'
+PREDICT_KEY: str = 'predict_time'
+EXPORT_IDLE_KEY: str = 'export_idle_delay'
+EXPORT_BYTES_KEY: str = 'export_max_bytes'
+EXPORT_PALETTE_KEY: str = 'export_palette'
+EXPORT_SCALE_KEY: str = 'export_scale'
+EXPORT_CROP_KEY: str = 'export_crop'
 
 
 class DrawingSurfaceConfig(dict):
@@ -31,7 +52,50 @@ class DrawingSurfaceConfig(dict):
         super().__init__(*args, **kwargs)
         self[DIR_KEY] = os.path.dirname(os.path.abspath(__file__))
         self[FILE_KEY] = 'ds_config.pkl'
-        self[DARK_KEY] = self.load_dark_mode()
+        # File is read once for every key
+        saved = self.load_saved()
+        self[DARK_KEY] = self.load_value(DARK_KEY, False, saved)
+        # Max pixels a point can be from a committed line and be removed
+        self[SIMPLIFY_KEY] = self.load_value(SIMPLIFY_KEY, 0.5, saved)
+        # Mouse and touch moves shorter than this many screen pixels are dropped at any zoom
+        self[MIN_MOVE_KEY] = self.load_value(MIN_MOVE_KEY, 1.5, saved)
+        # Let Qt merge mouse moves before they are delivered
+        self[COMPRESS_KEY] = self.load_value(COMPRESS_KEY, True, saved)
+        # Pixel size of the cached tiles lines are rasterized into
+        self[TILE_SIZE_KEY] = self.load_value(TILE_SIZE_KEY, 256, saved)
+        # Render dirty tiles on the thread pool instead of while painting
+        self[TILE_THREADS_KEY] = self.load_value(TILE_THREADS_KEY, True, saved)
+        # Points undo history may keep alive before old commands are dropped
+        self[HISTORY_KEY] = self.load_value(HISTORY_KEY, 1000000, saved)
+        # Most changes that can be undone
+        self[HISTORY_DEPTH_KEY] = self.load_value(HISTORY_DEPTH_KEY, 200, saved)
+        # Oldest lines past the undo horizon are flattened into raster past these budgets
+        self[FLATTEN_LINES_KEY] = self.load_value(FLATTEN_LINES_KEY, 5000, saved)
+        self[FLATTEN_POINTS_KEY] = self.load_value(FLATTEN_POINTS_KEY, 500000, saved)
+        # Most bytes flattened ink may use, lines stay as points once it is full
+        self[FLATTEN_BYTES_KEY] = self.load_value(FLATTEN_BYTES_KEY, 16 * 1024 * 1024, saved)
+        # Line width follows pen pressure or pointer speed
+        self[VARIABLE_WIDTH_KEY] = self.load_value(VARIABLE_WIDTH_KEY, False, saved)
+        # Lines are painted as curves through their points
+        self[SMOOTH_KEY] = self.load_value(SMOOTH_KEY, False, saved)
+        # Curves stay close to the input with fewer points so smooth lines are simplified more
+        self[SMOOTH_SIMPLIFY_KEY] = self.load_value(SMOOTH_SIMPLIFY_KEY, 1.0, saved)
+        # Milliseconds without input before tiles drawn fast are redrawn antialiased
+        self[REFINE_DELAY_KEY] = self.load_value(REFINE_DELAY_KEY, 300, saved)
+        # Most repaints per second, matches a 60 Hz display
+        self[FRAME_RATE_KEY] = self.load_value(FRAME_RATE_KEY, 60, saved)
+        # Milliseconds the line being drawn is extended ahead of the pointer, 0 turns it off
+        self[PREDICT_KEY] = self.load_value(PREDICT_KEY, 16, saved)
+        # Milliseconds without painting before the board is encoded ahead of a send
+        self[EXPORT_IDLE_KEY] = self.load_value(EXPORT_IDLE_KEY, 1000, saved)
+        # Sent images are compressed harder then made smaller until they fit in this many bytes, 0 for no limit
+        self[EXPORT_BYTES_KEY] = self.load_value(EXPORT_BYTES_KEY, 600000, saved)
+        # Sent images only use the pen colors and their shades so they encode smaller
+        self[EXPORT_PALETTE_KEY] = self.load_value(EXPORT_PALETTE_KEY, True, saved)
+        # Size of sent images relative to the screen
+        self[EXPORT_SCALE_KEY] = self.load_value(EXPORT_SCALE_KEY, 1.0, saved)
+        # Sent images are cropped to the ink in view, off keeps the whole view
+        self[EXPORT_CROP_KEY] = self.load_value(EXPORT_CROP_KEY, True, saved)
 
     def __setitem__(self, key: str, value) -> None:
         """
@@ -72,13 +136,38 @@ class DrawingSurfaceConfig(dict):
         Returns:
              Whether the whiteboard should be dark mode
         """
+        return self.load_value(DARK_KEY, default)
+
+    def load_saved(self) -> typing.Dict[str, typing.Any]:
+        """
+        Load the whole saved config from disk
+
+        Returns:
+             The saved config, empty if not saved
+        """
         full_path = os.path.join(self[DIR_KEY], self[FILE_KEY])
         if os.path.exists(full_path):
             with open(full_path, 'rb') as file:
-                config = pickle.load(file)
-                return config[DARK_KEY]
+                return dict(pickle.load(file))
         else:
-            return default
+            return {}
+
+    def load_value(self, key: str, default: typing.Any,
+                   saved: typing.Optional[typing.Dict[str, typing.Any]] = None) -> typing.Any:
+        """
+        Load a config value from disk
+
+        Args:
+            key: The config key to load
+            default: Return this value if error or key not saved
+            saved: The saved config if already loaded, read from disk if None
+
+        Returns:
+             The saved value for key
+        """
+        if saved is None:
+            saved = self.load_saved()
+        return saved.get(key, default)
 
     def save(self) -> None:
         """
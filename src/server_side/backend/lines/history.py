@@ -0,0 +1,439 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from abc import ABC, abstractmethod
+from collections import deque
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList, LineEntry
+from src.server_side.backend.lines.raster_layer import ChunkKey
+
+# Points kept alive only by history before old commands are dropped
+HISTORY_BUDGET: int = 1000000
+# Most commands that can be undone
+HISTORY_DEPTH: int = 200
+# Memory of one point, two int coordinates and a width byte,
+# used to count flattened ink in the same unit as lines
+POINT_BYTES: int = 9
+
+
+class Command(ABC):
+    """
+    One undoable change to a line list. Commands keep the
+    lines they change so undo and redo only need to repaint
+    the bounds of those lines.
+
+    """
+
+    def __init__(self, color_lines: typing.List[ColorLine]) -> None:
+        super().__init__()
+        self._color_lines: typing.List[ColorLine] = color_lines
+
+    @property
+    def lines(self) -> typing.List[ColorLine]:
+        """
+
+        Returns:
+             The lines changed by command
+        """
+        return self._color_lines
+
+    @property
+    def cost(self) -> int:
+        """
+        Memory held by command, counted in points
+
+        Returns:
+             The number of points in lines
+        """
+        return sum(color_line.num_points for color_line in self._color_lines)
+
+    def bounds(self) -> QRect:
+        """
+        The region changed by command
+
+        Returns:
+             The united bounds of all lines
+        """
+        rect = QRect()
+        for color_line in self._color_lines:
+            rect = rect.united(color_line.bounding_rect())
+        return rect
+
+    def raster_rects(self) -> typing.List[QRect]:
+        """
+        Regions of flattened ink changed by command
+
+        Returns:
+             The rects, empty if raster is not changed
+        """
+        return []
+
+    @abstractmethod
+    def redo(self, line_list: LineList) -> None:
+        """
+        Apply the change
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+
+    @abstractmethod
+    def undo(self, line_list: LineList) -> None:
+        """
+        Revert the change
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+
+
+class AddCommand(Command):
+    """
+    Lines drawn by user
+
+    """
+
+    def __init__(self, color_lines: typing.List[ColorLine]) -> None:
+        super().__init__(color_lines)
+        self._entries: typing.Optional[typing.List[LineEntry]] = None
+
+    def redo(self, line_list: LineList) -> None:
+        """
+        Add lines, simplifying them the first time only
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        if self._entries is None:
+            for color_line in self._color_lines:
+                line_list.add_line(color_line)
+        else:
+            line_list.insert_lines(self._entries)
+
+    def undo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        self._entries = line_list.remove_lines(self._color_lines)
+
+
+class EraseCommand(Command):
+    """
+    Lines removed by eraser. Undo puts them back
+    in the order they were painted.
+
+    """
+
+    def __init__(self, color_lines: typing.List[ColorLine]) -> None:
+        super().__init__(color_lines)
+        self._entries: typing.List[LineEntry] = []
+
+    def redo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        self._entries = line_list.remove_lines(self._color_lines)
+
+    def undo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        line_list.insert_lines(self._entries)
+
+
+class ClearCommand(EraseCommand):
+    """
+    All lines and flattened ink removed at once
+
+    """
+
+    def __init__(self, line_list: LineList) -> None:
+        super().__init__(list(line_list.line_list))
+        self._raster_rects: typing.List[QRect] = line_list.raster_layer.bounds()
+        # Counted when command is made so cost does not change as chunks are taken and restored
+        self._raster_bytes: int = line_list.raster_layer.num_bytes
+        self._chunks: typing.Dict[ChunkKey, QImage] = {}
+        self._ink_rect: QRect = QRect()
+
+    @property
+    def cost(self) -> int:
+        """
+        Cleared chunks are often the most memory history holds
+
+        Returns:
+             The number of points in lines plus flattened ink in points
+        """
+        return super().cost + self._raster_bytes // POINT_BYTES
+
+    def raster_rects(self) -> typing.List[QRect]:
+        """
+
+        Returns:
+             The chunks of flattened ink that were cleared
+        """
+        return self._raster_rects
+
+    def redo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        super().redo(line_list)
+        self._ink_rect = line_list.raster_layer.ink_rect
+        self._chunks = line_list.raster_layer.take_chunks()
+
+    def undo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        super().undo(line_list)
+        line_list.raster_layer.restore_chunks(self._chunks, self._ink_rect)
+        self._chunks = {}
+        self._ink_rect = QRect()
+
+
+class RecolorCommand(Command):
+    """
+    Lines changed to a new color. Lines are replaced by
+    recolored copies instead of changed in place since
+    other threads may be painting the old ones.
+
+    """
+
+    def __init__(self, color_lines: typing.List[ColorLine], new_color: QColor) -> None:
+        new_lines = []
+        for color_line in color_lines:
+            new_line = color_line.make_copy()
+            new_line.color = new_color
+            new_lines.append(new_line)
+        # Both are kept alive until command is dropped
+        super().__init__(color_lines + new_lines)
+        self._old_lines: typing.List[ColorLine] = color_lines
+        self._new_lines: typing.List[ColorLine] = new_lines
+
+    @staticmethod
+    def replace_lines(line_list: LineList, old_lines: typing.List[ColorLine],
+                      new_lines: typing.List[ColorLine]) -> None:
+        """
+        Put each new line where its old line was so
+        they are painted in the same order as before
+
+        Args:
+            line_list: The line list to change
+            old_lines: The lines in list
+            new_lines: The lines to put in their place
+
+        Returns:
+
+        """
+        replacements = {id(old_line): new_line for old_line, new_line in zip(old_lines, new_lines)}
+        entries = line_list.remove_lines(old_lines)
+        line_list.insert_lines([(order, replacements[id(color_line)]) for order, color_line in entries])
+
+    def redo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        self.replace_lines(line_list, self._old_lines, self._new_lines)
+
+    def undo(self, line_list: LineList) -> None:
+        """
+
+        Args:
+            line_list: The line list to change
+
+        Returns:
+
+        """
+        self.replace_lines(line_list, self._new_lines, self._old_lines)
+
+
+class History:
+    """
+    Undo and redo stacks of commands applied to a line list.
+    When the commands hold more points than the budget, or
+    there are more commands than the depth, the oldest commands
+    are dropped and can no longer be undone.
+
+    """
+
+    def __init__(self, line_list: LineList, budget: int = HISTORY_BUDGET, depth: int = HISTORY_DEPTH) -> None:
+        super().__init__()
+        self._line_list: LineList = line_list
+        self._budget: int = budget
+        self._depth: int = depth
+        self._undo_stack: typing.Deque[Command] = deque()
+        self._redo_stack: typing.List[Command] = []
+        self._cost: int = 0
+
+    @property
+    def cost(self) -> int:
+        """
+
+        Returns:
+             The total cost of commands in both stacks
+        """
+        return self._cost
+
+    @property
+    def can_undo(self) -> bool:
+        """
+
+        Returns:
+             True if there is a command to undo
+        """
+        return len(self._undo_stack) > 0
+
+    @property
+    def can_redo(self) -> bool:
+        """
+
+        Returns:
+             True if there is a command to redo
+        """
+        return len(self._redo_stack) > 0
+
+    def execute(self, command: Command) -> None:
+        """
+        Apply a new command. Commands that were undone
+        can not be redone after a new command.
+
+        Args:
+            command: The command to apply
+
+        Returns:
+
+        """
+        command.redo(self._line_list)
+        for old_command in self._redo_stack:
+            self._cost -= old_command.cost
+        self._redo_stack.clear()
+        self._undo_stack.append(command)
+        self._cost += command.cost
+        self.compact()
+
+    def undo(self) -> typing.Optional[Command]:
+        """
+        Revert the last command
+
+        Returns:
+             The command that was undone, None if nothing to undo
+        """
+        if len(self._undo_stack) == 0:
+            return None
+        command = self._undo_stack.pop()
+        command.undo(self._line_list)
+        self._redo_stack.append(command)
+        return command
+
+    def redo(self) -> typing.Optional[Command]:
+        """
+        Apply the last undone command again
+
+        Returns:
+             The command that was redone, None if nothing to redo
+        """
+        if len(self._redo_stack) == 0:
+            return None
+        command = self._redo_stack.pop()
+        command.redo(self._line_list)
+        self._undo_stack.append(command)
+        return command
+
+    def compact(self) -> None:
+        """
+        Drop the oldest commands until the cost is in budget.
+        The newest command is always kept.
+
+        Returns:
+
+        """
+        while len(self._undo_stack) > 1 and (self._cost > self._budget or len(self._undo_stack) > self._depth):
+            self._cost -= self._undo_stack.popleft().cost
+
+    def referenced_lines(self) -> typing.Set[int]:
+        """
+        Lines that undo or redo may still change. Lines
+        not in this set are past the undo horizon.
+
+        Returns:
+             The ids of lines held by commands
+        """
+        keys = set()
+        for command in self._undo_stack:
+            keys.update(id(color_line) for color_line in command.lines)
+        for command in self._redo_stack:
+            keys.update(id(color_line) for color_line in command.lines)
+        return keys
+
+    def clear(self) -> None:
+        """
+        Forget all commands
+
+        Returns:
+
+        """
+        self._undo_stack.clear()
+        self._redo_stack.clear()
+        self._cost = 0
+
+
+if __name__ == "__main__":
+    pass
@@ -17,29 +17,135 @@
 """
 
 import typing
-import copy
-from PyQt5.QtCore import QPoint
+from array import array
+from PyQt5.QtCore import QPoint, QRect
 from PyQt5.QtGui import QColor
 
 L = typing.TypeVar('L', bound='Line')
 CL = typing.TypeVar('CL', bound='ColorLine')
 
+OPAQUE_MASK: int = 0xFF000000
+RGB_MASK: int = 0x00FFFFFF
+# Widths are stored as tenths of a pixel in one byte per point
+WIDTH_SCALE: int = 10
+
 
 class Line:
+    """
+    Points are stored as interleaved x, y ints in
+    a single array instead of one QPoint per point.
+    Lines drawn with variable width also store one
+    width per point, lines without widths use the pen.
+    Smooth lines are painted as a curve through the points.
+
+    """
+
+    __slots__ = ('_points', '_widths', '_smooth', '_shape')
 
     def __init__(self) -> None:
         super().__init__()
-        self._points: typing.List[QPoint] = []
+        self._points: array = array('i')
+        self._widths: array = array('B')
+        self._smooth: bool = False
+        # Shape cached by the painter, dropped when points change other than being added
+        self._shape: typing.Any = None
 
     @property
     def points(self) -> typing.List[QPoint]:
         """
+        Built from the stored coordinates on each call
 
         Returns:
              The points comprising the line
         """
+        coords = self._points
+        return [QPoint(x, y) for x, y in zip(coords[0::2], coords[1::2])]
+
+    @property
+    def coords(self) -> array:
+        """
+
+        Returns:
+             The interleaved x, y coordinates of the line
+        """
         return self._points
 
+    @property
+    def widths(self) -> typing.List[float]:
+        """
+        Built from the stored widths on each call
+
+        Returns:
+             The width in pixels at each point, empty if line uses the pen width
+        """
+        return [width / WIDTH_SCALE for width in self._widths]
+
+    @property
+    def last_width(self) -> typing.Optional[float]:
+        """
+
+        Returns:
+             The width in pixels at the last point, None if line uses the pen width
+        """
+        return self._widths[-1] / WIDTH_SCALE if len(self._widths) > 0 else None
+
+    @property
+    def variable_width(self) -> bool:
+        """
+
+        Returns:
+             True if line has a width per point
+        """
+        return len(self._widths) > 0
+
+    @property
+    def smooth(self) -> bool:
+        """
+
+        Returns:
+             True if line is painted as a curve through its points
+        """
+        return self._smooth
+
+    @smooth.setter
+    def smooth(self, smooth: bool) -> None:
+        """
+        Set if line is painted as a curve through its points
+
+        Returns:
+
+        """
+        self._smooth = smooth
+        self._shape = None
+
+    @property
+    def shape(self) -> typing.Any:
+        """
+
+        Returns:
+             The shape cached by the painter, None if not made yet
+        """
+        return self._shape
+
+    @shape.setter
+    def shape(self, new_shape: typing.Any) -> None:
+        """
+        Cache the shape the line is painted with
+
+        Returns:
+
+        """
+        self._shape = new_shape
+
+    @property
+    def num_points(self) -> int:
+        """
+
+        Returns:
+             The number of points in the line
+        """
+        return len(self._points) // 2
+
     def make_straight(self) -> None:
         """
         Make the line straight
@@ -47,8 +153,11 @@ class Line:
         Returns:
 
         """
-        if len(self._points) > 2:
-            self._points = [self._points[0], self._points[-1]]
+        if len(self._points) > 4:
+            self._points = self._points[:2] + self._points[-2:]
+            if len(self._widths) > 0:
+                self._widths = self._widths[:1] + self._widths[-1:]
+            self._shape = None
         else:
             pass
 
@@ -66,32 +175,164 @@ class Line:
         for point in points:
             self.add_point(point)
 
-    def add_point(self, point: typing.Union[QPoint, typing.Tuple[int, int]]) -> None:
+    def add_point(self, point: typing.Union[QPoint, typing.Tuple[int, int]],
+                  width: typing.Optional[float] = None) -> None:
         """
-        Add a point to line
+        Add a point to line. The int array rejects
+        anything that is not an int.
 
         Args:
             point: The point to add
+            width: The width of line at point in pixels.
+                None repeats the last width if line has widths.
 
         Returns:
 
         """
-        if isinstance(point, QPoint):
-            self._points.append(point)
-        else:
-            assert isinstance(point[0], int)
-            assert isinstance(point[1], int)
-            p = QPoint(point[0], point[1])
-            self._points.append(p)
+        try:
+            self._points.extend((point.x(), point.y()))
+        except AttributeError:
+            x, y = point
+            self._points.extend((x, y))
+        if width is not None:
+            step = min(255, max(1, round(width * WIDTH_SCALE)))
+            num_missing = self.num_points - len(self._widths)
+            if num_missing > 1:
+                # Earlier points get the first width so there is one width per point
+                self._shape = None
+            self._widths.extend([step] * num_missing)
+        elif len(self._widths) > 0:
+            self._widths.append(self._widths[-1])
+
+    def clear(self) -> None:
+        """
+        Remove all points from line
+
+        Returns:
+
+        """
+        del self._points[:]
+        del self._widths[:]
+        self._shape = None
+
+    def simplify(self, tolerance: float) -> int:
+        """
+        Remove points that are within tolerance of the simplified
+        line using Ramer-Douglas-Peucker. First and last points
+        are always kept.
+
+        Args:
+            tolerance: Max distance in pixels a removed point may be from the line
+
+        Returns:
+             The number of points removed
+        """
+        num_points = self.num_points
+        if tolerance <= 0 or num_points < 3:
+            return 0
+        xs = self._points[0::2]
+        ys = self._points[1::2]
+        tolerance_sq = tolerance * tolerance
+        keep = bytearray(num_points)
+        keep[0] = keep[-1] = 1
+        # Iterative so long lines do not hit the recursion limit
+        stack = [(0, num_points - 1)]
+        while stack:
+            first, last = stack.pop()
+            x1, y1 = xs[first], ys[first]
+            dx, dy = xs[last] - x1, ys[last] - y1
+            seg_len_sq = dx * dx + dy * dy
+            max_dist_sq = 0.0
+            max_index = first
+            for i in range(first + 1, last):
+                px, py = xs[i] - x1, ys[i] - y1
+                if seg_len_sq == 0:
+                    dist_sq = px * px + py * py
+                else:
+                    # Distance to the segment, not the infinite line,
+                    # so points doubling back are kept
+                    t = min(1.0, max(0.0, (px * dx + py * dy) / seg_len_sq))
+                    ex, ey = px - t * dx, py - t * dy
+                    dist_sq = ex * ex + ey * ey
+                if dist_sq > max_dist_sq:
+                    max_dist_sq = dist_sq
+                    max_index = i
+            if max_dist_sq > tolerance_sq:
+                keep[max_index] = 1
+                stack.append((first, max_index))
+                stack.append((max_index, last))
+        num_kept = sum(keep)
+        if num_kept == num_points:
+            return 0
+        simplified = array('i')
+        for i in range(num_points):
+            if keep[i]:
+                simplified.extend((xs[i], ys[i]))
+        self._points = simplified
+        if len(self._widths) > 0:
+            self._widths = array('B', (width for width, kept in zip(self._widths, keep) if kept))
+        self._shape = None
+        return num_points - num_kept
+
+    def is_near(self, x: int, y: int, radius: float) -> bool:
+        """
+        Check if any segment of line passes within radius of a point
+
+        Args:
+            x: The x coordinate of point
+            y: The y coordinate of point
+            radius: Max distance from point
+
+        Returns:
+             True if line is within radius
+        """
+        num_points = self.num_points
+        if num_points == 0:
+            return False
+        radius_sq = radius * radius
+        xs = self._points[0::2]
+        ys = self._points[1::2]
+        if num_points == 1:
+            dx, dy = xs[0] - x, ys[0] - y
+            return dx * dx + dy * dy <= radius_sq
+        for i in range(num_points - 1):
+            x1, y1 = xs[i], ys[i]
+            dx, dy = xs[i + 1] - x1, ys[i + 1] - y1
+            px, py = x - x1, y - y1
+            seg_len_sq = dx * dx + dy * dy
+            t = 0.0 if seg_len_sq == 0 else min(1.0, max(0.0, (px * dx + py * dy) / seg_len_sq))
+            ex, ey = px - t * dx, py - t * dy
+            if ex * ex + ey * ey <= radius_sq:
+                return True
+        return False
+
+    def bounding_rect(self) -> QRect:
+        """
+        The smallest rect containing all points of the line
+
+        Returns:
+             The bounding rect, null rect if no points
+        """
+        if len(self._points) == 0:
+            return QRect()
+        xs = self._points[0::2]
+        ys = self._points[1::2]
+        return QRect(QPoint(min(xs), min(ys)), QPoint(max(xs), max(ys)))
 
     def make_copy(self) -> L:
         """
-        Make a deep copy of self
+        Make a deep copy of self. Copies the coordinate
+        array directly instead of using copy.deepcopy.
 
         Returns:
              The deep copy of self
         """
-        new_copy = copy.deepcopy(self)
+        new_copy = self.__class__.__new__(self.__class__)
+        new_copy._points = self._points[:]
+        new_copy._widths = self._widths[:]
+        new_copy._smooth = self._smooth
+        # Shapes are extended in place so they are never shared
+        new_copy._shape = None
         return new_copy
 
     def __eq__(self, other: L) -> bool:
@@ -103,14 +344,20 @@ class Line:
         """
         if not isinstance(other, Line):
             return False
-        return self._points == other.points
+        return self._points == other.coords
 
 
 class ColorLine(Line):
+    """
+    Color is stored as a packed rgba int instead of a QColor
+
+    """
+
+    __slots__ = ('_rgba',)
 
     def __init__(self) -> None:
         super().__init__()
-        self._color: QColor = QColor.fromRgb(0, 0, 0)  # black
+        self._rgba: int = QColor.fromRgb(0, 0, 0).rgba()  # black
 
     @property
     def color(self) -> QColor:
@@ -120,7 +367,7 @@ class ColorLine(Line):
         Returns:
              The color
         """
-        return self._color
+        return QColor.fromRgba(self._rgba)
 
     @color.setter
     def color(self, new_color: QColor) -> None:
@@ -132,10 +379,19 @@ class ColorLine(Line):
         """
         assert isinstance(new_color, QColor)
         if new_color.isValid():
-            self._color = new_color
+            self._rgba = new_color.rgba()
         else:
             pass
 
+    @property
+    def rgba(self) -> int:
+        """
+
+        Returns:
+             The packed rgba value of the line color
+        """
+        return self._rgba
+
     def make_copy(self) -> CL:
         """
         Make a deep copy of self
@@ -144,20 +400,19 @@ class ColorLine(Line):
              The deep copy of self
         """
         new_copy = super().make_copy()
+        new_copy._rgba = self._rgba
         return new_copy
 
     def __eq__(self, other: CL) -> bool:
         """
-        Check color rgb values are the same because
-        QColor by default checks if QColors are
-        the same instance
-
+        Check color rgb values are the same. Alpha is
+        ignored the same way QColor.rgb() ignores it.
 
         Returns:
             True if color lines are the same
         """
         if super().__eq__(other):
-            if self._color.rgb() == other.color.rgb():
+            if self._rgba & RGB_MASK == other.rgba & RGB_MASK:
                 return True
         return False
 
@@ -168,8 +423,7 @@ class ColorLine(Line):
         Returns:
 
         """
-        r, g, b = self._color.red(), self._color.green(), self._color.blue()
-        self._color = QColor.fromRgb(255 - r, 255 - g, 255 - b)
+        self._rgba = (self._rgba ^ RGB_MASK) | OPAQUE_MASK
 
 
 if __name__ == "__main__":
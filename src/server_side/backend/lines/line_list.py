@@ -16,17 +16,39 @@
     along with this program. If not, see https://www.gnu.org/licenses/.
 """
 
+import bisect
 import typing
+from PyQt5.QtCore import QRect
 from PyQt5.QtGui import QColor
 
 from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.spatial_index import SpatialIndex
+from src.server_side.backend.lines.raster_layer import RasterLayer, ChunkKey
+
+# Paint order, line
+LineEntry = typing.Tuple[int, ColorLine]
+# Flattening stops once this fraction of the budget is left
+FLATTEN_TARGET: float = 0.75
+# Most points flattened at a time so the GUI thread is never held up for long
+FLATTEN_BATCH: int = 250
 
 
 class LineList:
 
-    def __init__(self) -> None:
+    def __init__(self, simplify_tolerance: float = 0.0, smooth_tolerance: float = 0.0) -> None:
         super().__init__()
         self._line_list: typing.List[ColorLine] = []
+        self._simplify_tolerance: float = simplify_tolerance
+        self._smooth_tolerance: float = smooth_tolerance
+        self._num_points: int = 0
+        self._index: SpatialIndex = SpatialIndex()
+        # Oldest lines are flattened into raster, painted under all lines
+        self._raster_layer: RasterLayer = RasterLayer()
+        # Goes up on every change that can be seen
+        self._version: int = 0
+        # Union of the bounds of lines in list, found again only when a line on its edge is removed
+        self._line_rect: QRect = QRect()
+        self._line_rect_stale: bool = False
 
     @property
     def line_list(self) -> typing.List[ColorLine]:
@@ -38,6 +60,79 @@ class LineList:
         """
         return self._line_list
 
+    @property
+    def version(self) -> int:
+        """
+        Images of lines with the same version are the same
+
+        Returns:
+             The version of lines
+        """
+        return self._version
+
+    @property
+    def content_rect(self) -> QRect:
+        """
+        The bounds of all lines and flattened ink.
+        Found again from the cached bounds of every line
+        only after a line on the edge was removed.
+
+        Returns:
+             The world rect containing all points, null rect if board is empty
+        """
+        if self._line_rect_stale:
+            self._line_rect = QRect()
+            for color_line in self._line_list:
+                self._line_rect |= self._index.get_bounds(color_line)
+            self._line_rect_stale = False
+        return self._line_rect | self._raster_layer.ink_rect
+
+    def grow_content(self, bounds: QRect) -> None:
+        """
+        Called when a line is added to list
+
+        Args:
+            bounds: The bounding rect of line
+
+        Returns:
+
+        """
+        if not self._line_rect_stale:
+            self._line_rect |= bounds
+
+    def shrink_content(self, bounds: QRect) -> None:
+        """
+        Called when a line is removed from list.
+        Lines inside the edge do not change the union.
+
+        Args:
+            bounds: The bounding rect of line
+
+        Returns:
+
+        """
+        if not self._line_rect.contains(bounds, True):
+            self._line_rect_stale = True
+
+    @property
+    def raster_layer(self) -> RasterLayer:
+        """
+        Flattened ink of lines no longer in list
+
+        Returns:
+             The raster layer
+        """
+        return self._raster_layer
+
+    @property
+    def num_points(self) -> int:
+        """
+
+        Returns:
+             Total number of points in all lines
+        """
+        return self._num_points
+
     def get_colors(self) -> typing.List[QColor]:
         """
         Get colors used for all lines
@@ -48,43 +143,198 @@ class LineList:
         colors = [color_line.color for color_line in self._line_list]
         return colors
 
-    def add_line(self, color_line: ColorLine) -> None:
+    def add_line(self, color_line: ColorLine) -> int:
         """
-        Add a color line to the list of lines
+        Add a color line to the list of lines.
+        The line is simplified before it is added,
+        smooth lines with their own tolerance.
 
         Args:
             color_line: The line to add
 
         Returns:
-
+             The number of points removed by simplification
         """
-        if len(color_line.points) > 0:
+        if color_line.num_points > 0:
+            tolerance = self._smooth_tolerance if color_line.smooth else self._simplify_tolerance
+            num_removed = color_line.simplify(tolerance)
             self._line_list.append(color_line)
+            self._index.insert(color_line)
+            self._num_points += color_line.num_points
+            self.grow_content(self._index.get_bounds(color_line))
+            self._version += 1
+            return num_removed
         else:
-            pass
+            return 0
 
-    def remove_last_line(self) -> None:
+    def remove_last_line(self) -> typing.Optional[ColorLine]:
         """
-        Remove the last line in list.
-        Called when user click undo
+        Remove the last line in list
 
         Returns:
-
+             The removed line, None if no lines
         """
         try:
-            self._line_list.pop()
+            color_line = self._line_list.pop()
+            self.shrink_content(self._index.get_bounds(color_line))
+            self._index.remove(color_line)
+            self._num_points -= color_line.num_points
+            self._version += 1
+            return color_line
         except IndexError:
-            pass
+            return None
+
+    def remove_lines(self, color_lines: typing.List[ColorLine]) -> typing.List[LineEntry]:
+        """
+        Remove these exact lines from the list
+
+        Args:
+            color_lines: The lines to remove
+
+        Returns:
+             The paint order of each removed line, to put it back with insert_lines
+        """
+        remove_keys = {id(color_line) for color_line in color_lines}
+        entries = [(self._index.get_order(color_line), color_line)
+                   for color_line in self._line_list if id(color_line) in remove_keys]
+        self._line_list[:] = [color_line for color_line in self._line_list if id(color_line) not in remove_keys]
+        for _, color_line in entries:
+            self.shrink_content(self._index.get_bounds(color_line))
+            self._index.remove(color_line)
+            self._num_points -= color_line.num_points
+        self._version += 1
+        return entries
+
+    def insert_lines(self, entries: typing.List[LineEntry]) -> None:
+        """
+        Put removed lines back by their paint order so
+        they are painted in the same order as before.
+        Positions in list are not kept since flattening
+        shifts them. Lines are not simplified again.
+
+        Args:
+            entries: The entries returned by remove_lines
+
+        Returns:
 
-    def invert_lines_colors(self) -> None:
         """
-        Invert the color of the lines for dark mode
+        for order, color_line in sorted(entries, key=lambda entry: entry[0]):
+            # List is always in paint order
+            position = bisect.bisect_left(self._line_list, order, key=self._index.get_order)
+            self._line_list.insert(position, color_line)
+            self._index.insert(color_line, order)
+            self._num_points += color_line.num_points
+            self.grow_content(self._index.get_bounds(color_line))
+        self._version += 1
+
+    def over_budget(self, max_lines: int, max_points: int) -> bool:
+        """
+
+        Args:
+            max_lines: Budget for number of lines
+            max_points: Budget for number of points
 
         Returns:
+             True if the oldest lines should be flattened
+        """
+        return len(self._line_list) > max_lines or self._num_points > max_points
+
+    def count_to_flatten(self, max_lines: int, max_points: int, max_bytes: int) -> int:
+        """
+        Count the next oldest lines to flatten on the way to well
+        under budget, so flattening does not start after every line.
+        Only a batch is counted at a time, and none that would take
+        the raster layer over max_bytes since chunks can cost more
+        memory than the points they replace.
+
+        Args:
+            max_lines: Budget for number of lines
+            max_points: Budget for number of points
+            max_bytes: Budget for memory of raster layer
 
+        Returns:
+             The number of lines from the start of list, 0 if under target or raster is full
         """
+        target_lines = int(max_lines * FLATTEN_TARGET)
+        target_points = int(max_points * FLATTEN_TARGET)
+        num_lines = len(self._line_list)
+        num_points = self._num_points
+        num_bytes = self._raster_layer.num_bytes
+        new_keys: typing.Set[ChunkKey] = set()
+        batch_points = 0
+        count = 0
         for color_line in self._line_list:
-            color_line.invert_color()
+            if (num_lines <= target_lines and num_points <= target_points) or batch_points >= FLATTEN_BATCH:
+                break
+            new_keys |= self._raster_layer.new_keys(color_line)
+            if num_bytes + len(new_keys) * self._raster_layer.chunk_bytes > max_bytes:
+                break
+            num_lines -= 1
+            num_points -= color_line.num_points
+            batch_points += color_line.num_points
+            count += 1
+        return count
+
+    def flatten_lines(self, count: int) -> typing.List[ColorLine]:
+        """
+        Paint the oldest lines into the raster layer and drop them.
+        Must be the oldest lines because raster is painted under
+        all lines. Point data is freed once nothing else holds it.
+
+        Args:
+            count: The number of lines from the start of list
+
+        Returns:
+             The flattened lines
+        """
+        flattened = self._line_list[:count]
+        self._raster_layer.add_lines(flattened)
+        del self._line_list[:count]
+        for color_line in flattened:
+            self.shrink_content(self._index.get_bounds(color_line))
+            self._index.remove(color_line)
+            self._num_points -= color_line.num_points
+        return flattened
+
+    def get_bounds(self, color_line: ColorLine) -> QRect:
+        """
+        Get the cached bounds of a line in list
+
+        Args:
+            color_line: The line
+
+        Returns:
+             The bounding rect of line
+        """
+        return self._index.get_bounds(color_line)
+
+    def query_rect(self, rect: QRect) -> typing.List[ColorLine]:
+        """
+        Get lines whose bounds intersect rect.
+        Used for partial repaints.
+
+        Args:
+            rect: The rect to query
+
+        Returns:
+             The lines in the order they were drawn
+        """
+        return self._index.query_rect(rect)
+
+    def query_point(self, x: int, y: int, radius: float) -> typing.List[ColorLine]:
+        """
+        Get lines that pass within radius of a point.
+        Used for hit testing.
+
+        Args:
+            x: The x coordinate of point
+            y: The y coordinate of point
+            radius: Max distance from point
+
+        Returns:
+             The lines in the order they were drawn
+        """
+        return self._index.query_point(x, y, radius)
 
 
 if __name__ == "__main__":
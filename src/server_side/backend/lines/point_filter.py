@@ -0,0 +1,101 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import math
+import typing
+
+
+class PointFilter:
+    """
+    Drops input points that are duplicates of, or closer than
+    min_distance to, the last accepted point. Touch panels
+    report a lot of sub pixel jitter while the finger rests.
+
+    """
+
+    def __init__(self, min_distance: float = 0.0) -> None:
+        super().__init__()
+        self._min_distance_sq: float = min_distance * min_distance
+        self._last_point: typing.Optional[typing.Tuple[int, int]] = None
+        self._num_dropped: int = 0
+
+    @property
+    def num_dropped(self) -> int:
+        """
+
+        Returns:
+             Total number of points dropped
+        """
+        return self._num_dropped
+
+    @property
+    def min_distance(self) -> float:
+        """
+
+        Returns:
+             Points closer than this to the last accepted point are dropped
+        """
+        return math.sqrt(self._min_distance_sq)
+
+    @min_distance.setter
+    def min_distance(self, min_distance: float) -> None:
+        """
+        Set the drop distance, in the units of the points
+
+        Args:
+            min_distance: Points closer than this to the last accepted point are dropped
+
+        Returns:
+
+        """
+        self._min_distance_sq = min_distance * min_distance
+
+    def reset(self) -> None:
+        """
+        Forget the last accepted point.
+        Called when a new line is started.
+
+        Returns:
+
+        """
+        self._last_point = None
+
+    def accept(self, x: int, y: int) -> bool:
+        """
+        Check if point should be added to line
+
+        Args:
+            x: The x coordinate of point
+            y: The y coordinate of point
+
+        Returns:
+             True if point should be kept
+        """
+        if self._last_point is not None:
+            dx = x - self._last_point[0]
+            dy = y - self._last_point[1]
+            dist_sq = dx * dx + dy * dy
+            if dist_sq == 0 or dist_sq < self._min_distance_sq:
+                self._num_dropped += 1
+                return False
+        self._last_point = (x, y)
+        return True
+
+
+if __name__ == "__main__":
+    pass
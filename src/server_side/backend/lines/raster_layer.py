@@ -0,0 +1,225 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QImage, QPainter
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.rendering.stroke_painter import StrokePainter, PEN_WIDTH
+
+CHUNK_SIZE: int = 256
+
+ChunkKey = typing.Tuple[int, int]
+# World rect covered, image of chunk
+Chunk = typing.Tuple[QRect, QImage]
+
+
+class RasterLayer:
+    """
+    Old lines flattened into transparent images in world
+    coordinates, one pixel per world unit. Only chunks that
+    have ink are kept. The layer is painted under all lines
+    so only the oldest lines can be flattened into it.
+
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE) -> None:
+        super().__init__()
+        self._chunk_size: int = chunk_size
+        self._chunks: typing.Dict[ChunkKey, QImage] = {}
+        # Union of the bounds of flattened lines, tighter than the chunks
+        self._ink_rect: QRect = QRect()
+        self._stroke_painter: StrokePainter = StrokePainter()
+
+    def __len__(self) -> int:
+        """
+
+        Returns:
+             The number of chunks with ink
+        """
+        return len(self._chunks)
+
+    @property
+    def num_bytes(self) -> int:
+        """
+
+        Returns:
+             Memory used by chunk images
+        """
+        return sum(image.sizeInBytes() for image in self._chunks.values())
+
+    @property
+    def chunk_bytes(self) -> int:
+        """
+
+        Returns:
+             Memory used by each new chunk image
+        """
+        return self._chunk_size * self._chunk_size * 4
+
+    @property
+    def ink_rect(self) -> QRect:
+        """
+
+        Returns:
+             The world rect containing all flattened ink, null rect if none
+        """
+        return self._ink_rect
+
+    def chunk_rect(self, key: ChunkKey) -> QRect:
+        """
+        The world region covered by a chunk
+
+        Args:
+            key: The chunk key
+
+        Returns:
+             The chunk rect
+        """
+        return QRect(key[0] * self._chunk_size, key[1] * self._chunk_size, self._chunk_size, self._chunk_size)
+
+    def chunk_keys(self, rect: QRect) -> typing.Iterator[ChunkKey]:
+        """
+        Yield the keys of chunks touched by rect
+
+        Args:
+            rect: The world region
+
+        Yields:
+             The chunk keys
+        """
+        size = self._chunk_size
+        for chunk_y in range(rect.top() // size, rect.bottom() // size + 1):
+            for chunk_x in range(rect.left() // size, rect.right() // size + 1):
+                yield chunk_x, chunk_y
+
+    @staticmethod
+    def ink_bounds(color_line: ColorLine) -> QRect:
+        """
+
+        Args:
+            color_line: The line
+
+        Returns:
+             The world rect a line paints, padded by the pen width
+        """
+        return color_line.bounding_rect().adjusted(-PEN_WIDTH, -PEN_WIDTH, PEN_WIDTH, PEN_WIDTH)
+
+    def new_keys(self, color_line: ColorLine) -> typing.Set[ChunkKey]:
+        """
+        Used to count the memory flattening a line would take
+
+        Args:
+            color_line: The line
+
+        Returns:
+             The keys of chunks the line touches that have no ink yet
+        """
+        if color_line.num_points == 0:
+            return set()
+        return {key for key in self.chunk_keys(self.ink_bounds(color_line)) if key not in self._chunks}
+
+    def add_lines(self, color_lines: typing.List[ColorLine]) -> None:
+        """
+        Paint lines into the chunks they touch.
+        Each chunk is opened once for all of its lines.
+
+        Args:
+            color_lines: The lines in paint order
+
+        Returns:
+
+        """
+        chunk_lines: typing.Dict[ChunkKey, typing.List[ColorLine]] = {}
+        for color_line in color_lines:
+            if color_line.num_points == 0:
+                continue
+            bounds = self.ink_bounds(color_line)
+            self._ink_rect |= bounds
+            for key in self.chunk_keys(bounds):
+                chunk_lines.setdefault(key, []).append(color_line)
+        for key, lines in chunk_lines.items():
+            image = self._chunks.get(key)
+            if image is None:
+                image = QImage(self._chunk_size, self._chunk_size, QImage.Format_ARGB32_Premultiplied)
+                image.fill(Qt.transparent)
+                self._chunks[key] = image
+            painter = QPainter(image)
+            # Flattened ink is kept for good, always draw it smooth
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.translate(-self.chunk_rect(key).topLeft())
+            self._stroke_painter.paint_lines(lines, painter)
+            painter.end()
+
+    def chunks(self, rect: QRect) -> typing.List[Chunk]:
+        """
+        Get the chunks with ink that touch rect. The images are
+        shallow copies so they can be painted on another thread.
+
+        Args:
+            rect: The world region
+
+        Returns:
+             The chunks
+        """
+        if len(self._chunks) == 0:
+            return []
+        chunks = []
+        for key in self.chunk_keys(rect):
+            image = self._chunks.get(key)
+            if image is not None:
+                chunks.append((self.chunk_rect(key), QImage(image)))
+        return chunks
+
+    def bounds(self) -> typing.List[QRect]:
+        """
+
+        Returns:
+             The world rects of all chunks with ink
+        """
+        return [self.chunk_rect(key) for key in self._chunks]
+
+    def take_chunks(self) -> typing.Dict[ChunkKey, QImage]:
+        """
+        Remove all chunks, used to clear the board
+
+        Returns:
+             The removed chunks
+        """
+        chunks, self._chunks = self._chunks, {}
+        self._ink_rect = QRect()
+        return chunks
+
+    def restore_chunks(self, chunks: typing.Dict[ChunkKey, QImage], ink_rect: QRect) -> None:
+        """
+        Put back chunks removed by take_chunks
+
+        Args:
+            chunks: The removed chunks
+            ink_rect: The ink rect before chunks were removed
+
+        Returns:
+
+        """
+        self._chunks = chunks
+        self._ink_rect = ink_rect
+
+
+if __name__ == "__main__":
+    pass
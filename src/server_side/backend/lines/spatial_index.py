@@ -0,0 +1,210 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from PyQt5.QtCore import QRect
+
+from src.server_side.backend.lines.line import ColorLine
+
+CELL_SIZE: int = 128
+
+
+class SpatialIndex:
+    """
+    Uniform grid over line bounding rects. Each line is
+    registered in every cell its bounds touch so queries
+    only look at lines near the query rect.
+
+    Lines are keyed by id() because ColorLine defines __eq__
+    and is not hashable. The order of each line is kept so
+    query results can be painted in the order they were drawn.
+
+    """
+
+    def __init__(self, cell_size: int = CELL_SIZE) -> None:
+        super().__init__()
+        self._cell_size: int = cell_size
+        self._cells: typing.Dict[typing.Tuple[int, int], typing.Set[int]] = {}
+        self._lines: typing.Dict[int, ColorLine] = {}
+        self._bounds: typing.Dict[int, QRect] = {}
+        self._orders: typing.Dict[int, int] = {}
+        self._next_order: int = 0
+
+    def __len__(self) -> int:
+        """
+
+        Returns:
+             The number of lines in index
+        """
+        return len(self._lines)
+
+    def __contains__(self, color_line: ColorLine) -> bool:
+        """
+
+        Returns:
+             True if this exact line is in index
+        """
+        return id(color_line) in self._lines
+
+    def cell_range(self, rect: QRect) -> typing.Iterator[typing.Tuple[int, int]]:
+        """
+        Yield the grid cells touched by rect
+
+        Args:
+            rect: The rect to cover
+
+        Yields:
+             The cell coordinates
+        """
+        size = self._cell_size
+        for cell_x in range(rect.left() // size, rect.right() // size + 1):
+            for cell_y in range(rect.top() // size, rect.bottom() // size + 1):
+                yield cell_x, cell_y
+
+    def insert(self, color_line: ColorLine, order: typing.Optional[int] = None) -> int:
+        """
+        Add a line to the index
+
+        Args:
+            color_line: The line to add
+            order: Paint order of line, next order if None
+
+        Returns:
+             The order of the line
+        """
+        key = id(color_line)
+        if order is None:
+            order = self._next_order
+        self._next_order = max(self._next_order, order + 1)
+        bounds = color_line.bounding_rect()
+        self._lines[key] = color_line
+        self._bounds[key] = bounds
+        self._orders[key] = order
+        for cell in self.cell_range(bounds):
+            self._cells.setdefault(cell, set()).add(key)
+        return order
+
+    def remove(self, color_line: ColorLine) -> None:
+        """
+        Remove a line from the index
+
+        Args:
+            color_line: The line to remove
+
+        Returns:
+
+        """
+        key = id(color_line)
+        if key not in self._lines:
+            return
+        for cell in self.cell_range(self._bounds[key]):
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del self._cells[cell]
+        del self._lines[key]
+        del self._bounds[key]
+        del self._orders[key]
+
+    def clear(self) -> None:
+        """
+        Remove all lines from index
+
+        Returns:
+
+        """
+        self._cells.clear()
+        self._lines.clear()
+        self._bounds.clear()
+        self._orders.clear()
+
+    def get_bounds(self, color_line: ColorLine) -> QRect:
+        """
+        Get the cached bounds of a line
+
+        Args:
+            color_line: A line in index
+
+        Returns:
+             The bounding rect of line
+        """
+        return self._bounds[id(color_line)]
+
+    def get_order(self, color_line: ColorLine) -> int:
+        """
+        Get the paint order of a line
+
+        Args:
+            color_line: A line in index
+
+        Returns:
+             The order of line
+        """
+        return self._orders[id(color_line)]
+
+    def query_rect(self, rect: QRect) -> typing.List[ColorLine]:
+        """
+        Get lines whose bounds intersect rect
+
+        Args:
+            rect: The rect to query
+
+        Returns:
+             The lines in paint order
+        """
+        if rect.isEmpty():
+            return []
+        candidates = set()
+        size = self._cell_size
+        num_cells = (rect.right() // size - rect.left() // size + 1) * (rect.bottom() // size - rect.top() // size + 1)
+        if num_cells > len(self._cells):
+            # Zoomed out queries cover more cells than are in use
+            left, top = rect.left() // size, rect.top() // size
+            right, bottom = rect.right() // size, rect.bottom() // size
+            for (cell_x, cell_y), keys in self._cells.items():
+                if left <= cell_x <= right and top <= cell_y <= bottom:
+                    candidates.update(keys)
+        else:
+            for cell in self.cell_range(rect):
+                keys = self._cells.get(cell)
+                if keys is not None:
+                    candidates.update(keys)
+        hits = [key for key in candidates if self._bounds[key].intersects(rect)]
+        hits.sort(key=self._orders.__getitem__)
+        return [self._lines[key] for key in hits]
+
+    def query_point(self, x: int, y: int, radius: float) -> typing.List[ColorLine]:
+        """
+        Get lines that pass within radius of a point
+
+        Args:
+            x: The x coordinate of point
+            y: The y coordinate of point
+            radius: Max distance from point
+
+        Returns:
+             The lines in paint order
+        """
+        reach = int(radius) + 1
+        rect = QRect(x - reach, y - reach, 2 * reach + 1, 2 * reach + 1)
+        return [color_line for color_line in self.query_rect(rect) if color_line.is_near(x, y, radius)]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,292 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+import math
+import typing
+from collections import deque
+from PyQt5.QtCore import QPoint
+
+# Milliseconds ahead of the last sample, about one frame at 60 Hz
+PREDICT_TIME: int = 16
+# Longest predicted extension so a jerk never draws far off
+MAX_DISTANCE: float = 30.0
+# Samples further apart than this are not used, the pointer paused
+MAX_GAP: int = 50
+
+# x, y, timestamp
+Sample = typing.Tuple[float, float, int]
+
+
+class PredictionStats:
+    """
+    Measures how well predictions match the samples that
+    arrive after them, shared by every predictor
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._num_errors: int = 0
+        self._error_total: float = 0.0
+        self._num_leads: int = 0
+        self._lead_total: float = 0.0
+
+    @property
+    def num_errors(self) -> int:
+        """
+
+        Returns:
+             The number of predictions checked against real samples
+        """
+        return self._num_errors
+
+    @property
+    def mean_error(self) -> float:
+        """
+
+        Returns:
+             Mean distance between predicted and real positions
+        """
+        return self._error_total / self._num_errors if self._num_errors > 0 else 0.0
+
+    @property
+    def mean_lead(self) -> float:
+        """
+
+        Returns:
+             Mean length of the predicted extensions, the
+             distance ink is drawn ahead of the real samples
+        """
+        return self._lead_total / self._num_leads if self._num_leads > 0 else 0.0
+
+    def add_error(self, error: float) -> None:
+        """
+
+        Args:
+            error: Distance between a predicted and a real position
+
+        Returns:
+
+        """
+        self._num_errors += 1
+        self._error_total += error
+
+    def add_lead(self, lead: float) -> None:
+        """
+
+        Args:
+            lead: Length of a predicted extension
+
+        Returns:
+
+        """
+        self._num_leads += 1
+        self._lead_total += lead
+
+    def reset(self) -> None:
+        """
+        Start measuring again
+
+        Returns:
+
+        """
+        self._num_errors = 0
+        self._error_total = 0.0
+        self._num_leads = 0
+        self._lead_total = 0.0
+
+
+class StrokePredictor:
+    """
+    Guesses where the pointer will be a short time after
+    the last sample from its velocity and acceleration, so
+    the line being drawn can be extended towards the pointer.
+    Predictions are only painted and never added to lines.
+
+    """
+
+    def __init__(self, predict_time: int = PREDICT_TIME, max_distance: float = MAX_DISTANCE,
+                 stats: typing.Optional[PredictionStats] = None) -> None:
+        super().__init__()
+        self._predict_time: int = predict_time
+        self._max_distance: float = max_distance
+        self._stats: PredictionStats = stats if stats is not None else PredictionStats()
+        self._samples: typing.Deque[Sample] = deque(maxlen=3)
+        # Velocity and acceleration fitted at the last sample
+        self._motion: typing.Optional[typing.Tuple[float, float, float, float]] = None
+        self._prediction: typing.Optional[QPoint] = None
+
+    @property
+    def predict_time(self) -> int:
+        """
+
+        Returns:
+             Milliseconds predicted ahead, 0 if prediction is off
+        """
+        return self._predict_time
+
+    @predict_time.setter
+    def predict_time(self, predict_time: int) -> None:
+        """
+        Set how far ahead to predict, 0 turns prediction off
+
+        Returns:
+
+        """
+        self._predict_time = predict_time
+        self._prediction = None
+
+    @property
+    def stats(self) -> PredictionStats:
+        """
+
+        Returns:
+             The measured accuracy of predictions
+        """
+        return self._stats
+
+    @property
+    def anchor(self) -> typing.Optional[QPoint]:
+        """
+
+        Returns:
+             The last sample, where the prediction starts
+        """
+        if len(self._samples) == 0:
+            return None
+        x, y, _ = self._samples[-1]
+        return QPoint(round(x), round(y))
+
+    @property
+    def prediction(self) -> typing.Optional[QPoint]:
+        """
+
+        Returns:
+             The predicted position, None if nothing is predicted
+        """
+        return self._prediction
+
+    def reset(self) -> None:
+        """
+        Forget the samples.
+        Called when a line is started or finished.
+
+        Returns:
+
+        """
+        self._samples.clear()
+        self._motion = None
+        self._prediction = None
+
+    def position_at(self, timestamp: int) -> typing.Optional[typing.Tuple[float, float]]:
+        """
+        Position of the fitted motion at a time after the last sample
+
+        Args:
+            timestamp: The time in milliseconds
+
+        Returns:
+             The x, y position, None if no motion is known
+        """
+        if self._motion is None:
+            return None
+        x, y, last_time = self._samples[-1]
+        vx, vy, ax, ay = self._motion
+        t = timestamp - last_time
+        return x + vx * t + ax * t * t / 2, y + vy * t + ay * t * t / 2
+
+    def add_sample(self, x: float, y: float, timestamp: int) -> typing.Optional[QPoint]:
+        """
+        Add the newest pointer position and predict ahead of it.
+        The previous prediction is first measured against it.
+
+        Args:
+            x: The x coordinate of pointer
+            y: The y coordinate of pointer
+            timestamp: The event time in milliseconds
+
+        Returns:
+             The predicted position, None if nothing is predicted
+        """
+        if self._motion is not None and 0 < timestamp - self._samples[-1][2] <= self._predict_time:
+            predicted_x, predicted_y = self.position_at(timestamp)
+            self._stats.add_error(math.hypot(x - predicted_x, y - predicted_y))
+        if len(self._samples) > 0 and timestamp - self._samples[-1][2] > MAX_GAP:
+            self._samples.clear()
+        if len(self._samples) > 0 and timestamp <= self._samples[-1][2]:
+            # Same event time, keep only the newest position
+            self._samples.pop()
+        self._samples.append((x, y, timestamp))
+        self._motion = self.fit_motion()
+        self._prediction = self.predict()
+        return self._prediction
+
+    def fit_motion(self) -> typing.Optional[typing.Tuple[float, float, float, float]]:
+        """
+        Velocity from the last two samples and acceleration
+        from the change in velocity over the last three.
+        Coalesced and synthesized events can share or go back
+        in time, nothing is fitted across those.
+
+        Returns:
+             The x, y velocity and x, y acceleration per millisecond, None if no motion is known
+        """
+        if len(self._samples) < 2:
+            return None
+        x1, y1, t1 = self._samples[-2]
+        x2, y2, t2 = self._samples[-1]
+        if t2 - t1 <= 0:
+            return None
+        vx, vy = (x2 - x1) / (t2 - t1), (y2 - y1) / (t2 - t1)
+        if len(self._samples) < 3:
+            return vx, vy, 0.0, 0.0
+        x0, y0, t0 = self._samples[0]
+        if t1 - t0 <= 0:
+            return None
+        last_vx, last_vy = (x1 - x0) / (t1 - t0), (y1 - y0) / (t1 - t0)
+        mid_time = (t2 - t0) / 2
+        return vx, vy, (vx - last_vx) / mid_time, (vy - last_vy) / mid_time
+
+    def predict(self) -> typing.Optional[QPoint]:
+        """
+        Extrapolate the fitted motion by the predict time.
+        Nothing is predicted if the pointer is slowing so
+        much that the extension would point backwards.
+
+        Returns:
+             The predicted position, None if nothing is predicted
+        """
+        if self._predict_time <= 0 or self._motion is None:
+            return None
+        x, y, _ = self._samples[-1]
+        vx, vy, _, _ = self._motion
+        predicted_x, predicted_y = self.position_at(self._samples[-1][2] + self._predict_time)
+        dx, dy = predicted_x - x, predicted_y - y
+        if dx * vx + dy * vy <= 0:
+            return None
+        distance = math.hypot(dx, dy)
+        if distance > self._max_distance:
+            dx, dy = dx * self._max_distance / distance, dy * self._max_distance / distance
+            distance = self._max_distance
+        if distance < 1:
+            return None
+        self._stats.add_lead(distance)
+        return QPoint(round(x + dx), round(y + dy))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,105 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+import math
+import typing
+
+MIN_WIDTH: float = 1.0
+# Half of max width must fit in the pen width padding of dirty rects
+MAX_WIDTH: float = 4.0
+# Pointer speed in pixels per millisecond that draws the thinnest line
+MAX_SPEED: float = 3.0
+# Weight of the newest speed so width does not jump between points
+SMOOTHING: float = 0.3
+
+
+class StrokeWidth:
+    """
+    Turns pen pressure, or pointer speed when there is
+    no pressure, into the width of each point of a line.
+    Faster moves draw thinner ink like a real pen.
+
+    """
+
+    def __init__(self, min_width: float = MIN_WIDTH, max_width: float = MAX_WIDTH,
+                 max_speed: float = MAX_SPEED) -> None:
+        super().__init__()
+        self._min_width: float = min_width
+        self._max_width: float = max_width
+        self._max_speed: float = max_speed
+        self._last_sample: typing.Optional[typing.Tuple[float, float, int]] = None
+        self._speed: float = 0.0
+
+    @property
+    def speed(self) -> float:
+        """
+
+        Returns:
+             The smoothed pointer speed in pixels per millisecond
+        """
+        return self._speed
+
+    def reset(self) -> None:
+        """
+        Forget the last position.
+        Called when a new line is started.
+
+        Returns:
+
+        """
+        self._last_sample = None
+        self._speed = 0.0
+
+    def from_pressure(self, pressure: float) -> float:
+        """
+        Width for a pen pressure
+
+        Args:
+            pressure: Pressure between 0 and 1
+
+        Returns:
+             The width in pixels
+        """
+        pressure = min(1.0, max(0.0, pressure))
+        return self._min_width + (self._max_width - self._min_width) * pressure
+
+    def from_motion(self, x: float, y: float, timestamp: int) -> float:
+        """
+        Width for the speed the pointer moved to x, y.
+        Events with the same timestamp keep the last speed.
+
+        Args:
+            x: The x coordinate of pointer in widget pixels
+            y: The y coordinate of pointer in widget pixels
+            timestamp: The event time in milliseconds
+
+        Returns:
+             The width in pixels
+        """
+        if self._last_sample is not None:
+            last_x, last_y, last_time = self._last_sample
+            elapsed = timestamp - last_time
+            if elapsed > 0:
+                speed = math.hypot(x - last_x, y - last_y) / elapsed
+                self._speed += (speed - self._speed) * SMOOTHING
+        self._last_sample = (x, y, timestamp)
+        fraction = min(1.0, self._speed / self._max_speed)
+        return self._max_width - (self._max_width - self._min_width) * fraction
+
+
+if __name__ == "__main__":
+    pass
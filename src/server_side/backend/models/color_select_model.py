@@ -21,13 +21,15 @@ from PyQt5 import QtCore
 from PyQt5.QtCore import QModelIndex, QPersistentModelIndex, Qt, QAbstractListModel
 from PyQt5.QtGui import QColor, QPixmap, QIcon
 
+# Pen colors user can select, exported images use them as palette
+COLORS: typing.List[str] = ['black', 'red', 'orange', 'yellow', 'green', 'blue', 'purple', 'white']
+
 
 class ColorSelectModel(QAbstractListModel):
 
     def __init__(self) -> None:
         super().__init__()
-        self._colors: typing.List[str] = ['black', 'red', 'orange', 'yellow',
-                                          'green', 'blue', 'purple', 'white']
+        self._colors: typing.List[str] = list(COLORS)
 
     def rowCount(self, parent: typing.Union[QModelIndex, QPersistentModelIndex] = ...) -> int:
         """
@@ -0,0 +1,464 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import math
+import os
+import time
+import traceback
+import typing
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QPoint, QRect, QRunnable, QSize, QThreadPool, QByteArray, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.raster_layer import Chunk
+from src.server_side.backend.rendering.image_encoder import ImageEncoder
+from src.server_side.backend.rendering.stroke_painter import StrokePainter, PEN_WIDTH
+
+# Encoded images kept, least recently used are dropped first
+EXPORT_CACHE_SIZE: int = 4
+
+# Version of lines, rect x, y, width, height, scale, encoder name, dark mode
+ExportKey = typing.Tuple[int, typing.Tuple[int, int, int, int], float, str, bool]
+# Encoded file and milliseconds it took to render and encode
+Encoded = typing.Tuple[QByteArray, float]
+
+
+def ink_margin(scale: float) -> int:
+    """
+    Lines are found by the bounds of their points so regions
+    are grown by the pen width, which is cosmetic when zoomed out
+
+    Args:
+        scale: Image pixels per drawing surface unit
+
+    Returns:
+         The drawing surface units to grow a region by
+    """
+    return math.ceil(PEN_WIDTH / min(scale, 1))
+
+
+class ExportTask(QRunnable):
+    """
+    Renders and encodes one export image on a thread pool
+    thread. Result is emitted through the renderer signal.
+    The image is rendered in strips and each strip only
+    paints the lines and ink that touch it.
+
+    """
+
+    def __init__(self, renderer: 'ExportRenderer', key: ExportKey, rect: QRect, scale: float,
+                 color_lines: typing.List[ColorLine], line_bounds: typing.List[QRect], chunks: typing.Sequence[Chunk],
+                 dark_mode: bool, encoder: ImageEncoder) -> None:
+        super().__init__()
+        self._renderer: ExportRenderer = renderer
+        self._key: ExportKey = key
+        self._rect: QRect = rect
+        self._scale: float = scale
+        self._color_lines: typing.List[ColorLine] = color_lines
+        self._line_bounds: typing.List[QRect] = line_bounds
+        self._chunks: typing.Sequence[Chunk] = chunks
+        self._dark_mode: bool = dark_mode
+        self._encoder: ImageEncoder = encoder
+
+    @property
+    def key(self) -> ExportKey:
+        """
+
+        Returns:
+             The cache key of the image
+        """
+        return self._key
+
+    def run(self) -> None:
+        """
+        Render the snapshot and encode it, timing both.
+        Errors emit empty data so exports waiting on the
+        image still finish.
+
+        Returns:
+
+        """
+        start_time = time.perf_counter()
+        try:
+            data, _ = self._encoder.encode(self.render, self.image_size, self._dark_mode)
+        except Exception:
+            traceback.print_exc()
+            data = QByteArray()
+        encode_time = (time.perf_counter() - start_time) * 1000
+        self._renderer.encoded_signal.emit(self._key, data, encode_time)
+
+    def image_size(self, fraction: float = 1.0) -> QSize:
+        """
+
+        Args:
+            fraction: Fraction of the export scale
+
+        Returns:
+             The size of the whole image
+        """
+        scale = self._scale * fraction
+        return QSize(round(self._rect.width() * scale), round(self._rect.height() * scale))
+
+    def strip_rect(self, scale: float, strip: QRect) -> QRect:
+        """
+
+        Args:
+            scale: Image pixels per drawing surface unit
+            strip: Rows of the image
+
+        Returns:
+             The region of the drawing surface with ink that can touch strip
+        """
+        margin = ink_margin(scale)
+        top = self._rect.top() + math.floor(strip.top() / scale)
+        bottom = self._rect.top() + math.ceil((strip.bottom() + 1) / scale)
+        return QRect(QPoint(self._rect.left(), top), QPoint(self._rect.right(), bottom)).adjusted(-margin, -margin,
+                                                                                                 margin, margin)
+
+    def render(self, fraction: float = 1.0, strip: typing.Optional[QRect] = None) -> QImage:
+        """
+        Exports are always antialiased. Zoomed out exports use
+        a cosmetic pen like the tiles on screen.
+
+        Args:
+            fraction: Render at this fraction of the export scale
+            strip: Only render these rows of the image
+
+        Returns:
+             The image or strip, inverted in dark mode like the screen
+        """
+        scale = self._scale * fraction
+        color_lines, chunks = self._color_lines, self._chunks
+        if strip is not None:
+            strip_rect = self.strip_rect(scale, strip)
+            color_lines = [color_line for color_line, bounds in zip(self._color_lines, self._line_bounds)
+                           if bounds.intersects(strip_rect)]
+            chunks = [chunk for chunk in self._chunks if chunk[0].intersects(strip_rect)]
+        stroke_painter = StrokePainter(cosmetic=scale < 1)
+        image = stroke_painter.render_image(self._rect, color_lines, scale, chunks, strip=strip)
+        if self._dark_mode:
+            image.invertPixels()
+        return image
+
+
+class WriteTask(QRunnable):
+    """
+    Writes an encoded image to a file on a thread pool thread
+
+    """
+
+    def __init__(self, renderer: 'ExportRenderer', export_id: int, data: QByteArray, path: str) -> None:
+        super().__init__()
+        self._renderer: ExportRenderer = renderer
+        self._export_id: int = export_id
+        self._data: QByteArray = data
+        self._path: str = path
+
+    def run(self) -> None:
+        """
+        The image is written next to path and moved over it
+        so a reader never sees a half written file
+
+        Returns:
+
+        """
+        temp_path = self._path + '.part'
+        try:
+            with open(temp_path, 'wb') as image_file:
+                image_file.write(bytes(self._data))
+            os.replace(temp_path, self._path)
+            save_success = True
+        except OSError as error:
+            self._renderer.export_report_signal.emit(self._export_id, f"Image could not be written: {error}")
+            save_success = False
+        self._renderer.export_finished_signal.emit(self._export_id, save_success)
+
+
+class ExportRenderer(QObject):
+    """
+    Saves whiteboard images from the stroke model so the GUI
+    keeps taking input while they are rendered and encoded.
+    Encoded images are cached by the version of the lines
+    so saving an unchanged board only writes the file, and
+    the current board can be encoded ahead of time.
+
+    """
+
+    export_finished_signal: pyqtSignal = pyqtSignal(int, bool)
+    # Export id and a message for the user, sent before the export finishes
+    export_report_signal: pyqtSignal = pyqtSignal(int, str)
+    encoded_signal: pyqtSignal = pyqtSignal(object, QByteArray, float)
+
+    def __init__(self, parent: typing.Optional[QObject] = None, max_entries: int = EXPORT_CACHE_SIZE,
+                 encoder: typing.Optional[ImageEncoder] = None) -> None:
+        super().__init__(parent)
+        self._encoder: ImageEncoder = encoder if encoder is not None else ImageEncoder()
+        # One thread each so exports to the same path never overlap
+        self._thread_pool: QThreadPool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._write_pool: QThreadPool = QThreadPool(self)
+        self._write_pool.setMaxThreadCount(1)
+        self._next_id: int = 0
+        self._max_entries: int = max_entries
+        self._cache: typing.OrderedDict[ExportKey, Encoded] = OrderedDict()
+        # Exports waiting for each image being encoded
+        self._waiting: typing.Dict[ExportKey, typing.List[typing.Tuple[int, str]]] = {}
+        # Images encoded ahead of time that no export has used yet
+        self._prepared: typing.Set[ExportKey] = set()
+        self.encoded_signal.connect(self.encoded_slot)
+
+    @property
+    def thread_pool(self) -> QThreadPool:
+        """
+
+        Returns:
+             The thread pool images are encoded on
+        """
+        return self._thread_pool
+
+    @property
+    def write_pool(self) -> QThreadPool:
+        """
+
+        Returns:
+             The thread pool files are written on
+        """
+        return self._write_pool
+
+    def wait_for_done(self) -> None:
+        """
+        Wait for images being encoded and written. Must be called
+        before renderer is deleted since its thread pools would
+        otherwise wait for tasks that need the GIL to finish.
+
+        Returns:
+
+        """
+        self._thread_pool.waitForDone()
+        self._write_pool.waitForDone()
+
+    @property
+    def encoder(self) -> ImageEncoder:
+        """
+
+        Returns:
+             The encoder of images
+        """
+        return self._encoder
+
+    @encoder.setter
+    def encoder(self, encoder: ImageEncoder) -> None:
+        """
+        Set the encoder of images. Images encoded with other
+        settings are no longer used since their key differs.
+
+        Returns:
+
+        """
+        self._encoder = encoder
+
+    @property
+    def cache(self) -> typing.OrderedDict[ExportKey, Encoded]:
+        """
+
+        Returns:
+             The encoded images, least recently used first
+        """
+        return self._cache
+
+    def export_key(self, line_list: LineList, rect: QRect, scale: float, dark_mode: bool) -> ExportKey:
+        """
+
+        Args:
+            line_list: The lines of the whiteboard
+            rect: The region of the drawing surface to export
+            scale: Image pixels per drawing surface unit
+            dark_mode: Invert the image like the screen
+
+        Returns:
+             The cache key of the image
+        """
+        return line_list.version, rect.getRect(), scale, self._encoder.name, dark_mode
+
+    def make_task(self, line_list: LineList, rect: QRect, scale: float, dark_mode: bool) -> ExportTask:
+        """
+        Snapshot the lines and flattened ink inside rect.
+        Committed lines are replaced rather than changed so
+        the list of them can be painted on another thread.
+
+        Args:
+            line_list: The lines of the whiteboard
+            rect: The region of the drawing surface to export
+            scale: Image pixels per drawing surface unit
+            dark_mode: Invert the image like the screen
+
+        Returns:
+             The export task
+        """
+        margin = ink_margin(scale)
+        query_rect = rect.adjusted(-margin, -margin, margin, margin)
+        color_lines = line_list.query_rect(query_rect)
+        line_bounds = [line_list.get_bounds(color_line) for color_line in color_lines]
+        chunks = line_list.raster_layer.chunks(rect)
+        key = self.export_key(line_list, rect, scale, dark_mode)
+        return ExportTask(self, key, rect, scale, color_lines, line_bounds, chunks, dark_mode, self._encoder)
+
+    def export(self, line_list: LineList, rect: QRect, scale: float, dark_mode: bool, path: str) -> int:
+        """
+        Start saving an image of the lines inside rect.
+        A cached image is written without encoding again.
+
+        Args:
+            line_list: The lines of the whiteboard
+            rect: The region of the drawing surface to export
+            scale: Image pixels per drawing surface unit
+            dark_mode: Invert the image like the screen
+            path: Where to save the image
+
+        Returns:
+             The id emitted with the result when export finishes
+        """
+        self._next_id += 1
+        key = self.export_key(line_list, rect, scale, dark_mode)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            data, encode_time = self._cache[key]
+            if key in self._prepared:
+                self._prepared.discard(key)
+                self.report(self._next_id, data, encode_time, True)
+            else:
+                # Sent before
+                self.report(self._next_id, data, None)
+            self.write(self._next_id, data, path)
+        elif key in self._waiting:
+            # Already being encoded ahead of time
+            self._waiting[key].append((self._next_id, path))
+        else:
+            self._waiting[key] = [(self._next_id, path)]
+            self._thread_pool.start(self.make_task(line_list, rect, scale, dark_mode))
+        return self._next_id
+
+    def prepare(self, line_list: LineList, rect: QRect, scale: float, dark_mode: bool) -> bool:
+        """
+        Encode the image ahead of time so a later export of the
+        same lines is only written. Called when input is idle.
+
+        Args:
+            line_list: The lines of the whiteboard
+            rect: The region of the drawing surface to export
+            scale: Image pixels per drawing surface unit
+            dark_mode: Invert the image like the screen
+
+        Returns:
+             True if an encode was started
+        """
+        key = self.export_key(line_list, rect, scale, dark_mode)
+        if key in self._cache or key in self._waiting:
+            return False
+        self._waiting[key] = []
+        self._prepared.add(key)
+        self._thread_pool.start(self.make_task(line_list, rect, scale, dark_mode))
+        return True
+
+    def encoded_slot(self, key: ExportKey, data: QByteArray, encode_time: float) -> None:
+        """
+        Slot called on GUI thread when an image is encoded.
+        It is cached and written for every export waiting on it.
+
+        Args:
+            key: The cache key of the image
+            data: The encoded file, empty if encoding failed
+            encode_time: Milliseconds it took to render and encode
+
+        Returns:
+
+        """
+        waiting = self._waiting.pop(key, [])
+        if data.isEmpty():
+            self._prepared.discard(key)
+            for export_id, _ in waiting:
+                self.export_report_signal.emit(export_id, "Image could not be encoded")
+                self.export_finished_signal.emit(export_id, False)
+            return
+        self._cache[key] = (data, encode_time)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_entries:
+            old_key, _ = self._cache.popitem(last=False)
+            self._prepared.discard(old_key)
+        ahead = key in self._prepared
+        if len(waiting) > 0:
+            self._prepared.discard(key)
+        for export_id, path in waiting:
+            self.report(export_id, data, encode_time, ahead)
+            self.write(export_id, data, path)
+
+    @staticmethod
+    def format_size(num_bytes: int) -> str:
+        """
+
+        Args:
+            num_bytes: Size of a file
+
+        Returns:
+             The size in bytes under a KB, otherwise in KB to one decimal
+        """
+        if num_bytes < 1024:
+            return f"{num_bytes} bytes"
+        return f"{num_bytes / 1024:.1f} KB"
+
+    def report(self, export_id: int, data: QByteArray, encode_time: typing.Optional[float],
+               ahead: bool = False) -> None:
+        """
+        Report the size and encode time of an exported image
+
+        Args:
+            export_id: The id of the export
+            data: The encoded file
+            encode_time: Milliseconds it took to render and encode, None if image was sent before
+            ahead: True if image was encoded ahead of time on idle
+
+        Returns:
+
+        """
+        size = self.format_size(data.size())
+        if encode_time is None:
+            message = f"Image is {size}, already encoded"
+        else:
+            source = "encoded ahead" if ahead else "encoded"
+            message = f"Image is {size}, {source} in {encode_time:.0f} ms"
+        self.export_report_signal.emit(export_id, message)
+
+    def write(self, export_id: int, data: QByteArray, path: str) -> None:
+        """
+        Start writing an encoded image to a file
+
+        Args:
+            export_id: The id of the export
+            data: The encoded file
+            path: Where to save the image
+
+        Returns:
+
+        """
+        self._write_pool.start(WriteTask(self, export_id, data, path))
+
+
+if __name__ == "__main__":
+    pass
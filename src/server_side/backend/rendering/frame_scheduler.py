@@ -0,0 +1,181 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from PyQt5.QtCore import Qt, QObject, QPoint, QRect, QTimer, QElapsedTimer
+from PyQt5.QtGui import QRegion
+from PyQt5.QtWidgets import QWidget
+
+FRAME_RATE: int = 60
+
+
+class FrameScheduler(QObject):
+    """
+    Collects repaint requests for a widget and updates it
+    at most once per frame. Requests made while a frame is
+    waiting are merged into it.
+
+    """
+
+    def __init__(self, widget: QWidget, frame_rate: int = FRAME_RATE) -> None:
+        super().__init__(widget)
+        self._widget: QWidget = widget
+        # Region to repaint on next frame, whole widget if full
+        self._region: QRegion = QRegion()
+        self._full: bool = False
+        self._clock: QElapsedTimer = QElapsedTimer()
+        self._clock.start()
+        self._last_frame: typing.Optional[int] = None
+        # Time the waiting frame is due
+        self._deadline: int = 0
+        self._timer: QTimer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self.frame)
+        self._interval: int = 0
+        self._frames: int = 0
+        self._coalesced_frames: int = 0
+        self._dropped_frames: int = 0
+        self.frame_rate = frame_rate
+
+    @property
+    def frame_rate(self) -> int:
+        """
+
+        Returns:
+             The most frames painted per second
+        """
+        return round(1000 / self._interval)
+
+    @frame_rate.setter
+    def frame_rate(self, frame_rate: int) -> None:
+        """
+        Set the target frame rate. Rates below 1, as from
+        a bad saved config, paint one frame per second.
+
+        Returns:
+
+        """
+        self._interval = max(1, round(1000 / max(1, frame_rate)))
+
+    @property
+    def interval(self) -> int:
+        """
+
+        Returns:
+             Milliseconds between frames
+        """
+        return self._interval
+
+    @property
+    def pending(self) -> bool:
+        """
+
+        Returns:
+             True if a frame is waiting to be painted
+        """
+        return self._timer.isActive()
+
+    @property
+    def frames(self) -> int:
+        """
+
+        Returns:
+             The number of frames painted
+        """
+        return self._frames
+
+    @property
+    def coalesced_frames(self) -> int:
+        """
+
+        Returns:
+             The number of requests merged into a waiting frame
+        """
+        return self._coalesced_frames
+
+    @property
+    def dropped_frames(self) -> int:
+        """
+
+        Returns:
+             The number of frame intervals missed because
+             the event loop was busy when a frame was due
+        """
+        return self._dropped_frames
+
+    def request(self, rect: typing.Optional[QRect] = None) -> None:
+        """
+        Ask for rect to be repainted on the next frame.
+        The first frame after an idle period is painted
+        at once, later ones wait for the frame interval.
+
+        Args:
+            rect: The region in widget coordinates, None for whole widget
+
+        Returns:
+
+        """
+        if rect is None:
+            self._full = True
+        elif not self._full:
+            self._region = self._region.united(rect)
+        if self._timer.isActive():
+            self._coalesced_frames += 1
+            return
+        now = self._clock.elapsed()
+        delay = 0 if self._last_frame is None else max(0, self._last_frame + self._interval - now)
+        self._deadline = now + delay
+        self._timer.start(delay)
+
+    def translate(self, delta: QPoint) -> None:
+        """
+        Move the waiting region with widget contents
+        that were scrolled by delta
+
+        Args:
+            delta: The scroll distance
+
+        Returns:
+
+        """
+        self._region.translate(delta)
+
+    def frame(self) -> None:
+        """
+        Slot connected when a frame is due. Updates the
+        widget with every region requested since last frame.
+
+        Returns:
+
+        """
+        self._timer.stop()
+        now = self._clock.elapsed()
+        self._dropped_frames += (now - self._deadline) // self._interval
+        self._last_frame = now
+        self._frames += 1
+        if self._full:
+            self._widget.update()
+        else:
+            self._widget.update(self._region)
+        self._region = QRegion()
+        self._full = False
+
+
+if __name__ == "__main__":
+    pass
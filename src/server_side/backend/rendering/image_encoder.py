@@ -0,0 +1,233 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from PyQt5.QtCore import Qt, QByteArray, QRect, QSize
+from PyQt5.QtGui import QColor, QImage
+
+from src.server_side.backend.models.color_select_model import COLORS
+from src.server_side.backend.rendering.png_writer import PngWriter
+from src.server_side.backend.rendering.stroke_painter import BACKGROUND_COLOR
+
+# Shades from background to each pen color, for antialiased edges
+PALETTE_LEVELS: int = 8
+# Render scale and PNG quality tried in turn until image fits the byte budget.
+# Quality 0 is the slowest, smallest compression.
+ENCODE_STEPS: typing.List[typing.Tuple[float, int]] = [(1.0, -1), (1.0, 0), (0.75, 0), (0.5, 0), (0.35, 0),
+                                                       (0.25, 0)]
+# Memory for the strip of an image being rendered, the whole image is never held
+STRIP_BYTES: int = 4 * 1024 * 1024
+
+
+class ImageEncoder:
+    """
+    Encodes whiteboard images as small PNGs for MMS.
+    Whiteboards are background and a few pen colors so
+    pixels are mapped to a palette of those colors and
+    their shades over the background. Images over the byte
+    budget are compressed harder and then rendered smaller.
+    Images are rendered and encoded a strip at a time so
+    large scales do not need memory for the whole image.
+
+    """
+
+    def __init__(self, palette: typing.Optional[typing.Sequence[QColor]] = None, max_bytes: int = 0,
+                 indexed: bool = True) -> None:
+        self._palette: typing.List[QColor] = list(palette) if palette is not None else \
+            [QColor(color) for color in COLORS]
+        self._max_bytes: int = max_bytes
+        self._indexed: bool = indexed
+
+    @property
+    def palette(self) -> typing.List[QColor]:
+        """
+
+        Returns:
+             The pen colors of images
+        """
+        return self._palette
+
+    @property
+    def max_bytes(self) -> int:
+        """
+
+        Returns:
+             The largest file size wanted, 0 for no limit
+        """
+        return self._max_bytes
+
+    @property
+    def indexed(self) -> bool:
+        """
+
+        Returns:
+             True if images are mapped to the palette
+        """
+        return self._indexed
+
+    @property
+    def name(self) -> str:
+        """
+        Images encoded with the same name are the same
+
+        Returns:
+             The format and settings of encoded images
+        """
+        return f"PNG{'8' if self._indexed else ''}/{self._max_bytes}"
+
+    @staticmethod
+    def background(dark_mode: bool) -> QColor:
+        """
+
+        Args:
+            dark_mode: Image is inverted like the screen
+
+        Returns:
+             The background color of images
+        """
+        background = QColor(BACKGROUND_COLOR)
+        if dark_mode:
+            background = QColor(255 - background.red(), 255 - background.green(), 255 - background.blue())
+        return background
+
+    def ink_colors(self) -> typing.List[QColor]:
+        """
+        Lines keep the color they were stored with and the
+        image is inverted in dark mode, so ink drawn in the
+        other mode shows as the inverted pen color
+
+        Returns:
+             The pen colors then their inverses, no duplicates
+        """
+        ink_colors = []
+        for color in self._palette + [QColor(255 - color.red(), 255 - color.green(), 255 - color.blue())
+                                      for color in self._palette]:
+            if color.rgb() not in [ink_color.rgb() for ink_color in ink_colors]:
+                ink_colors.append(color)
+        return ink_colors
+
+    def color_table(self, dark_mode: bool) -> typing.List[int]:
+        """
+        Background, then each ink color and its shades
+
+        Args:
+            dark_mode: Image is inverted like the screen
+
+        Returns:
+             The rgb of every palette entry, no duplicates
+        """
+        background = self.background(dark_mode)
+        table = [background.rgb()]
+        for color in self.ink_colors():
+            for level in range(1, PALETTE_LEVELS + 1):
+                fraction = level / PALETTE_LEVELS
+                shade = QColor(round(background.red() + (color.red() - background.red()) * fraction),
+                               round(background.green() + (color.green() - background.green()) * fraction),
+                               round(background.blue() + (color.blue() - background.blue()) * fraction))
+                if shade.rgb() not in table:
+                    table.append(shade.rgb())
+        return table
+
+    def quantize(self, image: QImage, dark_mode: bool) -> QImage:
+        """
+        Map every pixel to the nearest palette entry without dithering
+
+        Args:
+            image: The rendered image
+            dark_mode: Image is inverted like the screen
+
+        Returns:
+             The indexed image
+        """
+        return image.convertToFormat(QImage.Format_Indexed8, self.color_table(dark_mode),
+                                     Qt.ThresholdDither | Qt.AvoidDither)
+
+    @staticmethod
+    def strip_height(width: int) -> int:
+        """
+
+        Args:
+            width: Pixel width of image
+
+        Returns:
+             The number of rows rendered at a time
+        """
+        return max(1, STRIP_BYTES // (max(width, 1) * 4))
+
+    def encode_strips(self, render: typing.Callable[[float, QRect], QImage], fraction: float, image_size: QSize,
+                      quality: int, dark_mode: bool, max_bytes: int = 0) -> typing.Optional[QByteArray]:
+        """
+        Render the image a strip at a time and stream each
+        strip to the PNG writer. Stops once the file is
+        over max_bytes since it can only grow.
+
+        Args:
+            render: Renders a strip of the image at a fraction of full size
+            fraction: The fraction of full size
+            image_size: The size of image at fraction
+            quality: 0 to 100 trading size for speed, -1 for default
+            dark_mode: Image is inverted like the screen
+            max_bytes: Largest file size wanted, 0 for no limit
+
+        Returns:
+             The PNG file, empty if image is empty, None if it was over max_bytes
+        """
+        if image_size.isEmpty():
+            return QByteArray()
+        width, height = image_size.width(), image_size.height()
+        color_table = self.color_table(dark_mode) if self._indexed else None
+        writer = PngWriter(width, height, color_table, quality)
+        rows = self.strip_height(width)
+        for top in range(0, height, rows):
+            image = render(fraction, QRect(0, top, width, min(rows, height - top)))
+            if self._indexed:
+                writer.add_rows(self.quantize(image, dark_mode))
+            else:
+                writer.add_rows(image.convertToFormat(QImage.Format_RGB888))
+            if 0 < max_bytes < writer.size:
+                return None
+        return writer.finish()
+
+    def encode(self, render: typing.Callable[[float, QRect], QImage], size: typing.Callable[[float], QSize],
+               dark_mode: bool) -> typing.Tuple[QByteArray, float]:
+        """
+        Encode the image, searching for settings that fit the
+        byte budget. The smallest setting is used if none fit.
+
+        Args:
+            render: Renders a strip of the image at a fraction of full size
+            size: Gives the size of image at a fraction of full size
+            dark_mode: Image is inverted like the screen
+
+        Returns:
+             The PNG file, empty if encoding failed, and the fraction of full size used
+        """
+        steps = ENCODE_STEPS if self._max_bytes > 0 else ENCODE_STEPS[:1]
+        data: typing.Optional[QByteArray] = None
+        fraction = 0.0
+        for step, (fraction, quality) in enumerate(steps):
+            # Last step is kept even if too big
+            max_bytes = self._max_bytes if step < len(steps) - 1 else 0
+            data = self.encode_strips(render, fraction, size(fraction), quality, dark_mode, max_bytes)
+            if data is not None:
+                break
+        return data if data is not None else QByteArray(), fraction
+
+
+if __name__ == "__main__":
+    pass
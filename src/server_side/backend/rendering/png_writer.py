@@ -0,0 +1,134 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import struct
+import typing
+import zlib
+from PyQt5.QtCore import QByteArray
+from PyQt5.QtGui import QImage
+
+PNG_SIGNATURE: bytes = b'\x89PNG\r\n\x1a\n'
+# Compressed bytes buffered before they are written as a chunk
+IDAT_SIZE: int = 65536
+COLOR_TYPE_RGB: int = 2
+COLOR_TYPE_INDEXED: int = 3
+
+
+class PngWriter:
+    """
+    Writes a PNG a strip of rows at a time so the whole image
+    never has to be in memory, only the compressed file.
+    Rows are indexed into a color table or are RGB, and are
+    not filtered since whiteboards are mostly flat color.
+
+    """
+
+    def __init__(self, width: int, height: int, color_table: typing.Optional[typing.List[int]] = None,
+                 quality: int = -1) -> None:
+        self._width: int = width
+        self._height: int = height
+        self._indexed: bool = color_table is not None
+        self._num_rows: int = 0
+        self._data: bytearray = bytearray(PNG_SIGNATURE)
+        self._pending: bytearray = bytearray()
+        # Same trade as Qt, quality 0 is the smallest and slowest
+        level = -1 if quality < 0 else (100 - min(quality, 100)) * 9 // 100
+        self._compressor = zlib.compressobj(level)
+        color_type = COLOR_TYPE_INDEXED if self._indexed else COLOR_TYPE_RGB
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+        if color_table is not None:
+            self.write_chunk(b'PLTE', b''.join(struct.pack('>BBB', (rgb >> 16) & 0xff, (rgb >> 8) & 0xff, rgb & 0xff)
+                                               for rgb in color_table))
+
+    @property
+    def num_rows(self) -> int:
+        """
+
+        Returns:
+             The number of rows added
+        """
+        return self._num_rows
+
+    @property
+    def size(self) -> int:
+        """
+        Grows as rows are added, used to stop early
+        once an image is over its byte budget
+
+        Returns:
+             The bytes of file written so far
+        """
+        return len(self._data) + len(self._pending)
+
+    def write_chunk(self, chunk_type: bytes, payload: bytes) -> None:
+        """
+
+        Args:
+            chunk_type: The four letter chunk type
+            payload: The chunk data
+
+        Returns:
+
+        """
+        self._data += struct.pack('>I', len(payload))
+        self._data += chunk_type
+        self._data += payload
+        self._data += struct.pack('>I', zlib.crc32(payload, zlib.crc32(chunk_type)))
+
+    def add_rows(self, image: QImage) -> None:
+        """
+        Compress the rows of a strip, the next rows of the file
+
+        Args:
+            image: Indexed8 strip if writer has a color table, else RGB888, as wide as the file
+
+        Returns:
+
+        """
+        row_bytes = self._width if self._indexed else self._width * 3
+        bytes_per_line = image.bytesPerLine()
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        buffer = bits.asstring()
+        # Filter byte 0 then the row without padding
+        rows = b''.join(b'\x00' + buffer[y * bytes_per_line:y * bytes_per_line + row_bytes]
+                        for y in range(image.height()))
+        self._pending += self._compressor.compress(rows)
+        self._num_rows += image.height()
+        if len(self._pending) >= IDAT_SIZE:
+            self.write_chunk(b'IDAT', bytes(self._pending))
+            self._pending.clear()
+
+    def finish(self) -> QByteArray:
+        """
+        Flush the compressed rows and end the file
+
+        Returns:
+             The PNG file, empty if not every row was added
+        """
+        if self._num_rows != self._height:
+            return QByteArray()
+        self._pending += self._compressor.flush()
+        self.write_chunk(b'IDAT', bytes(self._pending))
+        self._pending.clear()
+        self.write_chunk(b'IEND', b'')
+        return QByteArray(bytes(self._data))
+
+
+if __name__ == "__main__":
+    pass
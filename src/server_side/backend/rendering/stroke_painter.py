@@ -0,0 +1,289 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import typing
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QPolygon, QImage
+
+from src.server_side.backend.lines.line import ColorLine, RGB_MASK
+from src.server_side.backend.rendering.stroke_shape import StrokeShape
+
+PEN_WIDTH: int = 2
+# Lines are stored as they look in light mode
+BACKGROUND_COLOR: QColor = QColor('white')
+
+
+class StrokePainter:
+    """
+    Paints color lines with one draw call per line.
+    Pens are cached per color and consecutive lines of the
+    same color share painter state. Lines with widths and
+    smooth lines are drawn from a shape cached on the line.
+
+    """
+
+    def __init__(self, pen_width: int = PEN_WIDTH, cosmetic: bool = False) -> None:
+        super().__init__()
+        self._pen_width: int = pen_width
+        # Cosmetic pens keep their pixel width when scaled down
+        self._cosmetic: bool = cosmetic
+        self._pens: typing.Dict[int, QPen] = {}
+        self._brushes: typing.Dict[int, QBrush] = {}
+
+    def get_pen(self, rgba: int) -> QPen:
+        """
+        Get the cached pen for a color
+
+        Args:
+            rgba: The packed rgba color of the pen
+
+        Returns:
+             The pen
+        """
+        pen = self._pens.get(rgba)
+        if pen is None:
+            pen = QPen(QColor.fromRgba(rgba), self._pen_width, Qt.SolidLine, Qt.SquareCap, Qt.BevelJoin)
+            pen.setCosmetic(self._cosmetic)
+            self._pens[rgba] = pen
+        return pen
+
+    def get_brush(self, rgba: int) -> QBrush:
+        """
+        Get the cached brush for a color
+
+        Args:
+            rgba: The packed rgba color of the brush
+
+        Returns:
+             The brush
+        """
+        brush = self._brushes.get(rgba)
+        if brush is None:
+            brush = QBrush(QColor.fromRgba(rgba))
+            self._brushes[rgba] = brush
+        return brush
+
+    def is_smooth(self, color_line: ColorLine) -> bool:
+        """
+        Check if line is stroked as a curve. Zoomed out cosmetic
+        pens draw straight segments, too small to see the curve.
+
+        Args:
+            color_line: The line to paint
+
+        Returns:
+             True if line is smooth with more than two points and painter is not cosmetic
+        """
+        return not self._cosmetic and color_line.smooth and color_line.num_points > 2
+
+    def is_filled(self, color_line: ColorLine) -> bool:
+        """
+        Check if line is filled as an outline instead of drawn with
+        the pen. Cosmetic pens are used when zoomed out where the
+        outline would be thinner than a pixel.
+
+        Args:
+            color_line: The line to paint
+
+        Returns:
+             True if line has widths and painter is not cosmetic
+        """
+        return not self._cosmetic and color_line.variable_width
+
+    def set_color(self, rgba: int, filled: bool, painter: QPainter) -> None:
+        """
+        Set the pen or brush of painter for the next lines
+
+        Args:
+            rgba: The packed rgba color of lines
+            filled: True if lines are filled outlines
+            painter: The painter to use for lines
+
+        Returns:
+
+        """
+        if filled:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.get_brush(rgba))
+        else:
+            painter.setPen(self.get_pen(rgba))
+            # Paths would otherwise be filled
+            painter.setBrush(Qt.NoBrush)
+
+    def paint_line(self, color_line: ColorLine, painter: QPainter, invert: bool = False) -> None:
+        """
+        Paint single line
+
+        Args:
+            color_line: The line to paint
+            painter: The painter to use for line
+            invert: Paint with the inverted line color
+
+        Returns:
+
+        """
+        if color_line.num_points == 0:
+            return
+        rgba = color_line.rgba ^ RGB_MASK if invert else color_line.rgba
+        filled = self.is_filled(color_line)
+        self.set_color(rgba, filled, painter)
+        self.draw_stroke(color_line, painter, filled)
+
+    def paint_lines(self, color_lines: typing.Iterable[ColorLine], painter: QPainter, min_size: float = 0) -> None:
+        """
+        Paint many lines in order. The pen is only changed when
+        the color changes so runs of same color lines share state.
+        Lines are not reordered by color because that would
+        change which line is on top where lines cross.
+
+        Args:
+            color_lines: The lines to paint
+            painter: The painter to use for lines
+            min_size: Lines no larger than this in both directions
+                are drawn as a dot. Used when zoomed out.
+
+        Returns:
+
+        """
+        current_state = None
+        for color_line in color_lines:
+            if color_line.num_points == 0:
+                continue
+            filled = self.is_filled(color_line)
+            if (color_line.rgba, filled) != current_state:
+                current_state = (color_line.rgba, filled)
+                self.set_color(color_line.rgba, filled, painter)
+            if min_size > 0 and not filled and color_line.num_points > 1:
+                bounds = color_line.bounding_rect()
+                if bounds.width() <= min_size and bounds.height() <= min_size:
+                    painter.drawPoint(bounds.center())
+                    continue
+            self.draw_stroke(color_line, painter, filled, finished=True)
+
+    def render_image(self, rect: QRect, color_lines: typing.Iterable[ColorLine], scale: float = 1.0,
+                     chunks: typing.Iterable[typing.Tuple[QRect, QImage]] = (), antialias: bool = True,
+                     strip: typing.Optional[QRect] = None) -> QImage:
+        """
+        Paint lines into a new opaque image covering rect.
+        Lines that would fit inside one pixel are drawn as dots.
+
+        Args:
+            rect: The region of the drawing surface to render
+            color_lines: The lines to paint
+            scale: Image pixels per drawing surface unit
+            chunks: Flattened ink painted under the lines,
+                each image covering its rect
+            antialias: Smooth edges of lines, slower
+            strip: Only render these pixels of the image, pixels
+                are the same as in the image rendered whole
+
+        Returns:
+             The image, size of rect times scale or of strip
+        """
+        if strip is None:
+            strip = QRect(0, 0, round(rect.width() * scale), round(rect.height() * scale))
+        image = QImage(strip.size(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(BACKGROUND_COLOR)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing, antialias)
+        painter.translate(-strip.topLeft())
+        painter.scale(scale, scale)
+        painter.translate(-rect.topLeft())
+        if scale != 1:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for chunk_rect, chunk_image in chunks:
+            painter.drawImage(chunk_rect, chunk_image)
+        self.paint_lines(color_lines, painter, 1 / scale if scale < 1 else 0)
+        painter.end()
+        return image
+
+    def get_shape(self, color_line: ColorLine) -> StrokeShape:
+        """
+        Get the shape cached on a line, made on first use
+
+        Args:
+            color_line: The line to paint
+
+        Returns:
+             The shape
+        """
+        shape = color_line.shape
+        if shape is None:
+            shape = StrokeShape(color_line.smooth)
+            color_line.shape = shape
+        return shape
+
+    def draw_stroke(self, color_line: ColorLine, painter: QPainter, filled: bool, finished: bool = False) -> None:
+        """
+        Draw line as its cached outline or curve,
+        or as a polyline with the pen
+
+        Args:
+            color_line: The line to draw
+            painter: The painter with pen or brush already set
+            filled: True if line is filled as an outline
+            finished: True if no points will be added to line.
+                Finished shapes are made on their own and then
+                cached so threads painting the same line never
+                extend one shape at once.
+
+        Returns:
+
+        """
+        if not filled and not self.is_smooth(color_line):
+            self.draw_line(color_line, painter)
+            return
+        if finished:
+            shape = color_line.shape
+            if shape is None or shape.num_points != color_line.num_points:
+                shape = StrokeShape(color_line.smooth)
+        else:
+            shape = self.get_shape(color_line)
+        if filled:
+            painter.drawPolygon(shape.outline(color_line), Qt.WindingFill)
+        else:
+            painter.drawPath(shape.path(color_line))
+        if finished:
+            shape.release()
+            color_line.shape = shape
+
+    @staticmethod
+    def draw_line(color_line: ColorLine, painter: QPainter) -> None:
+        """
+        Draw line with the current pen.
+        A single point is drawn as a dot.
+
+        Args:
+            color_line: The line to draw
+            painter: The painter with pen already set
+
+        Returns:
+
+        """
+        coords = color_line.coords
+        if len(coords) == 2:
+            painter.drawPoint(coords[0], coords[1])
+        else:
+            # Whole line in one call instead of segment by segment
+            polygon = QPolygon()
+            polygon.setPoints(coords.tolist())
+            painter.drawPolyline(polygon)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,266 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+import math
+import typing
+from array import array
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QPainterPath, QPolygonF
+
+from src.server_side.backend.lines.line import Line
+
+# Points on each round cap of a variable width line
+CAP_POINTS: int = 4
+# Curve segments are outlined in steps about this many pixels long
+STEP_LENGTH: float = 4.0
+MAX_STEPS: int = 8
+
+
+def curve_controls(coords: array, i: int) -> typing.Tuple[float, float, float, float]:
+    """
+    Control points of the Bézier segment from point i to i + 1
+    of the Catmull-Rom curve through coords. The first and last
+    points are repeated at the ends. Controls are kept inside
+    the bounds of the four points so the curve never leaves
+    the bounding rect of line that dirty rects and tiles use.
+
+    Args:
+        coords: The interleaved x, y coordinates of a line
+        i: The index of the segment start point
+
+    Returns:
+         The x, y of the first and second control points
+    """
+    last = len(coords) // 2 - 1
+    prev_i = max(0, i - 1)
+    next_i = min(last, i + 2)
+    x0, y0 = coords[2 * prev_i], coords[2 * prev_i + 1]
+    x1, y1, x2, y2 = coords[2 * i:2 * i + 4]
+    x3, y3 = coords[2 * next_i], coords[2 * next_i + 1]
+    min_x, max_x = min(x0, x1, x2, x3), max(x0, x1, x2, x3)
+    min_y, max_y = min(y0, y1, y2, y3), max(y0, y1, y2, y3)
+    return (min(max_x, max(min_x, x1 + (x2 - x0) / 6)), min(max_y, max(min_y, y1 + (y2 - y0) / 6)),
+            min(max_x, max(min_x, x2 - (x3 - x1) / 6)), min(max_y, max(min_y, y2 - (y3 - y1) / 6)))
+
+
+class StrokeShape:
+    """
+    The shape a line is painted with, made once and cached on
+    the line. Lines with widths are filled as an outline polygon
+    and smooth lines are stroked as a Catmull-Rom curve. Parts
+    of the shape are settled once every point they depend on is
+    known, so while a line is drawn only its tail is made again.
+    Points may only be added to a line while its shape is cached.
+
+    """
+
+    def __init__(self, smooth: bool = False) -> None:
+        super().__init__()
+        self._smooth: bool = smooth
+        self._num_points: int = 0
+        self._path: typing.Optional[QPainterPath] = None
+        self._outline: typing.Optional[QPolygonF] = None
+        # Settled parts, dropped once the line is finished
+        self._settled_path: typing.Optional[QPainterPath] = None
+        self._left_side: typing.Optional[typing.List[QPointF]] = None
+        self._right_side: typing.Optional[typing.List[QPointF]] = None
+        self._num_settled: int = 0
+        self._start_angle: float = 0.0
+        self._settled_angle: float = 0.0
+
+    @property
+    def smooth(self) -> bool:
+        """
+
+        Returns:
+             True if line is painted as a curve
+        """
+        return self._smooth
+
+    @property
+    def num_points(self) -> int:
+        """
+
+        Returns:
+             The number of line points the cached shape was made for
+        """
+        return self._num_points
+
+    def path(self, color_line: Line) -> QPainterPath:
+        """
+        The curve through the points of a line
+
+        Args:
+            color_line: The line, with at least one point
+
+        Returns:
+             The path to stroke with the pen
+        """
+        coords = color_line.coords
+        num_points = len(coords) // 2
+        if self._path is not None and self._num_points == num_points:
+            return self._path
+        if self._settled_path is None:
+            self._settled_path = QPainterPath(QPointF(coords[0], coords[1]))
+            self._num_settled = 0
+        # Segment i bends towards point i + 2 so the last segment is not settled
+        for i in range(self._num_settled, num_points - 2):
+            c1x, c1y, c2x, c2y = curve_controls(coords, i)
+            self._settled_path.cubicTo(c1x, c1y, c2x, c2y, coords[2 * i + 2], coords[2 * i + 3])
+            self._num_settled = i + 1
+        path = QPainterPath(self._settled_path)
+        if num_points > 1:
+            c1x, c1y, c2x, c2y = curve_controls(coords, num_points - 2)
+            path.cubicTo(c1x, c1y, c2x, c2y, coords[-2], coords[-1])
+        self._path = path
+        self._num_points = num_points
+        return path
+
+    def outline(self, color_line: Line) -> QPolygonF:
+        """
+        The polygon around a variable width line. Both ends of each
+        step are offset by half their width along the normal of the
+        step, which leaves a bevel at every turn. Both ends of line
+        are rounded. The outline crosses itself on the inside of
+        turns so it must be filled with the winding rule.
+
+        Args:
+            color_line: The line, with a width per point
+
+        Returns:
+             The outline polygon
+        """
+        coords = color_line.coords
+        num_points = len(coords) // 2
+        if self._outline is not None and self._num_points == num_points:
+            return self._outline
+        radii = [width / 2 for width in color_line.widths]
+        if num_points == 1:
+            num_sides = CAP_POINTS * 2
+            outline = QPolygonF([QPointF(coords[0] + radii[0] * math.cos(2 * math.pi * i / num_sides),
+                                         coords[1] + radii[0] * math.sin(2 * math.pi * i / num_sides))
+                                 for i in range(num_sides)])
+        else:
+            if self._left_side is None:
+                self._left_side, self._right_side = [], []
+                self._num_settled = 0
+            # Straight segments only depend on their ends
+            num_settled = num_points - 2 if self._smooth else num_points - 1
+            for i in range(self._num_settled, num_settled):
+                start_angle, self._settled_angle = self.add_segment(coords, radii, i, self._left_side,
+                                                                    self._right_side, self._settled_angle)
+                if i == 0:
+                    self._start_angle = start_angle
+                self._num_settled = i + 1
+            left_tail = []
+            right_tail = []
+            end_angle = self._settled_angle
+            start_angle = self._start_angle
+            for i in range(self._num_settled, num_points - 1):
+                tail_start_angle, end_angle = self.add_segment(coords, radii, i, left_tail, right_tail, end_angle)
+                if i == 0:
+                    start_angle = tail_start_angle
+            points = self._left_side + left_tail
+            points.extend(self.make_cap(coords[-2], coords[-1], radii[-1], end_angle + math.pi / 2))
+            points.extend(reversed(right_tail))
+            points.extend(reversed(self._right_side))
+            points.extend(self.make_cap(coords[0], coords[1], radii[0], start_angle - math.pi / 2))
+            outline = QPolygonF(points)
+        self._outline = outline
+        self._num_points = num_points
+        return outline
+
+    def add_segment(self, coords: array, radii: typing.List[float], i: int, left_side: typing.List[QPointF],
+                    right_side: typing.List[QPointF], angle: float) -> typing.Tuple[float, float]:
+        """
+        Add the sides of the segment from point i to i + 1.
+        Curved segments are split into short straight steps.
+
+        Args:
+            coords: The interleaved x, y coordinates of line
+            radii: Half the width at each point
+            i: The index of the segment start point
+            left_side: Points left of the line
+            right_side: Points right of the line
+            angle: Direction of the previous step, kept by repeated points
+
+        Returns:
+             The direction of the first and last step
+        """
+        x1, y1, x2, y2 = coords[2 * i:2 * i + 4]
+        r1, r2 = radii[i], radii[i + 1]
+        num_steps = 1
+        if self._smooth:
+            c1x, c1y, c2x, c2y = curve_controls(coords, i)
+            num_steps = min(MAX_STEPS, 1 + int(math.hypot(x2 - x1, y2 - y1) / STEP_LENGTH))
+        first_angle = None
+        last_x, last_y, last_radius = x1, y1, r1
+        for step in range(1, num_steps + 1):
+            t = step / num_steps
+            if num_steps == 1:
+                x, y = x2, y2
+            else:
+                u = 1 - t
+                x = u * u * u * x1 + 3 * u * u * t * c1x + 3 * u * t * t * c2x + t * t * t * x2
+                y = u * u * u * y1 + 3 * u * u * t * c1y + 3 * u * t * t * c2y + t * t * t * y2
+            radius = r1 + (r2 - r1) * t
+            if x != last_x or y != last_y:
+                angle = math.atan2(y - last_y, x - last_x)
+            if first_angle is None:
+                first_angle = angle
+            normal_x, normal_y = -math.sin(angle), math.cos(angle)
+            left_side.append(QPointF(last_x + normal_x * last_radius, last_y + normal_y * last_radius))
+            left_side.append(QPointF(x + normal_x * radius, y + normal_y * radius))
+            right_side.append(QPointF(last_x - normal_x * last_radius, last_y - normal_y * last_radius))
+            right_side.append(QPointF(x - normal_x * radius, y - normal_y * radius))
+            last_x, last_y, last_radius = x, y, radius
+        return first_angle, angle
+
+    @staticmethod
+    def make_cap(x: int, y: int, radius: float, start_angle: float) -> typing.List[QPointF]:
+        """
+        Points of a half circle between the two sides of a line end
+
+        Args:
+            x: The x coordinate of line end
+            y: The y coordinate of line end
+            radius: Half the width at line end
+            start_angle: Angle of the side the cap starts from
+
+        Returns:
+             The points between the sides
+        """
+        step = math.pi / CAP_POINTS
+        return [QPointF(x + radius * math.cos(start_angle - step * i), y + radius * math.sin(start_angle - step * i))
+                for i in range(1, CAP_POINTS)]
+
+    def release(self) -> None:
+        """
+        Drop the settled parts once the line is finished so only
+        the finished shape is kept. Adding more points after this
+        makes the whole shape again.
+
+        Returns:
+
+        """
+        self._settled_path = None
+        self._left_side = None
+        self._right_side = None
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,577 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import math
+import typing
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRect, QRectF, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.raster_layer import Chunk
+from src.server_side.backend.rendering.stroke_painter import StrokePainter, PEN_WIDTH
+
+TILE_SIZE: int = 256
+# Least recently painted tiles are dropped past this many until fitted to a view
+MAX_TILES: int = 256
+# Tiles kept per tile a view can show, so panning back is still cached
+VIEW_TILES: int = 2
+
+# Mip level, tile x, tile y
+TileKey = typing.Tuple[int, int, int]
+
+
+class TileRenderTask(QRunnable):
+    """
+    Renders one tile on a thread pool thread.
+    Result is emitted through the tile cache signal
+    so it is handled on the GUI thread.
+
+    """
+
+    def __init__(self, cache: 'TileCache', key: TileKey, generation: int, rect: QRect,
+                 color_lines: typing.List[ColorLine], chunks: typing.Sequence[Chunk] = (),
+                 antialias: bool = True) -> None:
+        super().__init__()
+        self._cache: TileCache = cache
+        self._key: TileKey = key
+        self._generation: int = generation
+        self._rect: QRect = rect
+        self._color_lines: typing.List[ColorLine] = color_lines
+        self._chunks: typing.Sequence[Chunk] = chunks
+        self._antialias: bool = antialias
+        self._scale: float = TileCache.level_scale(key[0])
+        self._cosmetic: bool = key[0] > 0
+
+    def run(self) -> None:
+        """
+        Render the tile. QImage and QPainter are
+        safe to use off the GUI thread.
+
+        Returns:
+
+        """
+        # Pens are cached so each thread needs its own painter
+        image = StrokePainter(cosmetic=self._cosmetic).render_image(self._rect, self._color_lines, self._scale,
+                                                                    self._chunks, self._antialias)
+        self._cache.tile_rendered_signal.emit(self._key, self._generation, image, self._antialias)
+
+
+class TileCache(QObject):
+    """
+    Drawing surface split into fixed size tiles, each with its
+    own cached image. Invalidating a region only marks the tiles
+    it touches dirty and only those tiles are rendered again.
+
+    Tiles are kept per mip level. A tile of level n covers
+    tile_size * 2**n world units at tile_size pixels, so zoomed
+    out views paint a bounded number of tiles. Only the most
+    recently painted tiles are kept.
+
+    While antialiasing is off tiles are rendered fast and kept
+    as drafts, which are rendered again once it is turned on.
+
+    With threads, tiles with ink are never rendered while
+    painting. Missing tiles are painted from another mip
+    level until they are ready.
+
+    """
+
+    tile_rendered_signal: pyqtSignal = pyqtSignal(object, int, QImage, bool)
+    tile_ready_signal: pyqtSignal = pyqtSignal(QRect)
+
+    def __init__(self, line_list: LineList, tile_size: int = TILE_SIZE, use_threads: bool = True,
+                 max_tiles: int = MAX_TILES) -> None:
+        super().__init__()
+        self._line_list: LineList = line_list
+        self._tile_size: int = tile_size
+        self._use_threads: bool = use_threads
+        self._max_tiles: int = max_tiles
+        # Owned by cache so its tasks can be waited for before it is deleted
+        self._thread_pool: QThreadPool = QThreadPool(self)
+        self._stroke_painter: StrokePainter = StrokePainter()
+        # Zoomed out tiles keep lines visible instead of thinner than a pixel
+        self._mip_painter: StrokePainter = StrokePainter(cosmetic=True)
+        # Ordered from least to most recently painted
+        self._tiles: typing.OrderedDict[TileKey, QImage] = OrderedDict()
+        self._dirty: typing.Set[TileKey] = set()
+        self._pending: typing.Set[TileKey] = set()
+        self._generations: typing.Dict[TileKey, int] = {}
+        self._antialias: bool = True
+        # Tiles rendered or painted without antialiasing
+        self._drafts: typing.Set[TileKey] = set()
+        self.tile_rendered_signal.connect(self.tile_rendered_slot)
+
+    @property
+    def tiles(self) -> typing.OrderedDict[TileKey, QImage]:
+        """
+
+        Returns:
+             The cached tile images by tile key
+        """
+        return self._tiles
+
+    @property
+    def thread_pool(self) -> QThreadPool:
+        """
+
+        Returns:
+             The thread pool tiles are rendered on
+        """
+        return self._thread_pool
+
+    @property
+    def max_tiles(self) -> int:
+        """
+
+        Returns:
+             The most tiles kept before the least recently painted are dropped
+        """
+        return self._max_tiles
+
+    @property
+    def dirty(self) -> typing.Set[TileKey]:
+        """
+
+        Returns:
+             The keys of tiles that must be rendered again
+        """
+        return self._dirty
+
+    @property
+    def drafts(self) -> typing.Set[TileKey]:
+        """
+
+        Returns:
+             The keys of tiles rendered without antialiasing
+        """
+        return self._drafts
+
+    @property
+    def antialias(self) -> bool:
+        """
+
+        Returns:
+             True if tiles are rendered with antialiasing
+        """
+        return self._antialias
+
+    @antialias.setter
+    def antialias(self, antialias: bool) -> None:
+        """
+        Turn antialiasing of rendered tiles on or off.
+        Draft tiles are only rendered again by refine.
+
+        Returns:
+
+        """
+        self._antialias = antialias
+
+    @staticmethod
+    def level_scale(level: int) -> float:
+        """
+        Tile pixels per world unit at a mip level
+
+        Args:
+            level: The mip level
+
+        Returns:
+             The scale
+        """
+        return 2.0 ** -level
+
+    def level_size(self, level: int) -> int:
+        """
+        World units covered by one side of a tile at a mip level
+
+        Args:
+            level: The mip level
+
+        Returns:
+             The size
+        """
+        return max(1, round(self._tile_size / self.level_scale(level)))
+
+    def stroke_painter(self, level: int) -> StrokePainter:
+        """
+        Get the painter for tiles of a mip level
+
+        Args:
+            level: The mip level
+
+        Returns:
+             The stroke painter
+        """
+        return self._mip_painter if level > 0 else self._stroke_painter
+
+    @staticmethod
+    def level_margin(level: int) -> int:
+        """
+        World units a line can paint outside its bounds at a
+        mip level. Zoomed out tiles use a cosmetic pen which
+        is wider than the pen in world units.
+
+        Args:
+            level: The mip level
+
+        Returns:
+             The margin
+        """
+        return PEN_WIDTH << max(0, level)
+
+    def tile_rect(self, key: TileKey) -> QRect:
+        """
+        The region of the drawing surface covered by a tile
+
+        Args:
+            key: The tile key
+
+        Returns:
+             The tile rect
+        """
+        size = self.level_size(key[0])
+        return QRect(key[1] * size, key[2] * size, size, size)
+
+    def tile_keys(self, rect: QRect, level: int = 0) -> typing.Iterator[TileKey]:
+        """
+        Yield the keys of tiles touched by rect
+
+        Args:
+            rect: The region of the drawing surface
+            level: The mip level of tiles
+
+        Yields:
+             The tile keys
+        """
+        size = self.level_size(level)
+        for tile_y in range(rect.top() // size, rect.bottom() // size + 1):
+            for tile_x in range(rect.left() // size, rect.right() // size + 1):
+                yield level, tile_x, tile_y
+
+    def cached_levels(self) -> typing.Set[int]:
+        """
+
+        Returns:
+             The mip levels that have cached tiles or tiles being rendered
+        """
+        return {key[0] for key in self._tiles} | {key[0] for key in self._pending}
+
+    def lines_for_tile(self, key: TileKey) -> typing.List[ColorLine]:
+        """
+        Get lines that may paint into a tile
+
+        Args:
+            key: The tile key
+
+        Returns:
+             The lines in paint order
+        """
+        margin = self.level_margin(key[0])
+        rect = self.tile_rect(key).adjusted(-margin, -margin, margin, margin)
+        return self._line_list.query_rect(rect)
+
+    def invalidate(self, rect: QRect) -> None:
+        """
+        Mark the cached tiles touched by rect dirty.
+        Tiles being rendered are marked too so their
+        results are dropped.
+
+        Args:
+            rect: The region that changed
+
+        Returns:
+
+        """
+        for level in self.cached_levels():
+            margin = self.level_margin(level) - PEN_WIDTH
+            for key in self.tile_keys(rect.adjusted(-margin, -margin, margin, margin), level):
+                if key in self._tiles or key in self._pending:
+                    self._dirty.add(key)
+                    self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        """
+        Drop all cached tiles
+
+        Returns:
+
+        """
+        self._tiles.clear()
+        self._dirty.clear()
+        self._pending.clear()
+        self._drafts.clear()
+        for key in self._generations:
+            self._generations[key] += 1
+
+    def commit_line(self, color_line: ColorLine, rect: QRect) -> None:
+        """
+        Paint a new line into the cached tiles it touches.
+        Tiles being rendered on a thread will not have the
+        line so they are marked dirty again instead.
+
+        Args:
+            color_line: The line that was added
+            rect: The bounds of line padded by pen width
+
+        Returns:
+
+        """
+        for level in self.cached_levels():
+            scale = self.level_scale(level)
+            margin = self.level_margin(level) - PEN_WIDTH
+            for key in self.tile_keys(rect.adjusted(-margin, -margin, margin, margin), level):
+                if key in self._pending:
+                    self.invalidate(self.tile_rect(key))
+                    continue
+                image = self._tiles.get(key)
+                if image is None:
+                    continue
+                painter = QPainter(image)
+                painter.setRenderHint(QPainter.Antialiasing, self._antialias)
+                painter.scale(scale, scale)
+                painter.translate(-self.tile_rect(key).topLeft())
+                self.stroke_painter(level).paint_lines([color_line], painter, 1 / scale if scale < 1 else 0)
+                painter.end()
+                self.mark_quality(key, self._antialias)
+
+    def render_tile(self, key: TileKey) -> None:
+        """
+        Render a tile on the GUI thread
+
+        Args:
+            key: The tile key
+
+        Returns:
+
+        """
+        tile_rect = self.tile_rect(key)
+        self._tiles[key] = self.stroke_painter(key[0]).render_image(tile_rect, self.lines_for_tile(key),
+                                                                    self.level_scale(key[0]),
+                                                                    self._line_list.raster_layer.chunks(tile_rect),
+                                                                    self._antialias)
+        self._dirty.discard(key)
+        self.mark_quality(key, self._antialias)
+
+    def make_task(self, key: TileKey) -> typing.Optional[TileRenderTask]:
+        """
+        Make the task that renders a dirty or missing tile on
+        the thread pool. The stale image or another mip level
+        is painted until it is ready. Missing tiles without
+        ink are only a fill so they are rendered now instead.
+
+        Args:
+            key: The tile key
+
+        Returns:
+             The task to start, None if tile is already being rendered or was rendered now
+        """
+        if key in self._pending:
+            return None
+        tile_rect = self.tile_rect(key)
+        color_lines = self.lines_for_tile(key)
+        chunks = self._line_list.raster_layer.chunks(tile_rect)
+        if key not in self._tiles and len(color_lines) == 0 and len(chunks) == 0:
+            self._tiles[key] = self.stroke_painter(key[0]).render_image(tile_rect, [], self.level_scale(key[0]))
+            self._dirty.discard(key)
+            self.mark_quality(key, True)
+            return None
+        self._pending.add(key)
+        # Kept so clearing drops the result of a missing tile too
+        self._generations.setdefault(key, 0)
+        return TileRenderTask(self, key, self._generations[key], tile_rect, color_lines, chunks, self._antialias)
+
+    def wait_for_done(self) -> None:
+        """
+        Wait for tiles being rendered. Must be called before
+        cache is deleted since its thread pool would otherwise
+        wait for tasks that need the GIL to finish.
+
+        Returns:
+
+        """
+        self._thread_pool.waitForDone()
+
+    def tile_rendered_slot(self, key: TileKey, generation: int, image: QImage, antialias: bool) -> None:
+        """
+        Slot called on GUI thread when a thread finishes a tile.
+        Result is dropped if the tile changed while rendering.
+
+        Args:
+            key: The tile key
+            generation: The generation of tile when task started
+            image: The rendered tile
+            antialias: True if tile was rendered with antialiasing
+
+        Returns:
+
+        """
+        if key not in self._pending:
+            # Cleared while rendering
+            return
+        self._pending.discard(key)
+        if generation == self._generations.get(key, 0):
+            self._tiles[key] = image
+            self._dirty.discard(key)
+            self.mark_quality(key, antialias)
+        # Stale tiles get scheduled again on the next paint
+        self.tile_ready_signal.emit(self.tile_rect(key))
+
+    def mark_quality(self, key: TileKey, antialias: bool) -> None:
+        """
+        Keep track of tiles drawn without antialiasing
+
+        Args:
+            key: The tile key
+            antialias: True if tile image was drawn with antialiasing
+
+        Returns:
+
+        """
+        if antialias:
+            self._drafts.discard(key)
+        else:
+            self._drafts.add(key)
+
+    def refine(self) -> None:
+        """
+        Mark draft tiles dirty so they are rendered again with
+        antialiasing, on a thread if enabled, the next time they
+        are painted. The region of each is emitted to be repainted.
+
+        Returns:
+
+        """
+        for key in list(self._drafts):
+            if key not in self._tiles:
+                self._drafts.discard(key)
+                continue
+            if key not in self._dirty:
+                self._dirty.add(key)
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self.tile_ready_signal.emit(self.tile_rect(key))
+
+    def evict(self) -> None:
+        """
+        Drop the least recently painted tiles past the max.
+        Generations are kept so running tasks are still dropped.
+
+        Returns:
+
+        """
+        while len(self._tiles) > self._max_tiles:
+            key, _ = self._tiles.popitem(last=False)
+            self._dirty.discard(key)
+            self._drafts.discard(key)
+
+    def fit_view(self, width: int, height: int) -> None:
+        """
+        Keep enough tiles for a view of this size. Tiles are
+        painted at least half size so a view can show twice as
+        many along each side, plus one more when not aligned.
+
+        Args:
+            width: Pixel width of view
+            height: Pixel height of view
+
+        Returns:
+
+        """
+        tiles_x = math.ceil(2 * max(width, 1) / self._tile_size) + 1
+        tiles_y = math.ceil(2 * max(height, 1) / self._tile_size) + 1
+        self._max_tiles = VIEW_TILES * tiles_x * tiles_y
+        self.evict()
+
+    def draw_tile(self, painter: QPainter, key: TileKey, rect: QRect) -> None:
+        """
+        Draw the part of a cached tile inside rect
+
+        Args:
+            painter: The painter of the drawing surface
+            key: The tile key
+            rect: The region to draw in world units
+
+        Returns:
+
+        """
+        scale = self.level_scale(key[0])
+        tile_rect = self.tile_rect(key)
+        target = QRectF(tile_rect.intersected(rect))
+        source = QRectF(target.translated(-tile_rect.topLeft()))
+        source = QRectF(source.topLeft() * scale, source.size() * scale)
+        painter.drawImage(target, self._tiles[key], source)
+
+    def paint_placeholder(self, painter: QPainter, key: TileKey, rect: QRect) -> None:
+        """
+        Paint a tile being rendered from the nearest mip level
+        with every tile over it cached, scaled to fit. Nothing
+        is painted if no level has them, leaving the background.
+
+        Args:
+            painter: The painter of the drawing surface
+            key: The key of tile being rendered
+            rect: The exposed region in world units
+
+        Returns:
+
+        """
+        target = self.tile_rect(key).intersected(rect)
+        for level in sorted(self.cached_levels() - {key[0]}, key=lambda cached: abs(cached - key[0])):
+            keys = list(self.tile_keys(target, level))
+            if all(cached_key in self._tiles for cached_key in keys):
+                for cached_key in keys:
+                    self.draw_tile(painter, cached_key, target)
+                return
+
+    def paint(self, painter: QPainter, rect: QRect, level: int = 0) -> None:
+        """
+        Composite the tiles that touch rect. Dirty tiles and
+        missing tiles with ink are rendered on a thread if
+        enabled, otherwise now. Tasks are started once every
+        tile is drawn so their threads do not take the GIL
+        while painting. Painter maps world units to the widget.
+
+        Args:
+            painter: The painter of the drawing surface
+            rect: The exposed region in world units
+            level: The mip level to paint
+
+        Returns:
+
+        """
+        tasks = []
+        for key in self.tile_keys(rect, level):
+            if key not in self._tiles or key in self._dirty:
+                if self._use_threads:
+                    task = self.make_task(key)
+                    if task is not None:
+                        tasks.append(task)
+                else:
+                    self.render_tile(key)
+            if key not in self._tiles:
+                self.paint_placeholder(painter, key, rect)
+                continue
+            self._tiles.move_to_end(key)
+            self.draw_tile(painter, key, rect)
+        self.evict()
+        for task in tasks:
+            self._thread_pool.start(task)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,166 @@
+"""
+    LCD Whiteboard to create touchscreen whiteboard interface and send MMS.
+    Copyright (C) 2025 Joseph Pettinelli
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program. If not, see https://www.gnu.org/licenses/.
+"""
+
+import math
+import typing
+from PyQt5.QtCore import QPoint, QPointF, QRect, QRectF
+from PyQt5.QtGui import QTransform
+
+MIN_ZOOM: float = 1 / 64
+MAX_ZOOM: float = 4.0
+# Zoom factor of one wheel step
+ZOOM_STEP: float = 1.25
+
+
+class Viewport:
+    """
+    Maps between world coordinates, where lines are stored,
+    and widget coordinates. The widget shows the world scaled
+    by zoom with origin at its top left corner.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._origin: QPointF = QPointF(0, 0)
+        self._zoom: float = 1.0
+
+    @property
+    def origin(self) -> QPointF:
+        """
+        The world point shown at the widget top left corner
+
+        Returns:
+             The origin
+        """
+        return self._origin
+
+    @property
+    def zoom(self) -> float:
+        """
+        Widget pixels per world unit
+
+        Returns:
+             The zoom
+        """
+        return self._zoom
+
+    @property
+    def level(self) -> int:
+        """
+        The mip level of tiles to paint at this zoom. Tiles of
+        level n are rendered at 1 / 2**n pixels per world unit
+        so they are never scaled up when painted.
+
+        Returns:
+             The level, negative when zoomed in
+        """
+        return math.floor(-math.log2(self._zoom))
+
+    @property
+    def transform(self) -> QTransform:
+        """
+        The painter transform from world to widget
+
+        Returns:
+             The transform
+        """
+        zoom = self._zoom
+        return QTransform(zoom, 0, 0, zoom, -self._origin.x() * zoom, -self._origin.y() * zoom)
+
+    def to_world(self, point: typing.Union[QPoint, QPointF]) -> QPoint:
+        """
+        Map a widget point to the nearest world point
+
+        Args:
+            point: The widget point
+
+        Returns:
+             The world point
+        """
+        return (QPointF(point) / self._zoom + self._origin).toPoint()
+
+    def to_world_rect(self, rect: QRect) -> QRect:
+        """
+        Map a widget rect to the world rect that covers it
+
+        Args:
+            rect: The widget rect
+
+        Returns:
+             The world rect
+        """
+        return self.transform.inverted()[0].mapRect(QRectF(rect)).toAlignedRect()
+
+    def to_widget_rect(self, rect: QRect) -> QRect:
+        """
+        Map a world rect to the widget rect that covers it
+
+        Args:
+            rect: The world rect
+
+        Returns:
+             The widget rect
+        """
+        return self.transform.mapRect(QRectF(rect)).toAlignedRect()
+
+    def pan(self, delta: QPoint) -> None:
+        """
+        Move the view so the world follows a drag
+
+        Args:
+            delta: The drag distance in widget pixels
+
+        Returns:
+
+        """
+        self._origin -= QPointF(delta) / self._zoom
+
+    def zoom_at(self, point: QPointF, factor: float) -> bool:
+        """
+        Zoom by factor keeping the world point under
+        the widget point fixed
+
+        Args:
+            point: The widget point to zoom around
+            factor: Multiplied into the zoom
+
+        Returns:
+             True if zoom changed, False if already at limit
+        """
+        new_zoom = min(MAX_ZOOM, max(MIN_ZOOM, self._zoom * factor))
+        if new_zoom == self._zoom:
+            return False
+        world_point = QPointF(point) / self._zoom + self._origin
+        self._zoom = new_zoom
+        self._origin = world_point - QPointF(point) / new_zoom
+        return True
+
+    def reset(self) -> None:
+        """
+        Show the world origin at zoom 1
+
+        Returns:
+
+        """
+        self._origin = QPointF(0, 0)
+        self._zoom = 1.0
+
+
+if __name__ == "__main__":
+    pass
@@ -16,20 +16,48 @@
     along with this program. If not, see https://www.gnu.org/licenses/.
 """
 
+import math
 import os
 import typing
-from PyQt5.QtCore import Qt, QPoint, QLine
-from PyQt5.QtGui import QPainter, QPen, QPaintEvent, QMouseEvent, QColor, QPixmap
-from PyQt5.QtWidgets import QFrame
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRect, QTimer, QEvent
+from PyQt5.QtGui import QPainter, QPaintEvent, QMouseEvent, QWheelEvent, QTouchEvent, QTabletEvent, QTouchDevice
+from PyQt5.QtGui import QColor, QResizeEvent, QCloseEvent
+from PyQt5.QtWidgets import QFrame, QApplication, QGestureEvent, QPinchGesture
 
 from src.server_side import ROOT_DIR
 from src.server_side.backend.lines.line import ColorLine
 from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.history import History, Command, AddCommand, EraseCommand, ClearCommand
+from src.server_side.backend.lines.history import RecolorCommand
+from src.server_side.backend.lines.point_filter import PointFilter
+from src.server_side.backend.lines.stroke_width import StrokeWidth
+from src.server_side.backend.lines.stroke_predictor import StrokePredictor, PredictionStats
 from src.server_side.backend.configs.drawing_surface_config import DrawingSurfaceConfig
-from src.server_side.backend.configs.drawing_surface_config import DARK_KEY
+from src.server_side.backend.configs.drawing_surface_config import DARK_KEY, SIMPLIFY_KEY, MIN_MOVE_KEY
+from src.server_side.backend.configs.drawing_surface_config import COMPRESS_KEY, TILE_SIZE_KEY, TILE_THREADS_KEY
+from src.server_side.backend.configs.drawing_surface_config import HISTORY_KEY, HISTORY_DEPTH_KEY
+from src.server_side.backend.configs.drawing_surface_config import FLATTEN_LINES_KEY, FLATTEN_POINTS_KEY, FLATTEN_BYTES_KEY
+from src.server_side.backend.configs.drawing_surface_config import VARIABLE_WIDTH_KEY, SMOOTH_KEY, SMOOTH_SIMPLIFY_KEY
+from src.server_side.backend.configs.drawing_surface_config import REFINE_DELAY_KEY, FRAME_RATE_KEY, PREDICT_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_IDLE_KEY, EXPORT_BYTES_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_PALETTE_KEY, EXPORT_SCALE_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_CROP_KEY
+from src.server_side.backend.rendering.export_renderer import ExportRenderer
+from src.server_side.backend.rendering.frame_scheduler import FrameScheduler
+from src.server_side.backend.rendering.image_encoder import ImageEncoder
+from src.server_side.backend.rendering.stroke_painter import StrokePainter, PEN_WIDTH
+from src.server_side.backend.rendering.tile_cache import TileCache
+from src.server_side.backend.rendering.viewport import Viewport, ZOOM_STEP
 
 IMAGE_PATH: str = os.path.join(ROOT_DIR, 'src', 'client_side', 'static')
 IMAGE_NAME = 'wb_image.png'
+ERASER_RADIUS: int = 10
+# Screen pixels of background kept around the ink of cropped exports
+EXPORT_MARGIN: int = 20
+PAN_BUTTONS: Qt.MouseButtons = Qt.RightButton | Qt.MiddleButton
+TOUCH_EVENTS: typing.Tuple[int, ...] = (QEvent.TouchBegin, QEvent.TouchUpdate, QEvent.TouchEnd, QEvent.TouchCancel)
+INPUT_EVENTS: typing.Tuple[int, ...] = TOUCH_EVENTS + (QEvent.MouseButtonPress, QEvent.MouseButtonRelease, QEvent.Wheel,
+                                                       QEvent.Gesture, QEvent.TabletPress, QEvent.TabletMove)
 
 
 class DrawingSurface(QFrame):
@@ -37,9 +65,62 @@ class DrawingSurface(QFrame):
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
         self._config: DrawingSurfaceConfig = DrawingSurfaceConfig()
-        self._all_lines: LineList = LineList()
+        self._all_lines: LineList = LineList(self._config[SIMPLIFY_KEY], self._config[SMOOTH_SIMPLIFY_KEY])
+        # Every change to lines goes through history so it can be undone
+        self._history: History = History(self._all_lines, self._config[HISTORY_KEY], self._config[HISTORY_DEPTH_KEY])
         self._current_line: ColorLine = ColorLine()
         self._selected_color: QColor = QColor('black')
+        self._stroke_painter: StrokePainter = StrokePainter()
+        # Every repaint goes through the scheduler so there is at most one per frame
+        self._frame_scheduler: FrameScheduler = FrameScheduler(self, self._config[FRAME_RATE_KEY])
+        self._point_filter: PointFilter = PointFilter(self._config[MIN_MOVE_KEY])
+        self._stroke_width: StrokeWidth = StrokeWidth()
+        # Lines being drawn are extended to where the pointer is predicted to be
+        self._prediction_stats: PredictionStats = PredictionStats()
+        self._predictor: StrokePredictor = StrokePredictor(self._config[PREDICT_KEY], stats=self._prediction_stats)
+        # Pressure of the tablet event Qt turns into the next mouse event
+        self._tablet_pressure: typing.Optional[float] = None
+        # Mouse moves are queued and added once per burst of events
+        self._pending_points: typing.List[QPoint] = []
+        self._pending_widths: typing.List[typing.Optional[float]] = []
+        self._pending_times: typing.List[int] = []
+        self._input_timer: QTimer = QTimer(self)
+        self._input_timer.setSingleShot(True)
+        self._input_timer.setInterval(0)
+        self._input_timer.timeout.connect(self.flush_pending_points)
+        self._eraser_mode: bool = False
+        # Recolor mode paints the selected color over lines instead of drawing
+        self._recolor_mode: bool = False
+        self._last_erase_point: typing.Optional[QPoint] = None
+        # Committed lines are rasterized once into cached tiles
+        self._tile_cache: TileCache = TileCache(self._all_lines, self._config[TILE_SIZE_KEY],
+                                                self._config[TILE_THREADS_KEY])
+        self._tile_cache.tile_ready_signal.connect(self.tile_ready_slot)
+        # Saved images are rendered from the lines off the GUI thread
+        self._export_renderer: ExportRenderer = ExportRenderer(self)
+        # Board is encoded ahead of a send once nothing has been painted for a while
+        self._export_timer: QTimer = QTimer(self)
+        self._export_timer.setSingleShot(True)
+        self._export_timer.timeout.connect(self.prepare_export_slot)
+        # Tiles are drawn without antialiasing during input and refined once idle
+        self._refine_timer: QTimer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.timeout.connect(self.refine_slot)
+        # Old lines are flattened a batch per pass of the event loop once idle
+        self._flatten_timer: QTimer = QTimer(self)
+        self._flatten_timer.setSingleShot(True)
+        self._flatten_timer.setInterval(0)
+        self._flatten_timer.timeout.connect(self.flatten_slot)
+        # Lines are stored in world coordinates and viewed through the viewport
+        self._viewport: Viewport = Viewport()
+        self._pan_point: typing.Optional[QPoint] = None
+        self.grabGesture(Qt.PinchGesture)
+        # Every finger draws its own line, keyed by touch point id
+        self._touch_lines: typing.Dict[int, ColorLine] = {}
+        self._touch_filters: typing.Dict[int, PointFilter] = {}
+        self._touch_widths: typing.Dict[int, StrokeWidth] = {}
+        self._touch_predictors: typing.Dict[int, StrokePredictor] = {}
+        self.setAttribute(Qt.WA_AcceptTouchEvents)
         self.setMinimumSize(400, 400)
         self.setMouseTracking(True)
         self.apply_config()
@@ -48,6 +129,7 @@ class DrawingSurface(QFrame):
         """
         Called when user clicks mouse.
         Need to add single point here to make dot.
+        Right or middle button starts panning.
 
         Args:
             event: A QMouseEvent by user
@@ -55,16 +137,30 @@ class DrawingSurface(QFrame):
         Returns:
 
         """
-        if event.button() == Qt.LeftButton:
-            new_point = event.pos()
-            self._current_line.add_point(new_point)
-            self._current_line.color = self._selected_color
+        if event.button() & PAN_BUTTONS:
+            self._pan_point = event.pos()
+        elif event.button() == Qt.LeftButton and (self._eraser_mode or self._recolor_mode):
+            self._last_erase_point = None
+            self.brush_along([self._viewport.to_world(event.pos())])
+        elif event.button() == Qt.LeftButton:
+            new_point = self._viewport.to_world(event.pos())
+            self._point_filter.min_distance = self.min_move_distance()
+            self._point_filter.reset()
+            self._point_filter.accept(new_point.x(), new_point.y())
+            self._stroke_width.reset()
+            self._current_line.add_point(new_point, self.mouse_width(event))
+            self.set_line_style(self._current_line)
+            self._predictor.reset()
+            self.predict(self._predictor, new_point, event.timestamp())
+            self._frame_scheduler.request(self._viewport.to_widget_rect(self.dirty_rect(new_point, new_point)))
         else:
             return
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
         """
-        Called when user releases mouse
+        Called when user releases mouse.
+        The current line is handed to the line list without
+        copying and replaced by a new empty line.
 
         Args:
             event: A QMouseEvent by user
@@ -75,12 +171,19 @@ class DrawingSurface(QFrame):
         Returns:
 
         """
-        if event.button() == Qt.LeftButton:
+        if event.button() & PAN_BUTTONS:
+            self._pan_point = None
+        elif event.button() == Qt.LeftButton and (self._eraser_mode or self._recolor_mode):
+            self.flush_pending_points()
+            self._last_erase_point = None
+        elif event.button() == Qt.LeftButton:
+            self.flush_pending_points()
+            self.clear_prediction(self._predictor)
             try:
-                assert len(self._current_line.points) > 0
-                current_line_copy = self._current_line.make_copy()
-                self._all_lines.add_line(current_line_copy)
-                self._current_line.points.clear()
+                assert self._current_line.num_points > 0
+                committed_line = self._current_line
+                self._current_line = ColorLine()
+                self.finish_line(committed_line)
             except AssertionError:
                 self.handle_no_points_error()
         else:
@@ -88,7 +191,8 @@ class DrawingSurface(QFrame):
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         """
-        Called when user moves mouse
+        Called when user moves mouse.
+        Point is queued until the burst of events is handled.
 
         Args:
             event: A QMouseEvent by user
@@ -96,16 +200,483 @@ class DrawingSurface(QFrame):
         Returns:
 
         """
-        if event.buttons() & Qt.LeftButton:
-            new_point = event.pos()
-            self._current_line.add_point(new_point)
+        if self._pan_point is not None and event.buttons() & PAN_BUTTONS:
+            self.pan_view(event.pos() - self._pan_point)
+            self._pan_point = event.pos()
+        elif event.buttons() & Qt.LeftButton:
+            self._pending_points.append(self._viewport.to_world(event.pos()))
+            self._pending_widths.append(self.mouse_width(event))
+            self._pending_times.append(event.timestamp())
+            if not self._input_timer.isActive():
+                self._input_timer.start()
         else:
             return
 
+    def touch_event(self, event: QTouchEvent) -> bool:
+        """
+        Called when fingers touch, move on or leave the surface.
+        Every touch point id has its own line so several people
+        can write at once. Each finger only repaints the region
+        of its new segments and lines are committed as soon as
+        their finger lifts.
+
+        Args:
+            event: A QTouchEvent by user
+
+        Returns:
+             True since touch events are always accepted
+        """
+        if event.type() == QEvent.TouchCancel:
+            self.cancel_touch_lines()
+            event.accept()
+            return True
+        device = event.device()
+        has_pressure = device is not None and bool(device.capabilities() & QTouchDevice.Pressure)
+        for touch_point in event.touchPoints():
+            touch_id = touch_point.id()
+            state = touch_point.state()
+            if state == Qt.TouchPointStationary:
+                continue
+            new_point = self._viewport.to_world(touch_point.pos())
+            if self._eraser_mode or self._recolor_mode:
+                # Erase or recolor from where this finger was last reported
+                self._last_erase_point = None
+                if state != Qt.TouchPointPressed:
+                    self._last_erase_point = self._viewport.to_world(touch_point.lastPos())
+                self.brush_along([new_point])
+                self._last_erase_point = None
+                continue
+            if state == Qt.TouchPointPressed:
+                self._touch_widths[touch_id] = StrokeWidth()
+            elif touch_id not in self._touch_lines:
+                continue
+            pressure = touch_point.pressure() if has_pressure else None
+            width = self.input_width(self._touch_widths[touch_id], touch_point.pos(), event.timestamp(), pressure)
+            if state == Qt.TouchPointPressed:
+                self.start_touch_line(touch_id, new_point, width, event.timestamp())
+            else:
+                self.add_touch_point(touch_id, new_point, width, event.timestamp())
+                if state == Qt.TouchPointReleased:
+                    self._touch_filters.pop(touch_id)
+                    self._touch_widths.pop(touch_id)
+                    self.clear_prediction(self._touch_predictors.pop(touch_id))
+                    self.finish_line(self._touch_lines.pop(touch_id))
+        event.accept()
+        return True
+
+    def start_touch_line(self, touch_id: int, new_point: QPoint, width: typing.Optional[float] = None,
+                         timestamp: int = 0) -> None:
+        """
+        Start a new line for a finger
+
+        Args:
+            touch_id: The id of touch point
+            new_point: First point of line in world coordinates
+            width: The line width at point, None for the pen width
+            timestamp: The event time in milliseconds
+
+        Returns:
+
+        """
+        color_line = ColorLine()
+        color_line.add_point(new_point, width)
+        self.set_line_style(color_line)
+        point_filter = PointFilter(self.min_move_distance())
+        point_filter.accept(new_point.x(), new_point.y())
+        self._touch_lines[touch_id] = color_line
+        self._touch_filters[touch_id] = point_filter
+        predictor = StrokePredictor(self._config[PREDICT_KEY], stats=self._prediction_stats)
+        predictor.add_sample(new_point.x(), new_point.y(), timestamp)
+        self._touch_predictors[touch_id] = predictor
+        self._frame_scheduler.request(self._viewport.to_widget_rect(self.dirty_rect(new_point, new_point)))
+
+    def add_touch_point(self, touch_id: int, new_point: QPoint, width: typing.Optional[float] = None,
+                        timestamp: int = 0) -> None:
+        """
+        Add a point to the line of a finger and repaint
+        only the new segment
+
+        Args:
+            touch_id: The id of touch point
+            new_point: The point in world coordinates
+            width: The line width at point, None to keep the last width
+            timestamp: The event time in milliseconds
+
+        Returns:
+
+        """
+        color_line = self._touch_lines[touch_id]
+        if not self._touch_filters[touch_id].accept(new_point.x(), new_point.y()):
+            return
+        coords = color_line.coords
+        last_point = QPoint(coords[-2], coords[-1])
+        color_line.add_point(new_point, width)
+        self.predict(self._touch_predictors[touch_id], new_point, timestamp)
+        self._frame_scheduler.request(self._viewport.to_widget_rect(self.dirty_rect(last_point, new_point)))
+
+    def cancel_touch_lines(self) -> None:
+        """
+        Drop every unfinished finger line without committing.
+        Called when the system takes over the touch sequence.
+
+        Returns:
+
+        """
+        touch_lines = list(self._touch_lines.values())
+        self._touch_lines.clear()
+        self._touch_filters.clear()
+        self._touch_widths.clear()
+        for predictor in self._touch_predictors.values():
+            self.clear_prediction(predictor)
+        self._touch_predictors.clear()
+        for color_line in touch_lines:
+            bounds = color_line.bounding_rect()
+            dirty_rect = self.dirty_rect(bounds.topLeft(), bounds.bottomRight())
+            self._frame_scheduler.request(self._viewport.to_widget_rect(dirty_rect))
+
+    def tabletEvent(self, event: QTabletEvent) -> None:
+        """
+        Called when a tablet pen touches or moves. The pressure is
+        kept and the event ignored so Qt sends the same input as a
+        mouse event, which then draws with the pressure.
+
+        Args:
+            event: A QTabletEvent by user
+
+        Returns:
+
+        """
+        self._tablet_pressure = None if event.type() == QEvent.TabletRelease else event.pressure()
+        event.ignore()
+
+    def mouse_width(self, event: QMouseEvent) -> typing.Optional[float]:
+        """
+        Width of the current line at a mouse event.
+        Uses tablet pressure if the event came from a pen.
+
+        Args:
+            event: A QMouseEvent by user
+
+        Returns:
+             The width in pixels, None if variable width is off
+        """
+        pressure = self._tablet_pressure if event.source() == Qt.MouseEventSynthesizedByQt else None
+        return self.input_width(self._stroke_width, event.localPos(), event.timestamp(), pressure)
+
+    def input_width(self, stroke_width: StrokeWidth, pos: QPointF, timestamp: int,
+                    pressure: typing.Optional[float]) -> typing.Optional[float]:
+        """
+        Width of a line at an input point, from pressure when
+        the device has it and from speed otherwise
+
+        Args:
+            stroke_width: Tracks the speed of the input
+            pos: The input position in widget pixels
+            timestamp: The event time in milliseconds
+            pressure: The pressure between 0 and 1, None if not known
+
+        Returns:
+             The width in pixels, None if variable width is off
+        """
+        if not self._config[VARIABLE_WIDTH_KEY]:
+            return None
+        if pressure is not None:
+            return stroke_width.from_pressure(pressure)
+        return stroke_width.from_motion(pos.x(), pos.y(), timestamp)
+
+    def set_line_style(self, color_line: ColorLine) -> None:
+        """
+        Give a new line the selected color and smoothing
+
+        Args:
+            color_line: The line being started
+
+        Returns:
+
+        """
+        color_line.color = self.stored_color()
+        color_line.smooth = self._config[SMOOTH_KEY]
+
+    def stored_color(self) -> QColor:
+        """
+
+        Returns:
+             The selected color the way lines store it
+        """
+        if self._config[DARK_KEY]:
+            # Stored inverted so it shows as the selected color
+            return QColor(255 - self._selected_color.red(), 255 - self._selected_color.green(),
+                          255 - self._selected_color.blue())
+        return QColor(self._selected_color)
+
+    def finish_line(self, color_line: ColorLine) -> None:
+        """
+        Add a finished line to lines so it can be undone
+        and rasterize it into the cached tiles
+
+        Args:
+            color_line: The line that was just drawn
+
+        Returns:
+
+        """
+        self._history.execute(AddCommand([color_line]))
+        self.commit_line(color_line)
+
+    def flush_pending_points(self) -> None:
+        """
+        Add the queued mouse move points to the current line.
+        Duplicate and too close points are dropped and only
+        one repaint is requested for the whole burst.
+
+        Returns:
+
+        """
+        if len(self._pending_points) == 0:
+            return
+        if self._eraser_mode or self._recolor_mode:
+            pending_points, self._pending_points = self._pending_points, []
+            self._pending_widths.clear()
+            self._pending_times.clear()
+            self.brush_along(pending_points)
+            return
+        coords = self._current_line.coords
+        last_point = QPoint(coords[-2], coords[-1]) if len(coords) > 0 else self._pending_points[0]
+        dirty_rect = QRect()
+        for new_point, width, timestamp in zip(self._pending_points, self._pending_widths, self._pending_times):
+            if self._point_filter.accept(new_point.x(), new_point.y()):
+                self._current_line.add_point(new_point, width)
+                self.predict(self._predictor, new_point, timestamp)
+                # Only the new segments need to be repainted
+                dirty_rect = dirty_rect.united(self.dirty_rect(last_point, new_point))
+                last_point = new_point
+        self._pending_points.clear()
+        self._pending_widths.clear()
+        self._pending_times.clear()
+        if not dirty_rect.isNull():
+            self._frame_scheduler.request(self._viewport.to_widget_rect(dirty_rect))
+
+    def min_move_distance(self) -> float:
+        """
+        Input filters compare world points, so the configured
+        screen distance is scaled by the zoom
+
+        Returns:
+             The world distance a new point must move to be kept
+        """
+        return self._config[MIN_MOVE_KEY] / self._viewport.zoom
+
+    def lines_along(self, points: typing.List[QPoint]) -> typing.List[ColorLine]:
+        """
+        Find every line the eraser touches while moving through
+        points. Points are interpolated so fast moves do not skip
+        lines.
+
+        Args:
+            points: The eraser positions in world coordinates
+
+        Returns:
+             The lines touched, each once
+        """
+        hit_lines = {}
+        # Eraser keeps its size on screen
+        radius = ERASER_RADIUS / self._viewport.zoom
+        for point in points:
+            start = self._last_erase_point if self._last_erase_point is not None else point
+            delta = point - start
+            num_steps = max(1, int(max(abs(delta.x()), abs(delta.y())) / radius) + 1)
+            for step in range(1, num_steps + 1):
+                x = start.x() + delta.x() * step // num_steps
+                y = start.y() + delta.y() * step // num_steps
+                for color_line in self._all_lines.query_point(x, y, radius):
+                    hit_lines[id(color_line)] = color_line
+            self._last_erase_point = point
+        return list(hit_lines.values())
+
+    def brush_along(self, points: typing.List[QPoint]) -> None:
+        """
+        Erase or recolor along points depending on the mode
+
+        Args:
+            points: The brush positions in world coordinates
+
+        Returns:
+
+        """
+        if self._recolor_mode:
+            self.recolor_along(points)
+        else:
+            self.erase_along(points)
+
+    def erase_along(self, points: typing.List[QPoint]) -> None:
+        """
+        Remove every line the eraser touches while moving through
+        points. Only the bounds of removed lines are redrawn.
+
+        Args:
+            points: The eraser positions in world coordinates
+
+        Returns:
+
+        """
+        hit_lines = self.lines_along(points)
+        if len(hit_lines) == 0:
+            return
+        command = EraseCommand(hit_lines)
+        self._history.execute(command)
+        self.invalidate_lines(command.lines)
+
+    def recolor_along(self, points: typing.List[QPoint]) -> None:
+        """
+        Give every line the brush touches while moving through
+        points the selected color. Lines already that color
+        are skipped so they are not redrawn.
+
+        Args:
+            points: The brush positions in world coordinates
+
+        Returns:
+
+        """
+        new_color = self.stored_color()
+        hit_lines = [color_line for color_line in self.lines_along(points)
+                     if color_line.color.rgb() != new_color.rgb()]
+        self.recolor_lines(hit_lines, new_color)
+
+    def event(self, event: QEvent) -> bool:
+        """
+        Pinch gestures and touch events are only delivered through event
+
+        Args:
+            event: Any event sent to widget
+
+        Returns:
+             True if event was handled
+        """
+        if event.type() in INPUT_EVENTS or (event.type() == QEvent.MouseMove and event.buttons()):
+            self.start_drafting()
+        if event.type() == QEvent.Gesture:
+            return self.gesture_event(event)
+        if event.type() in TOUCH_EVENTS:
+            return self.touch_event(event)
+        return super().event(event)
+
+    def gesture_event(self, event: QGestureEvent) -> bool:
+        """
+        Pinch zooms around the fingers and moving
+        the fingers together pans. Ignored while fingers
+        are writing so two people drawing do not zoom.
+
+        Args:
+            event: A QGestureEvent by user
+
+        Returns:
+             True if a pinch was handled
+        """
+        pinch = event.gesture(Qt.PinchGesture)
+        if pinch is None:
+            return False
+        if len(self._touch_lines) > 0:
+            event.accept(pinch)
+            return True
+        center = self.mapFromGlobal(pinch.centerPoint().toPoint())
+        if pinch.changeFlags() & QPinchGesture.CenterPointChanged:
+            last_center = self.mapFromGlobal(pinch.lastCenterPoint().toPoint())
+            self.pan_view(center - last_center)
+        if pinch.changeFlags() & QPinchGesture.ScaleFactorChanged:
+            self.zoom_view(center, pinch.scaleFactor())
+        event.accept(pinch)
+        return True
+
+    def wheelEvent(self, event: QWheelEvent) -> None:
+        """
+        Zoom around the mouse
+
+        Args:
+            event: A QWheelEvent by user
+
+        Returns:
+
+        """
+        num_steps = event.angleDelta().y() / 120
+        if num_steps != 0:
+            self.zoom_view(event.position().toPoint(), ZOOM_STEP ** num_steps)
+
+    def pan_view(self, delta: QPoint) -> None:
+        """
+        Move the view by delta widget pixels. Widget contents
+        are scrolled so only the exposed strip is repainted.
+
+        Args:
+            delta: The drag distance
+
+        Returns:
+
+        """
+        if delta.isNull():
+            return
+        self._viewport.pan(delta)
+        self._frame_scheduler.translate(delta)
+        self.scroll(delta.x(), delta.y())
+
+    def zoom_view(self, point: QPoint, factor: float) -> None:
+        """
+        Zoom the view around a widget point
+
+        Args:
+            point: The point that stays fixed
+            factor: Multiplied into the zoom
+
+        Returns:
+
+        """
+        if self._viewport.zoom_at(point, factor):
+            self._frame_scheduler.request()
+
+    def reset_view_slot(self) -> None:
+        """
+        Go back to the starting view
+
+        Returns:
+
+        """
+        self._viewport.reset()
+        self._frame_scheduler.request()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        """
+        Keep enough cached tiles to fill the new size
+
+        Args:
+            event: The QResizeEvent with the new size
+
+        Returns:
+
+        """
+        super().resizeEvent(event)
+        self._tile_cache.fit_view(event.size().width(), event.size().height())
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        """
+        Called when the drawing surface is closed
+
+        Args:
+            event: The close event
+
+        Returns:
+
+        """
+        self.wait_for_threads()
+        super().closeEvent(event)
+
     def paintEvent(self, event: QPaintEvent) -> None:
         """
         Paint on the widget during and after mouse events.
-        Can draw dot or line.
+        Previous lines are blitted from the cached tiles so
+        only the current line is painted segment by segment.
+        Only called when a region has been invalidated.
+        Dark mode inverts the pixels while blitting so the
+        stored line colors never change.
 
         Args:
             event: A paint event
@@ -114,59 +685,259 @@ class DrawingSurface(QFrame):
 
         """
         painter = QPainter(self)
+        dark_mode = self._config[DARK_KEY]
         try:
-            # Paint current line
-            self.paint_line(self._current_line, painter)
-            # Paint previous lines
-            for color_line in self._all_lines.line_list:
-                self.paint_line(color_line, painter)
+            # Everything is painted in world coordinates
+            painter.setTransform(self._viewport.transform)
+            # Blit previous lines within the dirty region
+            if dark_mode:
+                painter.setCompositionMode(QPainter.RasterOp_NotSource)
+            self._tile_cache.paint(painter, self._viewport.to_world_rect(event.rect()), self._viewport.level)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            # Paint current lines
+            self.paint_line(self._current_line, painter, invert=dark_mode)
+            self.paint_prediction(self._current_line, self._predictor, painter, invert=dark_mode)
+            for touch_id, color_line in self._touch_lines.items():
+                self.paint_line(color_line, painter, invert=dark_mode)
+                self.paint_prediction(color_line, self._touch_predictors[touch_id], painter, invert=dark_mode)
         except AssertionError:
             self.handle_no_points_error()
-        self.update()
         painter.end()
+        self._export_timer.start()
 
-    def paint_line(self, color_line: ColorLine, painter: QPainter) -> None:
+    def paint_line(self, color_line: ColorLine, painter: QPainter, invert: bool = False) -> None:
         """
-        Paint single line
+        Paint single line as one polyline
 
         Args:
             color_line: The line or lines to paint
             painter: The painter to use for line
+            invert: Paint with the inverted line color
+
+        Returns:
+
+        """
+        self._stroke_painter.paint_line(color_line, painter, invert)
+
+    def paint_prediction(self, color_line: ColorLine, predictor: StrokePredictor, painter: QPainter,
+                         invert: bool = False) -> None:
+        """
+        Paint the predicted extension of a line being drawn.
+        It is painted like the end of the line but never
+        added to it.
+
+        Args:
+            color_line: The line being drawn
+            predictor: The predictor of the line input
+            painter: The painter to use for extension
+            invert: Paint with the inverted line color
 
         Returns:
 
         """
-        pen = QPen(color_line.color, 2)
-        if len(color_line.points) == 0:
+        if predictor.prediction is None or color_line.num_points == 0:
             return
-        elif len(color_line.points) == 1:
-            pen.setStyle(Qt.DotLine)
-            painter.setPen(pen)
-            painter.drawPoint(color_line.points[0])
-        else:
-            pen.setStyle(Qt.SolidLine)
-            painter.setPen(pen)
-            for line in self.line_generator(color_line.points):
-                # Need to draw line because points are too far
-                # apart when user moves mouse too fast
-                painter.drawLine(line)
+        extension = ColorLine()
+        extension.add_point(predictor.anchor, color_line.last_width)
+        extension.add_point(predictor.prediction)
+        extension.color = color_line.color
+        self.paint_line(extension, painter, invert)
+
+    def predict(self, predictor: StrokePredictor, new_point: QPoint, timestamp: int) -> None:
+        """
+        Give a predictor the point just added to its line
+        and repaint the old and new predicted extensions
+
+        Args:
+            predictor: The predictor of the line input
+            new_point: The point in world coordinates
+            timestamp: The event time in milliseconds
+
+        Returns:
+
+        """
+        dirty_rect = self.prediction_rect(predictor)
+        predictor.add_sample(new_point.x(), new_point.y(), timestamp)
+        dirty_rect = dirty_rect.united(self.prediction_rect(predictor))
+        if not dirty_rect.isNull():
+            self._frame_scheduler.request(self._viewport.to_widget_rect(dirty_rect))
+
+    def clear_prediction(self, predictor: StrokePredictor) -> None:
+        """
+        Remove the predicted extension when a line ends
+
+        Args:
+            predictor: The predictor of the line input
+
+        Returns:
+
+        """
+        dirty_rect = self.prediction_rect(predictor)
+        predictor.reset()
+        if not dirty_rect.isNull():
+            self._frame_scheduler.request(self._viewport.to_widget_rect(dirty_rect))
+
+    def prediction_rect(self, predictor: StrokePredictor) -> QRect:
+        """
+        The rect covered by a predicted extension
+
+        Args:
+            predictor: The predictor of the line input
+
+        Returns:
+             The rect in world coordinates, null if nothing is predicted
+        """
+        if predictor.prediction is None:
+            return QRect()
+        return self.dirty_rect(predictor.anchor, predictor.prediction)
+
+    def commit_line(self, color_line: ColorLine) -> None:
+        """
+        Rasterize a single committed line into the cached tiles
+
+        Args:
+            color_line: The line that was just added
+
+        Returns:
+
+        """
+        bounds = color_line.bounding_rect()
+        self._tile_cache.commit_line(color_line, self.dirty_rect(bounds.topLeft(), bounds.bottomRight()))
+
+    def invalidate_region(self, rect: QRect) -> None:
+        """
+        Re-rasterize only the tiles that touch rect and repaint rect
+
+        Args:
+            rect: The region that changed in world coordinates
+
+        Returns:
+
+        """
+        self._tile_cache.invalidate(rect)
+        self._frame_scheduler.request(self._viewport.to_widget_rect(rect))
+
+    def invalidate_lines(self, color_lines: typing.List[ColorLine]) -> None:
+        """
+        Re-rasterize only the tiles each line touches and
+        repaint the region covering all of them
+
+        Args:
+            color_lines: The lines that were added, removed or changed
+
+        Returns:
+
+        """
+        update_rect = QRect()
+        for color_line in color_lines:
+            bounds = color_line.bounding_rect()
+            dirty_rect = self.dirty_rect(bounds.topLeft(), bounds.bottomRight())
+            self._tile_cache.invalidate(dirty_rect)
+            update_rect = update_rect.united(dirty_rect)
+        if not update_rect.isNull():
+            self._frame_scheduler.request(self._viewport.to_widget_rect(update_rect))
+
+    def invalidate_command(self, command: Command) -> None:
+        """
+        Repaint only what a command changed
+
+        Args:
+            command: The command that was applied or undone
+
+        Returns:
+
+        """
+        self.invalidate_lines(command.lines)
+        for rect in command.raster_rects():
+            self.invalidate_region(rect)
+
+    def flatten_old_lines(self) -> int:
+        """
+        Flatten the next batch of oldest lines into the raster
+        layer. Lines history may still change are never flattened,
+        and neither is any line after them since raster is painted
+        under all lines. Cached tiles already show the same ink
+        so nothing is repainted.
+
+        Returns:
+             The number of lines flattened
+        """
+        count = self._all_lines.count_to_flatten(self._config[FLATTEN_LINES_KEY], self._config[FLATTEN_POINTS_KEY],
+                                                 self._config[FLATTEN_BYTES_KEY])
+        referenced = self._history.referenced_lines()
+        line_list = self._all_lines.line_list
+        horizon = 0
+        while horizon < count and id(line_list[horizon]) not in referenced:
+            horizon += 1
+        if horizon > 0:
+            self._all_lines.flatten_lines(horizon)
+        return horizon
+
+    def flatten_slot(self) -> None:
+        """
+        Slot connected while old lines are being flattened.
+        Flattening goes on until lines are well under budget,
+        stopping whenever input starts.
+
+        Returns:
+
+        """
+        if self.flatten_old_lines() > 0:
+            self._flatten_timer.start()
+
+    def start_drafting(self) -> None:
+        """
+        Render tiles fast while user gives input and
+        restart the wait before they are refined
+
+        Returns:
+
+        """
+        self._tile_cache.antialias = False
+        self._refine_timer.start()
+        self._flatten_timer.stop()
+
+    def refine_slot(self) -> None:
+        """
+        Slot connected when input has been idle long enough.
+        Tiles drawn without antialiasing are rendered again
+        and old lines are flattened if over budget.
+
+        Returns:
+
+        """
+        self._tile_cache.antialias = True
+        self._tile_cache.refine()
+        if self._all_lines.over_budget(self._config[FLATTEN_LINES_KEY], self._config[FLATTEN_POINTS_KEY]):
+            self._flatten_timer.start()
+
+    def tile_ready_slot(self, rect: QRect) -> None:
+        """
+        Slot connected when a tile finished rendering on a thread
+
+        Args:
+            rect: The region covered by tile in world coordinates
+
+        Returns:
+
+        """
+        self._frame_scheduler.request(self._viewport.to_widget_rect(rect))
 
     @staticmethod
-    def line_generator(point_list: typing.List[QPoint]):
+    def dirty_rect(start: QPoint, end: QPoint) -> QRect:
         """
-        Yield the line resulting from a point and next point
+        The rect that must be repainted after drawing
+        from start to end, padded by the pen width
 
         Args:
-            point_list: Points to iterate over
+            start: First point of segment
+            end: Last point of segment
 
-        Yields:
-             The line to draw
+        Returns:
+             The rect to invalidate
         """
-        assert len(point_list) > 1
-        for i, point in enumerate(point_list[:-1]):
-            next_point = point_list[i + 1]
-            line = QLine(point, next_point)
-            yield line
+        rect = QRect(start, end).normalized()
+        return rect.adjusted(-PEN_WIDTH, -PEN_WIDTH, PEN_WIDTH, PEN_WIDTH)
 
     @staticmethod
     def handle_no_points_error() -> None:
@@ -178,30 +949,65 @@ class DrawingSurface(QFrame):
         """
         print("\nNo points appended during mouse move!")
 
-    def save_whiteboard_image(self) -> bool:
+    def save_whiteboard_image(self) -> int:
         """
-        Save the current whiteboard pixmap to client/static/wb_image.png
-        so that the twilio API can send it using public URL
+        Start saving the lines in view to client/static/wb_image.png
+        so that the twilio API can send it using public URL.
+        The image is rendered from the lines on a thread so
+        drawing can go on, and the export renderer signals
+        when it is saved.
 
         Returns:
-             True if image saved, False if image not saved
+             The id of the export
         """
-        pixmap = self.get_whiteboard_pixmap()
         if not os.path.exists(IMAGE_PATH):
             os.mkdir(IMAGE_PATH)
-        save_success = pixmap.save(os.path.join(IMAGE_PATH, IMAGE_NAME), "PNG")
-        return save_success
+        rect, scale = self.export_view()
+        return self._export_renderer.export(self._all_lines, rect, scale, self._config[DARK_KEY],
+                                            os.path.join(IMAGE_PATH, IMAGE_NAME))
 
-    def get_whiteboard_pixmap(self) -> QPixmap:
+    def prepare_export_slot(self) -> None:
         """
-        Get the image currently on the drawing surface
+        Slot connected when nothing has been painted for a while.
+        The lines in view are encoded ahead of time so sending
+        an unchanged board only has to write the file.
 
         Returns:
-             The image
+
+        """
+        rect, scale = self.export_view()
+        self._export_renderer.prepare(self._all_lines, rect, scale, self._config[DARK_KEY])
+
+    def export_view(self) -> typing.Tuple[QRect, float]:
         """
-        rect = self.rect()
-        pixmap = self.grab(rect)
-        return pixmap
+        The lines in view are exported at the export scale of the zoom.
+        When cropping, only the ink in view and a margin around it
+        are exported so empty board is never rendered or encoded.
+
+        Returns:
+             The region of the drawing surface to export and image pixels per unit
+        """
+        view_rect = self._viewport.to_world_rect(self.rect())
+        scale = self._viewport.zoom * self._config[EXPORT_SCALE_KEY]
+        content_rect = self._all_lines.content_rect
+        if self._config[EXPORT_CROP_KEY] and not content_rect.isNull():
+            margin = math.ceil(EXPORT_MARGIN / self._viewport.zoom)
+            crop_rect = view_rect.intersected(content_rect.adjusted(-margin, -margin, margin, margin))
+            # No ink in view sends the whole view
+            if not crop_rect.isEmpty():
+                view_rect = crop_rect
+        return view_rect, scale
+
+    def wait_for_threads(self) -> None:
+        """
+        Wait for images and tiles being rendered on other
+        threads so the drawing surface can be deleted
+
+        Returns:
+
+        """
+        self._export_renderer.wait_for_done()
+        self._tile_cache.wait_for_done()
 
     @staticmethod
     def delete_wb_image() -> None:
@@ -216,21 +1022,92 @@ class DrawingSurface(QFrame):
 
     def undo_line_slot(self) -> None:
         """
-        Undo the last line that was drawn
+        Undo the last change to lines.
+        Only the bounds of the changed lines are redrawn.
 
         Returns:
 
         """
-        try:
-            self._all_lines.line_list.pop()
-            self.update()
-        except IndexError:
-            # No lines
-            pass
+        command = self._history.undo()
+        if command is None:
+            # Nothing to undo
+            return
+        self.invalidate_command(command)
+
+    def redo_line_slot(self) -> None:
+        """
+        Redo the last undone change to lines.
+        Only the bounds of the changed lines are redrawn.
+
+        Returns:
+
+        """
+        command = self._history.redo()
+        if command is None:
+            # Nothing to redo
+            return
+        self.invalidate_command(command)
+
+    def clear_slot(self) -> None:
+        """
+        Remove all lines and flattened ink. Can be undone.
+
+        Returns:
+
+        """
+        if len(self._all_lines.line_list) == 0 and len(self._all_lines.raster_layer) == 0:
+            return
+        command = ClearCommand(self._all_lines)
+        self._history.execute(command)
+        self.invalidate_command(command)
+
+    def recolor_lines(self, color_lines: typing.List[ColorLine], new_color: QColor) -> None:
+        """
+        Change the color of lines. Can be undone.
+
+        Args:
+            color_lines: Lines in the line list
+            new_color: The color as it looks in light mode
+
+        Returns:
+
+        """
+        if len(color_lines) == 0 or not new_color.isValid():
+            return
+        command = RecolorCommand(color_lines, new_color)
+        self._history.execute(command)
+        self.invalidate_lines(command.lines)
+
+    def set_eraser_slot(self, checked: bool) -> None:
+        """
+        Turn eraser mode on or off
+
+        Args:
+            checked: True if eraser should be used
+
+        Returns:
+
+        """
+        self._eraser_mode = checked
+        self._last_erase_point = None
+
+    def set_recolor_slot(self, checked: bool) -> None:
+        """
+        Turn recolor mode on or off
+
+        Args:
+            checked: True if dragging should recolor lines
+
+        Returns:
+
+        """
+        self._recolor_mode = checked
+        self._last_erase_point = None
 
     def toggle_dark_slot(self) -> None:
         """
-        Toggle drawing surface dark mode
+        Toggle drawing surface dark mode.
+        Only the repaint depends on the number of lines.
 
         Returns:
 
@@ -238,9 +1115,8 @@ class DrawingSurface(QFrame):
         dark_mode = not self._config[DARK_KEY]
         color = "black" if dark_mode else "white"
         self.setStyleSheet(f"background-color: {color};")
-        self._all_lines.invert_lines_colors()
         self._config[DARK_KEY] = dark_mode
-        self.update()
+        self._frame_scheduler.request()
 
     def apply_config(self) -> None:
         """
@@ -252,7 +1128,14 @@ class DrawingSurface(QFrame):
         dark_mode = self._config[DARK_KEY]
         color = "black" if dark_mode else "white"
         self.setStyleSheet(f"background-color: {color};")
-        self.update()
+        QApplication.setAttribute(Qt.AA_CompressHighFrequencyEvents, self._config[COMPRESS_KEY])
+        self._refine_timer.setInterval(self._config[REFINE_DELAY_KEY])
+        self._frame_scheduler.frame_rate = self._config[FRAME_RATE_KEY]
+        self._predictor.predict_time = self._config[PREDICT_KEY]
+        self._export_timer.setInterval(self._config[EXPORT_IDLE_KEY])
+        self._export_renderer.encoder = ImageEncoder(max_bytes=self._config[EXPORT_BYTES_KEY],
+                                                     indexed=self._config[EXPORT_PALETTE_KEY])
+        self._frame_scheduler.request()
 
     def save_config(self) -> None:
         """
@@ -277,6 +1160,37 @@ class DrawingSurface(QFrame):
         center_y = geom.top() + geom.height() // 2
         return QPoint(center_x, center_y)
 
+    @property
+    def viewport(self) -> Viewport:
+        """
+        Maps between widget and world coordinates
+
+        Returns:
+             The viewport
+        """
+        return self._viewport
+
+    @property
+    def export_renderer(self) -> ExportRenderer:
+        """
+        Signals when a saved image is ready
+
+        Returns:
+             The export renderer
+        """
+        return self._export_renderer
+
+    @property
+    def prediction_stats(self) -> PredictionStats:
+        """
+        Accuracy and lead of predicted extensions, to compare
+        drawing with prediction on and off
+
+        Returns:
+             The prediction stats
+        """
+        return self._prediction_stats
+
     @property
     def selected_color(self) -> QColor:
         """
@@ -29,6 +29,8 @@ from src.server_side.ui.toolbar_widgets.qr_widget import QrWidget
 from src.server_side.ui.toolbar_widgets.send_dialog import SendDialog
 
 IMAGE_PAGE = "wb_image"
+# Milliseconds export reports stay in the status bar
+STATUS_TIMEOUT = 10000
 
 
 class WhiteboardMW(QMainWindow):
@@ -41,6 +43,8 @@ class WhiteboardMW(QMainWindow):
         self._qr_widget: QrWidget = QrWidget()
         self._send_dialog: SendDialog = SendDialog(self)
         self._server: typing.Optional[Server] = None
+        # Numbers waiting for each image being saved
+        self._pending_sends: typing.Dict[int, typing.List[str]] = {}
         self.setCentralWidget(self._drawing_surface)
         self.addToolBar(self._drawing_toolbar)
 
@@ -58,8 +62,22 @@ class WhiteboardMW(QMainWindow):
         self._drawing_toolbar.send_action.triggered.connect(self.show_send_dialog_slot)
         # Send dialog closed -> send whiteboard to recipients
         self._send_dialog.finished.connect(self.send_dialog_finished_slot)
+        # Whiteboard image saved -> send it to waiting recipients
+        self._drawing_surface.export_renderer.export_finished_signal.connect(self.export_finished_slot)
+        # Whiteboard image size, encode time or error -> status bar
+        self._drawing_surface.export_renderer.export_report_signal.connect(self.export_report_slot)
         # Undo line button clicked -> drawing surface remove line
         self._drawing_toolbar.undo_line_action.triggered.connect(self._drawing_surface.undo_line_slot)
+        # Redo button clicked -> drawing surface redo
+        self._drawing_toolbar.redo_line_action.triggered.connect(self._drawing_surface.redo_line_slot)
+        # Clear button clicked -> drawing surface clear
+        self._drawing_toolbar.clear_action.triggered.connect(self._drawing_surface.clear_slot)
+        # Eraser button toggled -> drawing surface eraser mode
+        self._drawing_toolbar.eraser_action.toggled.connect(self._drawing_surface.set_eraser_slot)
+        # Recolor button toggled -> drawing surface recolor mode
+        self._drawing_toolbar.recolor_action.toggled.connect(self._drawing_surface.set_recolor_slot)
+        # Reset view button clicked -> drawing surface starting pan and zoom
+        self._drawing_toolbar.reset_view_action.triggered.connect(self._drawing_surface.reset_view_slot)
         # QR button clicked -> show qr widget
         self._drawing_toolbar.show_qr_action.triggered.connect(self.show_qr_slot)
         # Dark mode toggle button -> drawing surface change color
@@ -155,7 +173,8 @@ class WhiteboardMW(QMainWindow):
 
     def send_whiteboard(self, numbers: typing.List[str]) -> None:
         """
-        Called after send dialog is accepted
+        Called after send dialog is accepted.
+        The image is saved on a thread and sent once it is ready.
 
         Args:
             numbers: The numbers to send whiteboard to
@@ -163,11 +182,40 @@ class WhiteboardMW(QMainWindow):
         Returns:
 
         """
-        save_success = self._drawing_surface.save_whiteboard_image()
+        export_id = self._drawing_surface.save_whiteboard_image()
+        self._pending_sends[export_id] = numbers
+
+    def export_finished_slot(self, export_id: int, save_success: bool) -> None:
+        """
+        Slot connected when a whiteboard image finished saving.
+        Why an image was not saved is shown by export_report_slot.
+
+        Args:
+            export_id: The id returned when the export started
+            save_success: True if image saved
+
+        Returns:
+
+        """
+        numbers = self._pending_sends.pop(export_id, None)
+        if numbers is None:
+            return
         if save_success:
             self._server.twilio_client.send_to_all(IMAGE_PAGE, numbers)
-        else:
-            print('Image was not saved.')
+
+    def export_report_slot(self, export_id: int, message: str) -> None:
+        """
+        Slot connected when a whiteboard image being saved
+        has its size and encode time or an error to show
+
+        Args:
+            export_id: The id returned when the export started
+            message: The report for the user
+
+        Returns:
+
+        """
+        self.statusBar().showMessage(message, STATUS_TIMEOUT)
 
     def add_recipient_slot(self, recipient_info: typing.Tuple[str, str]) -> None:
         """
@@ -241,8 +289,9 @@ class WhiteboardMW(QMainWindow):
         2. Stop the client app
         3. Stop server socket thread and wait
         4. Close the server socket
-        5. Delete the wb_image
-        6. Save the drawing surface config
+        5. Wait for drawing surface threads
+        6. Delete the wb_image
+        7. Save the drawing surface config
 
         Returns:
 
@@ -252,6 +301,7 @@ class WhiteboardMW(QMainWindow):
         self._server.should_run = False
         self._server.wait()
         self._server.close_socket()
+        self._drawing_surface.wait_for_threads()
         self._drawing_surface.delete_wb_image()
         self._drawing_surface.save_config()
 
@@ -18,7 +18,7 @@
 
 import os
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QToolBar, QAction
+from PyQt5.QtWidgets import QToolBar, QAction, QActionGroup
 
 from src.server_side import ROOT_DIR
 from src.server_side.ui.toolbar_widgets.color_select_cb import ColorSelectCb
@@ -37,6 +37,26 @@ class DrawingToolBar(QToolBar):
         # Action to undo a line
         self._undo_line_action = self.make_undo_action()
         self.addAction(self._undo_line_action)
+        # Action to redo an undone change
+        self._redo_line_action = self.make_redo_action()
+        self.addAction(self._redo_line_action)
+        # Action to clear all lines
+        self._clear_action = self.make_clear_action()
+        self.addAction(self._clear_action)
+        # Action to toggle eraser
+        self._eraser_action = self.make_eraser_action()
+        self.addAction(self._eraser_action)
+        # Action to toggle recoloring lines with the selected color
+        self._recolor_action = self.make_recolor_action()
+        self.addAction(self._recolor_action)
+        # Eraser and recolor can both be off but not both on
+        self._brush_group: QActionGroup = QActionGroup(self)
+        self._brush_group.setExclusionPolicy(QActionGroup.ExclusionPolicy.ExclusiveOptional)
+        self._brush_group.addAction(self._eraser_action)
+        self._brush_group.addAction(self._recolor_action)
+        # Action to go back to the starting pan and zoom
+        self._reset_view_action = self.make_reset_view_action()
+        self.addAction(self._reset_view_action)
         # QR code to ngrok URL
         self._show_qr_action = self.make_qr_action()
         self.addAction(self._show_qr_action)
@@ -68,6 +88,72 @@ class DrawingToolBar(QToolBar):
         action.setIconVisibleInMenu(True)
         return action
 
+    def make_redo_action(self) -> QAction:
+        """
+        Make the QAction for redo
+
+        Returns:
+             The action
+        """
+        icon = self.load_redo_icon()
+        action = QAction(icon, 'Redo', self)
+        action.setIconVisibleInMenu(True)
+        return action
+
+    def make_clear_action(self) -> QAction:
+        """
+        Make the QAction for clearing the whiteboard
+
+        Returns:
+             The action
+        """
+        icon = self.load_clear_icon()
+        action = QAction(icon, 'Clear', self)
+        action.setToolTip('Clear whiteboard')
+        action.setIconVisibleInMenu(True)
+        return action
+
+    def make_eraser_action(self) -> QAction:
+        """
+        Make the checkable QAction for eraser
+
+        Returns:
+             The action
+        """
+        icon = self.load_eraser_icon()
+        action = QAction(icon, 'Eraser', self)
+        action.setToolTip('Toggle eraser')
+        action.setCheckable(True)
+        action.setIconVisibleInMenu(True)
+        return action
+
+    def make_recolor_action(self) -> QAction:
+        """
+        Make the checkable QAction for recolor
+
+        Returns:
+             The action
+        """
+        icon = self.load_recolor_icon()
+        action = QAction(icon, 'Recolor', self)
+        action.setToolTip('Toggle recoloring lines with the selected color')
+        action.setCheckable(True)
+        action.setIconVisibleInMenu(True)
+        return action
+
+    def make_reset_view_action(self) -> QAction:
+        """
+        Make the QAction for resetting the view
+
+        Returns:
+             The action
+        """
+        icon = self.load_reset_view_icon()
+        action = QAction(icon, 'Reset view', self)
+        action.setToolTip('Go back to the starting pan and zoom')
+        action.setIconVisibleInMenu(True)
+        return action
+
     def make_qr_action(self) -> QAction:
         """
         Make the QAction for showing QR
@@ -117,6 +203,67 @@ class DrawingToolBar(QToolBar):
         icon = QIcon(icon_path)
         return icon
 
+    @staticmethod
+    def load_redo_icon() -> QIcon:
+        """
+        Load the redo icon for toolbar
+
+        Returns:
+            The icon
+        """
+        icon_path = os.path.join(ROOT_DIR, 'src', 'server_side', 'ui', 'toolbar_widgets', 'icons', 'redo_icon.png')
+        icon = QIcon(icon_path)
+        return icon
+
+    @staticmethod
+    def load_clear_icon() -> QIcon:
+        """
+        Load the clear icon for toolbar
+
+        Returns:
+            The icon
+        """
+        icon_path = os.path.join(ROOT_DIR, 'src', 'server_side', 'ui', 'toolbar_widgets', 'icons', 'clear_icon.png')
+        icon = QIcon(icon_path)
+        return icon
+
+    @staticmethod
+    def load_eraser_icon() -> QIcon:
+        """
+        Load the eraser icon for toolbar
+
+        Returns:
+            The icon
+        """
+        icon_path = os.path.join(ROOT_DIR, 'src', 'server_side', 'ui', 'toolbar_widgets', 'icons', 'eraser_icon.png')
+        icon = QIcon(icon_path)
+        return icon
+
+    @staticmethod
+    def load_recolor_icon() -> QIcon:
+        """
+        Load the recolor icon for toolbar
+
+        Returns:
+            The icon
+        """
+        icon_path = os.path.join(ROOT_DIR, 'src', 'server_side', 'ui', 'toolbar_widgets', 'icons', 'recolor_icon.png')
+        icon = QIcon(icon_path)
+        return icon
+
+    @staticmethod
+    def load_reset_view_icon() -> QIcon:
+        """
+        Load the reset view icon for toolbar
+
+        Returns:
+            The icon
+        """
+        icon_path = os.path.join(ROOT_DIR, 'src', 'server_side', 'ui', 'toolbar_widgets', 'icons',
+                                 'reset_view_icon.png')
+        icon = QIcon(icon_path)
+        return icon
+
     @staticmethod
     def load_qr_icon() -> QIcon:
         """
@@ -168,6 +315,51 @@ class DrawingToolBar(QToolBar):
         """
         return self._undo_line_action
 
+    @property
+    def redo_line_action(self) -> QAction:
+        """
+
+        Return:
+            The 'Redo' action to redo an undone change
+        """
+        return self._redo_line_action
+
+    @property
+    def clear_action(self) -> QAction:
+        """
+
+        Return:
+            The 'Clear' action to remove all lines
+        """
+        return self._clear_action
+
+    @property
+    def eraser_action(self) -> QAction:
+        """
+
+        Return:
+            The 'Eraser' action to toggle eraser
+        """
+        return self._eraser_action
+
+    @property
+    def recolor_action(self) -> QAction:
+        """
+
+        Return:
+            The 'Recolor' action to toggle recoloring lines
+        """
+        return self._recolor_action
+
+    @property
+    def reset_view_action(self) -> QAction:
+        """
+
+        Return:
+            The 'Reset view' action to go back to the starting view
+        """
+        return self._reset_view_action
+
     @property
     def show_qr_action(self) -> QAction:
         """
@@ -0,0 +1,24 @@
+import typing
+import pytest
+from PyQt5.QtCore import QCoreApplication, QEvent
+
+from src.server_side.app.server_app import ServerApp
+
+
+@pytest.fixture(scope="session")
+def qapp_cls() -> typing.Type[ServerApp]:
+    # pytest-qt keeps its app alive until the end, after every widget is gone
+    return ServerApp
+
+
+@pytest.fixture(autouse=True)
+def delete_widgets() -> typing.Iterator[None]:
+    yield
+    # Widgets closed by qtbot are only marked for deletion, delete them
+    # now so none outlive the app at exit
+    if QCoreApplication.instance() is not None:
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+if __name__ == '__main__':
+    pass
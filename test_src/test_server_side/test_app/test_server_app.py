@@ -1,21 +1,14 @@
-import sys
-import pytest
-
 from src.server_side.app.server_app import ServerApp
 
 
-@pytest.fixture(scope="session")
-def server_app() -> ServerApp:
-    return ServerApp(sys.argv)
-
-
 class TestServerApp:
 
-    def test_init_success(self, server_app) -> None:
+    def test_init_success(self, qapp: ServerApp) -> None:
         """
-
+        The app every test runs in is a server app
         """
-        assert server_app.init_success()
+        assert isinstance(qapp, ServerApp)
+        assert qapp.init_success()
 
 
 if __name__ == '__main__':
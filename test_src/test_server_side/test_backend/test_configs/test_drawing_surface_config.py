@@ -4,7 +4,16 @@ import pytest
 from unittest.mock import patch
 
 from src.server_side.backend.configs.drawing_surface_config import DrawingSurfaceConfig
-from src.server_side.backend.configs.drawing_surface_config import DIR_KEY, FILE_KEY, DARK_KEY
+from src.server_side.backend.configs.drawing_surface_config import DIR_KEY, FILE_KEY, DARK_KEY, SIMPLIFY_KEY
+from src.server_side.backend.configs.drawing_surface_config import MIN_MOVE_KEY, COMPRESS_KEY
+from src.server_side.backend.configs.drawing_surface_config import TILE_SIZE_KEY, TILE_THREADS_KEY, HISTORY_KEY
+from src.server_side.backend.configs.drawing_surface_config import HISTORY_DEPTH_KEY, FLATTEN_LINES_KEY, FLATTEN_POINTS_KEY
+from src.server_side.backend.configs.drawing_surface_config import FLATTEN_BYTES_KEY
+from src.server_side.backend.configs.drawing_surface_config import VARIABLE_WIDTH_KEY, SMOOTH_KEY, SMOOTH_SIMPLIFY_KEY
+from src.server_side.backend.configs.drawing_surface_config import REFINE_DELAY_KEY, FRAME_RATE_KEY, PREDICT_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_IDLE_KEY, EXPORT_BYTES_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_PALETTE_KEY, EXPORT_SCALE_KEY
+from src.server_side.backend.configs.drawing_surface_config import EXPORT_CROP_KEY
 
 
 @pytest.fixture
@@ -57,6 +66,46 @@ class TestDrawingSurfaceConfig:
                 assert dark_mode == default
         os.remove((dir_val + file_val))
 
+    @pytest.mark.parametrize("saved", [True, False])
+    def test_load_value(self, ds_config_fix: DrawingSurfaceConfig, saved: bool) -> None:
+        """
+        Keys missing from saved file fall back to default
+        """
+        mock_data = {'dark_mode': True}
+        if saved:
+            mock_data[SIMPLIFY_KEY] = 2.0
+        dir_val = os.path.dirname(os.path.abspath(__file__)) + '/'
+        file_val = 'tmpl8ouwchk.pkl'
+        pickle.dump(mock_data, open((dir_val + file_val), 'wb'))
+        ds_config_fix[FILE_KEY] = file_val
+        ds_config_fix[DIR_KEY] = dir_val
+        value = ds_config_fix.load_value(SIMPLIFY_KEY, 0.5)
+        assert value == (2.0 if saved else 0.5)
+        os.remove((dir_val + file_val))
+        # No file
+        assert ds_config_fix.load_value(SIMPLIFY_KEY, 0.5) == 0.5
+
+    def test_init_reads_once(self) -> None:
+        """
+        Saved config is read once for all keys
+        """
+        with patch('os.path.exists', return_value=True):
+            with patch('builtins.open'):
+                with patch('pickle.load', return_value={SIMPLIFY_KEY: 2.0}) as patch_load:
+                    ds_config = DrawingSurfaceConfig()
+                    patch_load.assert_called_once()
+        assert ds_config[SIMPLIFY_KEY] == 2.0
+        assert ds_config[DARK_KEY] is False
+
+    def test_init_stroke_defaults(self) -> None:
+        """
+        Lines are painted with a fixed width and straight segments unless turned on
+        """
+        with patch('os.path.exists', return_value=False):
+            ds_config = DrawingSurfaceConfig()
+        assert ds_config[VARIABLE_WIDTH_KEY] is False
+        assert ds_config[SMOOTH_KEY] is False
+
     @pytest.mark.parametrize(["exists", "dark"], [(True, False), (False, True)])
     def test_save(self, ds_config_fix: DrawingSurfaceConfig, exists: bool, dark: bool) -> None:
         """
@@ -67,7 +116,21 @@ class TestDrawingSurfaceConfig:
         ds_config_fix[FILE_KEY] = file_val
         ds_config_fix[DIR_KEY] = dir_val
         ds_config_fix[DARK_KEY] = dark
-        mock_data = {'save_dir': dir_val, 'file_name': file_val, 'dark_mode': dark}
+        mock_data = {'save_dir': dir_val, 'file_name': file_val, 'dark_mode': dark,
+                     SIMPLIFY_KEY: ds_config_fix[SIMPLIFY_KEY], MIN_MOVE_KEY: ds_config_fix[MIN_MOVE_KEY],
+                     COMPRESS_KEY: ds_config_fix[COMPRESS_KEY], TILE_SIZE_KEY: ds_config_fix[TILE_SIZE_KEY],
+                     TILE_THREADS_KEY: ds_config_fix[TILE_THREADS_KEY], HISTORY_KEY: ds_config_fix[HISTORY_KEY],
+                     HISTORY_DEPTH_KEY: ds_config_fix[HISTORY_DEPTH_KEY],
+                     FLATTEN_LINES_KEY: ds_config_fix[FLATTEN_LINES_KEY],
+                     FLATTEN_POINTS_KEY: ds_config_fix[FLATTEN_POINTS_KEY],
+                     FLATTEN_BYTES_KEY: ds_config_fix[FLATTEN_BYTES_KEY],
+                     VARIABLE_WIDTH_KEY: ds_config_fix[VARIABLE_WIDTH_KEY], SMOOTH_KEY: ds_config_fix[SMOOTH_KEY],
+                     SMOOTH_SIMPLIFY_KEY: ds_config_fix[SMOOTH_SIMPLIFY_KEY],
+                     REFINE_DELAY_KEY: ds_config_fix[REFINE_DELAY_KEY], FRAME_RATE_KEY: ds_config_fix[FRAME_RATE_KEY],
+                     PREDICT_KEY: ds_config_fix[PREDICT_KEY], EXPORT_IDLE_KEY: ds_config_fix[EXPORT_IDLE_KEY],
+                     EXPORT_BYTES_KEY: ds_config_fix[EXPORT_BYTES_KEY],
+                     EXPORT_PALETTE_KEY: ds_config_fix[EXPORT_PALETTE_KEY],
+                     EXPORT_SCALE_KEY: ds_config_fix[EXPORT_SCALE_KEY], EXPORT_CROP_KEY: ds_config_fix[EXPORT_CROP_KEY]}
         ds_config_fix.save()
         with open(dir_val + file_val, 'rb') as save_file:
             saved_data = pickle.load(save_file)
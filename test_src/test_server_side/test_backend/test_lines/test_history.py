@@ -0,0 +1,274 @@
+from unittest.mock import patch
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtGui import QColor
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.history import History, Command, AddCommand, EraseCommand, ClearCommand
+from src.server_side.backend.lines.history import RecolorCommand, POINT_BYTES
+
+
+@pytest.fixture
+def line_list_fix() -> LineList:
+    return LineList()
+
+
+@pytest.fixture
+def history_fix(line_list_fix: LineList) -> History:
+    return History(line_list_fix, budget=100)
+
+
+def make_line(points: typing.List[QPoint], color: str = 'black') -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    color_line.color = QColor(color)
+    return color_line
+
+
+def line_ids(line_list: LineList) -> typing.List[int]:
+    return [id(color_line) for color_line in line_list.line_list]
+
+
+class TestCommand:
+
+    def test_bounds(self) -> None:
+        """
+
+        """
+        command = AddCommand([make_line([QPoint(0, 0), QPoint(5, 5)]), make_line([QPoint(20, 10)])])
+        assert command.bounds() == QRect(QPoint(0, 0), QPoint(20, 10))
+        assert AddCommand([]).bounds().isNull()
+
+    def test_abstract(self) -> None:
+        """
+
+        """
+        with pytest.raises(TypeError):
+            Command([])
+
+    def test_cost(self) -> None:
+        """
+        Every command costs the points of its lines
+        """
+        lines = [make_line([QPoint(0, 0), QPoint(5, 5), QPoint(9, 0)]), make_line([QPoint(20, 10)])]
+        assert AddCommand(lines).cost == 4
+        assert EraseCommand(lines).cost == 4
+        # Old lines and their recolored copies
+        assert RecolorCommand(lines, QColor('red')).cost == 8
+
+    def test_add_command(self, line_list_fix: LineList) -> None:
+        """
+        Redo after undo does not simplify again
+        """
+        color_line = make_line([QPoint(0, 0), QPoint(5, 5)])
+        command = AddCommand([color_line])
+        command.redo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(color_line)]
+        command.undo(line_list_fix)
+        assert line_list_fix.line_list == []
+        with patch.object(line_list_fix, 'add_line') as patch_add:
+            command.redo(line_list_fix)
+            patch_add.assert_not_called()
+        assert line_ids(line_list_fix) == [id(color_line)]
+
+    def test_erase_command(self, line_list_fix: LineList) -> None:
+        """
+        Undo puts lines back in paint order
+        """
+        lines = [make_line([QPoint(i, i), QPoint(i + 5, i)]) for i in range(3)]
+        for color_line in lines:
+            line_list_fix.add_line(color_line)
+        command = EraseCommand([lines[0], lines[2]])
+        assert command.cost == 4
+        command.redo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(lines[1])]
+        command.undo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(color_line) for color_line in lines]
+        assert line_list_fix.query_rect(QRect(0, 0, 10, 10)) == lines
+
+    def test_erase_command_flattened(self, line_list_fix: LineList) -> None:
+        """
+        Undo after older lines were flattened still puts lines back under newer lines
+        """
+        lines = [make_line([QPoint(i, i), QPoint(i + 5, i)]) for i in range(8)]
+        for color_line in lines:
+            line_list_fix.add_line(color_line)
+        command = EraseCommand([lines[5]])
+        command.redo(line_list_fix)
+        line_list_fix.flatten_lines(3)
+        command.undo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(color_line) for color_line in lines[3:]]
+
+    def test_clear_command(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        lines = [make_line([QPoint(i, i)]) for i in range(3)]
+        for color_line in lines:
+            line_list_fix.add_line(color_line)
+        command = ClearCommand(line_list_fix)
+        command.redo(line_list_fix)
+        assert line_list_fix.line_list == []
+        command.undo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(color_line) for color_line in lines]
+
+    def test_clear_command_raster(self, line_list_fix: LineList) -> None:
+        """
+        Flattened ink is cleared and restored too
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(300, 10)]))
+        line_list_fix.flatten_lines(1)
+        command = ClearCommand(line_list_fix)
+        assert command.raster_rects() == [QRect(0, 0, 256, 256), QRect(256, 0, 256, 256)]
+        ink_rect = line_list_fix.raster_layer.ink_rect
+        command.redo(line_list_fix)
+        assert len(line_list_fix.raster_layer) == 0
+        assert line_list_fix.content_rect.isNull()
+        command.undo(line_list_fix)
+        assert len(line_list_fix.raster_layer) == 2
+        assert line_list_fix.raster_layer.ink_rect == ink_rect
+        assert AddCommand([]).raster_rects() == []
+
+    def test_clear_command_cost(self, line_list_fix: LineList) -> None:
+        """
+        Cleared chunks are counted and cost does not change on undo
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(300, 10)]))
+        line_list_fix.flatten_lines(1)
+        line_list_fix.add_line(make_line([QPoint(1, 1), QPoint(5, 1)]))
+        command = ClearCommand(line_list_fix)
+        cost = 2 + line_list_fix.raster_layer.num_bytes // POINT_BYTES
+        assert command.cost == cost
+        command.redo(line_list_fix)
+        assert command.cost == cost
+        command.undo(line_list_fix)
+        assert command.cost == cost
+
+    def test_recolor_command(self, line_list_fix: LineList) -> None:
+        """
+        Lines are replaced by recolored copies in the same order
+        """
+        red_line = make_line([QPoint(1, 1)], 'red')
+        blue_line = make_line([QPoint(2, 2)], 'blue')
+        black_line = make_line([QPoint(3, 3)])
+        for color_line in [red_line, black_line, blue_line]:
+            line_list_fix.add_line(color_line)
+        command = RecolorCommand([blue_line, red_line], QColor('green'))
+        assert command.lines[:2] == [blue_line, red_line]
+        assert command.cost == 4
+        version = line_list_fix.version
+        command.redo(line_list_fix)
+        # Old lines are untouched for snapshots still painting them
+        assert red_line.color == QColor('red')
+        assert blue_line.color == QColor('blue')
+        new_red, new_black, new_blue = line_list_fix.line_list
+        assert new_black is black_line
+        assert new_red.color == QColor('green') and new_red.points == [QPoint(1, 1)]
+        assert new_blue.color == QColor('green') and new_blue.points == [QPoint(2, 2)]
+        assert line_list_fix.query_point(2, 2, 0.5) == [new_blue]
+        assert line_list_fix.version > version
+        command.undo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(red_line), id(black_line), id(blue_line)]
+        command.redo(line_list_fix)
+        assert line_ids(line_list_fix) == [id(new_red), id(black_line), id(new_blue)]
+
+
+class TestHistory:
+
+    def test_undo_redo(self, history_fix: History, line_list_fix: LineList) -> None:
+        """
+
+        """
+        assert not history_fix.can_undo
+        assert history_fix.undo() is None
+        assert history_fix.redo() is None
+        first_line = make_line([QPoint(1, 1)])
+        second_line = make_line([QPoint(2, 2)])
+        history_fix.execute(AddCommand([first_line]))
+        history_fix.execute(AddCommand([second_line]))
+        command = history_fix.undo()
+        assert command.lines == [second_line]
+        assert line_ids(line_list_fix) == [id(first_line)]
+        assert history_fix.can_redo
+        assert history_fix.redo() is command
+        assert line_ids(line_list_fix) == [id(first_line), id(second_line)]
+        assert not history_fix.can_redo
+
+    def test_execute_clears_redo(self, history_fix: History) -> None:
+        """
+
+        """
+        history_fix.execute(EraseCommand([make_line([QPoint(1, 1), QPoint(2, 2)])]))
+        history_fix.undo()
+        assert history_fix.cost == 2
+        history_fix.execute(AddCommand([make_line([QPoint(3, 3)])]))
+        assert not history_fix.can_redo
+        assert history_fix.cost == 1
+
+    def test_compact(self, history_fix: History, line_list_fix: LineList) -> None:
+        """
+        Oldest commands are dropped past the budget
+        """
+        lines = [make_line([QPoint(i, 0), QPoint(i, 50)]) for i in range(0, 100, 10)]
+        history_fix.execute(AddCommand(lines))
+        for color_line in lines:
+            history_fix.execute(EraseCommand([color_line]))
+        # Every command holds 2 points per line and the budget is 100
+        assert history_fix.cost == 2 * 10 + 2 * 10
+        # Zig zag so simplify keeps every point
+        big_line = make_line([QPoint(i, (i % 2) * 10) for i in range(45)])
+        history_fix.execute(AddCommand([big_line]))
+        history_fix.execute(EraseCommand([big_line]))
+        assert history_fix.cost == 100
+        assert len(history_fix._undo_stack) == 7
+        while history_fix.undo() is not None:
+            pass
+        # Only the newest erases could be undone
+        assert line_ids(line_list_fix) == [id(color_line) for color_line in lines[5:]]
+
+    def test_compact_keeps_newest(self, history_fix: History) -> None:
+        """
+
+        """
+        history_fix.execute(EraseCommand([make_line([QPoint(i, 0) for i in range(200)])]))
+        assert history_fix.can_undo
+        assert history_fix.cost == 200
+
+    def test_compact_depth(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        history = History(line_list_fix, depth=3)
+        for i in range(5):
+            history.execute(AddCommand([make_line([QPoint(i, i)])]))
+        assert len(history._undo_stack) == 3
+        assert history.cost == 3
+
+    def test_referenced_lines(self, history_fix: History, line_list_fix: LineList) -> None:
+        """
+        Lines in either stack are past nothing
+        """
+        first_line = make_line([QPoint(1, 1)])
+        second_line = make_line([QPoint(2, 2)])
+        line_list_fix.add_line(make_line([QPoint(3, 3)]))
+        history_fix.execute(AddCommand([first_line]))
+        history_fix.execute(AddCommand([second_line]))
+        history_fix.undo()
+        assert history_fix.referenced_lines() == {id(first_line), id(second_line)}
+
+    def test_clear(self, history_fix: History) -> None:
+        """
+
+        """
+        history_fix.execute(AddCommand([make_line([QPoint(1, 1)])]))
+        history_fix.undo()
+        history_fix.clear()
+        assert not history_fix.can_undo
+        assert not history_fix.can_redo
+        assert history_fix.cost == 0
+
+
+if __name__ == "__main__":
+    pass
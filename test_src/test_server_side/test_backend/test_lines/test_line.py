@@ -1,7 +1,8 @@
 from unittest.mock import patch
 import pytest
 import typing
-from PyQt5.QtCore import QPoint
+from array import array
+from PyQt5.QtCore import QPoint, QRect
 from PyQt5.QtGui import QColor
 
 from src.server_side.backend.lines.line import Line, ColorLine
@@ -23,35 +24,100 @@ class TestLine:
         """
 
         """
-        assert line_fix._points is line_fix.points
         assert isinstance(line_fix.points, list)
+        line_fix.add_points([QPoint(1, 2), QPoint(3, 4)])
+        assert line_fix.points == [QPoint(1, 2), QPoint(3, 4)]
+
+    def test_coords_getter(self, line_fix: Line) -> None:
+        """
+
+        """
+        assert line_fix._points is line_fix.coords
+        assert isinstance(line_fix.coords, array)
+        line_fix.add_points([QPoint(1, 2), QPoint(3, 4)])
+        assert line_fix.coords.tolist() == [1, 2, 3, 4]
+
+    def test_num_points_getter(self, line_fix: Line) -> None:
+        """
+
+        """
+        assert line_fix.num_points == 0
+        line_fix.add_points([QPoint(1, 2), QPoint(3, 4)])
+        assert line_fix.num_points == 2
+
+    def test_widths_getter(self, line_fix: Line) -> None:
+        """
+        Widths are stored in tenths of a pixel
+        """
+        line_fix.add_point(QPoint(1, 2))
+        assert line_fix.widths == []
+        assert not line_fix.variable_width
+        assert line_fix.last_width is None
+        line_fix.add_point(QPoint(3, 4), 2.54)
+        assert line_fix.widths == [2.5, 2.5]
+        assert line_fix.variable_width
+        assert line_fix.last_width == 2.5
+        assert line_fix._widths == array('B', [25, 25])
+
+    def test_smooth(self, line_fix: Line) -> None:
+        """
+
+        """
+        assert not line_fix.smooth
+        line_fix.shape = object()
+        line_fix.smooth = True
+        assert line_fix.smooth
+        assert line_fix.shape is None
+
+    def test_shape(self, line_fix: Line) -> None:
+        """
+        Cached shape is kept while points are added and
+        dropped whenever points change otherwise
+        """
+        assert line_fix.shape is None
+        shape = object()
+        line_fix.shape = shape
+        line_fix.add_points([QPoint(0, 0), QPoint(5, 0)])
+        line_fix.add_point(QPoint(10, 0), 2.0)
+        # Earlier points were given widths
+        assert line_fix.shape is None
+        line_fix.shape = shape
+        line_fix.add_points([QPoint(10, 10), QPoint(20, 10)])
+        assert line_fix.shape is shape
+        for change in [lambda: line_fix.simplify(0.5), line_fix.make_straight, line_fix.clear]:
+            line_fix.shape = shape
+            change()
+            assert line_fix.shape is None
+
+    def test_slots(self, line_fix: Line, color_line_fix: ColorLine) -> None:
+        """
+        No per instance dict
+        """
+        assert not hasattr(line_fix, '__dict__')
+        assert not hasattr(color_line_fix, '__dict__')
 
     @pytest.mark.parametrize("points_list", [([QPoint(1, 1), QPoint(2, 2), QPoint(3, 3)]), ([QPoint(1, 1)])])
     def test_make_straight(self, line_fix: Line, points_list: typing.List[QPoint]) -> None:
         """
 
         """
-        line_fix._points = points_list
+        line_fix.add_points(points_list)
+        line_fix.make_straight()
         if len(points_list) > 2:
-            first_point = points_list[0]
-            last_point = points_list[-1]
-            line_fix.make_straight()
-            assert line_fix._points[0] is first_point
-            assert line_fix._points[-1] is last_point
+            assert line_fix.points == [points_list[0], points_list[-1]]
         else:
-            line_fix.make_straight()
-            assert line_fix._points is points_list
+            assert line_fix.points == points_list
 
     @pytest.mark.parametrize("points_list", [([QPoint(1, 1), QPoint(2, 2)]), ([(1, 1), (2, 2)]), ((1, 1),)])
     def test_add_points(self, line_fix: Line, points_list: typing.Any) -> None:
         """
 
         """
-        original_length = len(line_fix._points)
+        original_length = line_fix.num_points
         num_new_points = len(points_list)
         if isinstance(points_list, list):
             line_fix.add_points(points_list)
-            new_length = len(line_fix._points)
+            new_length = line_fix.num_points
             assert new_length == original_length + num_new_points
         else:
             with pytest.raises(AssertionError):
@@ -63,12 +129,109 @@ class TestLine:
         """
 
         """
-        original_length = len(line_fix._points)
+        original_length = line_fix.num_points
         line_fix.add_point(point)
-        new_length = len(line_fix._points)
+        new_length = line_fix.num_points
         assert new_length == original_length + 1
         # Even tuple should be converted to QPoint
-        assert isinstance(line_fix._points[-1], QPoint)
+        assert isinstance(line_fix.points[-1], QPoint)
+
+    def test_add_point_width(self, line_fix: Line) -> None:
+        """
+        Widths stay one per point once any point has a width
+        """
+        line_fix.add_points([QPoint(1, 1), QPoint(2, 2)])
+        line_fix.add_point(QPoint(3, 3), 3.0)
+        line_fix.add_point(QPoint(4, 4))
+        line_fix.add_point(QPoint(5, 5), 1.0)
+        assert line_fix.widths == [3.0, 3.0, 3.0, 3.0, 1.0]
+        # Out of range widths are clamped to one byte
+        line_fix.add_point(QPoint(6, 6), 0.0)
+        line_fix.add_point(QPoint(7, 7), 100.0)
+        assert line_fix.widths[-2:] == [0.1, 25.5]
+
+    @pytest.mark.parametrize("point", [(1.5, 2), (1, 2, 3)])
+    def test_add_point_invalid(self, line_fix: Line, point: typing.Tuple) -> None:
+        """
+        Non int and wrong length points are rejected
+        """
+        with pytest.raises((TypeError, ValueError)):
+            line_fix.add_point(point)
+        assert line_fix.num_points == 0
+
+    def test_clear(self, line_fix: Line) -> None:
+        """
+
+        """
+        line_fix.add_points([QPoint(1, 2), QPoint(3, 4)])
+        coords = line_fix.coords
+        line_fix.clear()
+        assert line_fix.num_points == 0
+        assert line_fix.coords is coords
+        line_fix.add_point(QPoint(1, 2), 2.0)
+        line_fix.clear()
+        assert line_fix.widths == []
+
+    @pytest.mark.parametrize(["tolerance", "num_removed"], [(0.0, 0), (0.5, 3), (10.0, 4)])
+    def test_simplify(self, line_fix: Line, tolerance: float, num_removed: int) -> None:
+        """
+        Collinear points are removed, the corner is kept
+        unless it is within tolerance
+        """
+        points = [QPoint(0, 0), QPoint(5, 0), QPoint(10, 0), QPoint(20, 0), QPoint(20, 3), QPoint(20, 10)]
+        line_fix.add_points(points)
+        assert line_fix.simplify(tolerance) == num_removed
+        assert line_fix.num_points == len(points) - num_removed
+        assert line_fix.points[0] == points[0]
+        assert line_fix.points[-1] == points[-1]
+        if tolerance == 0.5:
+            assert line_fix.points == [QPoint(0, 0), QPoint(20, 0), QPoint(20, 10)]
+
+    def test_simplify_widths(self, line_fix: Line) -> None:
+        """
+        Widths of removed points are removed
+        """
+        for x, width in [(0, 1.0), (5, 2.0), (10, 3.0), (20, 4.0)]:
+            line_fix.add_point(QPoint(x, 0), width)
+        line_fix.add_point(QPoint(20, 10), 1.5)
+        line_fix.simplify(0.5)
+        assert line_fix.widths == [1.0, 4.0, 1.5]
+        line_fix.make_straight()
+        assert line_fix.widths == [1.0, 1.5]
+
+    def test_simplify_doubling_back(self, line_fix: Line) -> None:
+        """
+        Points beyond the segment ends must be kept
+        """
+        line_fix.add_points([QPoint(0, 0), QPoint(30, 0), QPoint(10, 0)])
+        assert line_fix.simplify(1.0) == 0
+        assert line_fix.num_points == 3
+        # Closed loop has zero length first to last segment
+        loop = Line()
+        loop.add_points([QPoint(0, 0), QPoint(10, 0), QPoint(10, 10), QPoint(0, 0)])
+        assert loop.simplify(1.0) == 0
+
+    @pytest.mark.parametrize(["x", "y", "radius", "near"], [(5, 2, 2.0, True), (5, 3, 2.0, False),
+                                                            (12, 0, 2.0, True), (13, 0, 2.0, False)])
+    def test_is_near(self, line_fix: Line, x: int, y: int, radius: float, near: bool) -> None:
+        """
+
+        """
+        assert not line_fix.is_near(x, y, radius)
+        line_fix.add_points([QPoint(0, 0), QPoint(10, 0)])
+        assert line_fix.is_near(x, y, radius) == near
+        dot = Line()
+        dot.add_point(QPoint(0, 0))
+        assert dot.is_near(1, 1, 2.0)
+        assert not dot.is_near(2, 2, 2.0)
+
+    def test_bounding_rect(self, line_fix: Line) -> None:
+        """
+
+        """
+        assert line_fix.bounding_rect().isNull()
+        line_fix.add_points([QPoint(5, 20), QPoint(15, 2), QPoint(8, 9)])
+        assert line_fix.bounding_rect() == QRect(QPoint(5, 2), QPoint(15, 20))
 
     def test_make_copy(self, line_fix: Line) -> None:
         """
@@ -79,8 +242,18 @@ class TestLine:
         copy = line_fix.make_copy()
         assert line_fix == copy
         assert line_fix is not copy
-        line_fix._points.pop()
+        assert line_fix.coords is not copy.coords
+        assert type(copy) is Line
+        line_fix.add_point(QPoint(2, 2), 3.0)
         assert line_fix != copy
+        line_fix.smooth = True
+        line_fix.shape = object()
+        copy = line_fix.make_copy()
+        assert copy.widths == [3.0, 3.0]
+        assert copy.smooth
+        assert copy.shape is None
+        copy.add_point(QPoint(3, 3))
+        assert line_fix.widths == [3.0, 3.0]
 
     def test_equal(self) -> None:
         """
@@ -100,8 +273,8 @@ class TestColorLine:
         """
 
         """
-        assert color_line_fix._color is color_line_fix.color
         assert isinstance(color_line_fix.color, QColor)
+        assert color_line_fix.color.rgba() == color_line_fix._rgba
 
     @pytest.mark.parametrize("new_color", [QColor.fromRgbF(0.0, 1.0, 0.5, 1.0), QColor("invalid")])
     def test_color_setter(self, color_line_fix: ColorLine, new_color: QColor) -> None:
@@ -111,9 +284,16 @@ class TestColorLine:
         """
         color_line_fix.color = new_color
         if new_color == QColor.fromRgbF(0.0, 1.0, 0.5, 1.0):
-            assert color_line_fix._color is new_color
+            assert color_line_fix._rgba == new_color.rgba()
         else:
-            assert color_line_fix._color is not new_color
+            assert color_line_fix._rgba == QColor('black').rgba()
+
+    def test_rgba_getter(self, color_line_fix: ColorLine) -> None:
+        """
+
+        """
+        assert color_line_fix.rgba == color_line_fix._rgba
+        assert isinstance(color_line_fix.rgba, int)
 
     def test_make_copy_points(self, color_line_fix: ColorLine) -> None:
         """
@@ -125,7 +305,7 @@ class TestColorLine:
         copy = color_line_fix.make_copy()
         assert color_line_fix == copy
         assert color_line_fix is not copy
-        color_line_fix._points.pop()
+        color_line_fix.add_point(QPoint(2, 2))
         assert color_line_fix != copy
 
     def test_make_copy_color(self, color_line_fix: ColorLine) -> None:
@@ -133,10 +313,12 @@ class TestColorLine:
         Check that the color is copied correctly
 
         """
-        color_line_fix._color = QColor.fromRgbF(0.0, 1.0, 0.5, 1.0)
+        color_line_fix.color = QColor.fromRgbF(0.0, 1.0, 0.5, 1.0)
         copy = color_line_fix.make_copy()
         assert color_line_fix == copy
         assert color_line_fix is not copy
+        assert type(copy) is ColorLine
+        assert copy.rgba == color_line_fix.rgba
         color_line_fix.color = QColor.fromRgbF(1.0, 1.0, 0.5, 1.0)
         assert color_line_fix != copy
 
@@ -148,8 +330,8 @@ class TestColorLine:
         line1 = ColorLine()
         line2 = ColorLine()
         assert line1 == line2
-        line1._color = QColor.fromRgbF(1.0, 1.0, 0.5, 1.0)
-        assert line1._points == line2._points
+        line1.color = QColor.fromRgbF(1.0, 1.0, 0.5, 1.0)
+        assert line1.points == line2.points
         assert line1 != line2
 
     @pytest.mark.parametrize("super_equal", [True, False])
@@ -176,11 +358,12 @@ class TestColorLine:
         color.setRed(55)
         color.setGreen(100)
         color.setBlue(255)
-        color_line_fix._color = color
+        color_line_fix.color = color
         color_line_fix.invert_color()
-        assert color_line_fix._color.red() == 200
-        assert color_line_fix._color.green() == 155
-        assert color_line_fix._color.blue() == 0
+        assert color_line_fix.color.red() == 200
+        assert color_line_fix.color.green() == 155
+        assert color_line_fix.color.blue() == 0
+        assert color_line_fix.color.alpha() == 255
 
 
 if __name__ == '__main__':
@@ -2,11 +2,13 @@ import pytest
 
 import typing
 
-from PyQt5.QtCore import QPoint
+from PyQt5.QtCore import QPoint, QRect
 from PyQt5.QtGui import QColor
 
 from src.server_side.backend.lines.line import ColorLine
-from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.line_list import LineList, FLATTEN_BATCH
+
+NO_BYTE_LIMIT: int = 1 << 40
 
 
 @pytest.fixture
@@ -53,35 +55,242 @@ class TestLineList:
         new_num_lines = len(line_list_fix._line_list)
         if len(points) == 1:
             assert new_num_lines == original_num_lines + 1
+            assert color_line in line_list_fix._index
         else:
             # Line not added if no points
             assert len(points) == 0
             assert new_num_lines == original_num_lines
 
+    def test_version(self, line_list_fix: LineList) -> None:
+        """
+        Every change that can be seen makes a new version
+        """
+        versions = [line_list_fix.version]
+        first_line = ColorLine()
+        first_line.add_points([QPoint(1, 1), QPoint(5, 5)])
+        second_line = ColorLine()
+        second_line.add_points([QPoint(10, 10), QPoint(50, 50)])
+        line_list_fix.add_line(first_line)
+        versions.append(line_list_fix.version)
+        line_list_fix.add_line(second_line)
+        versions.append(line_list_fix.version)
+        entries = line_list_fix.remove_lines([first_line])
+        versions.append(line_list_fix.version)
+        line_list_fix.insert_lines(entries)
+        versions.append(line_list_fix.version)
+        line_list_fix.remove_last_line()
+        versions.append(line_list_fix.version)
+        assert versions == sorted(set(versions))
+        # Empty lines are not added and flattening looks the same
+        line_list_fix.add_line(ColorLine())
+        line_list_fix.flatten_lines(1)
+        assert line_list_fix.version == versions[-1]
+
+    def test_add_line_simplify(self) -> None:
+        """
+        Lines are simplified with the list tolerance
+        """
+        line_list = LineList(simplify_tolerance=0.5)
+        color_line = ColorLine()
+        color_line.add_points([QPoint(0, 0), QPoint(1, 0), QPoint(2, 0), QPoint(3, 0)])
+        assert line_list.add_line(color_line) == 2
+        assert line_list.line_list[-1].num_points == 2
+        # No tolerance by default
+        line_list = LineList()
+        color_line = ColorLine()
+        color_line.add_points([QPoint(0, 0), QPoint(1, 0), QPoint(2, 0)])
+        assert line_list.add_line(color_line) == 0
+
+    @pytest.mark.parametrize("smooth", [True, False])
+    def test_add_line_smooth(self, smooth: bool) -> None:
+        """
+        Smooth lines are simplified with their own tolerance
+        """
+        line_list = LineList(simplify_tolerance=0.5, smooth_tolerance=2.0)
+        color_line = ColorLine()
+        color_line.smooth = smooth
+        color_line.add_points([QPoint(0, 0), QPoint(5, 1), QPoint(10, 0)])
+        assert line_list.add_line(color_line) == (1 if smooth else 0)
+
     def test_remove_last_line(self, line_list_fix: LineList) -> None:
         """
 
         """
         original_num_lines = len(line_list_fix._line_list)
         last_line = line_list_fix._line_list[-1]
-        line_list_fix.remove_last_line()
+        assert line_list_fix.remove_last_line() is last_line
         new_num_lines = len(line_list_fix._line_list)
         assert new_num_lines == original_num_lines - 1
         assert last_line not in line_list_fix._line_list
+        assert last_line not in line_list_fix._index
         # Make sure IndexError handled
         line_list_fix._line_list.clear()
+        assert line_list_fix.remove_last_line() is None
+
+    def test_remove_lines(self, line_list_fix: LineList) -> None:
+        """
+        Lines are removed by identity, not equality
+        """
+        first_line = line_list_fix.line_list[0]
+        equal_line = first_line.make_copy()
+        line_list_fix.add_line(equal_line)
+        list_object = line_list_fix.line_list
+        entries = line_list_fix.remove_lines([equal_line])
+        assert entries == [(2, equal_line)]
+        assert line_list_fix.line_list is list_object
+        assert line_list_fix.line_list[0] is first_line
+        assert len(line_list_fix.line_list) == 2
+        assert equal_line not in line_list_fix._index
+        assert first_line in line_list_fix._index
+
+    def test_insert_lines(self, line_list_fix: LineList) -> None:
+        """
+        Removed lines go back in their paint order
+        """
+        first_line, second_line = line_list_fix.line_list
+        third_line = ColorLine()
+        third_line.add_points([QPoint(0, 0), QPoint(5, 5)])
+        line_list_fix.add_line(third_line)
+        entries = line_list_fix.remove_lines([third_line, first_line])
+        assert line_list_fix.line_list == [second_line]
+        line_list_fix.insert_lines(entries)
+        assert [id(color_line) for color_line in line_list_fix.line_list] == \
+               [id(first_line), id(second_line), id(third_line)]
+        assert line_list_fix.query_rect(QRect(0, 0, 10, 10)) == [first_line, second_line, third_line]
+        assert line_list_fix._index.get_order(third_line) == 2
+
+    def test_num_points(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        assert line_list_fix.num_points == 2
+        third_line = ColorLine()
+        third_line.add_points([QPoint(0, 0), QPoint(5, 9), QPoint(10, 0)])
+        line_list_fix.add_line(third_line)
+        assert line_list_fix.num_points == 5
+        entries = line_list_fix.remove_lines([third_line])
+        assert line_list_fix.num_points == 2
+        line_list_fix.insert_lines(entries)
+        assert line_list_fix.num_points == 5
         line_list_fix.remove_last_line()
+        assert line_list_fix.num_points == 2
+
+    @pytest.mark.parametrize("max_lines, max_points, over", [(10, 10, False), (1, 10, True), (8, 1, True),
+                                                              (2, 2, False)])
+    def test_over_budget(self, line_list_fix: LineList, max_lines: int, max_points: int, over: bool) -> None:
+        """
 
-    def test_invert_lines_colors(self, line_list_fix: LineList) -> None:
         """
+        assert line_list_fix.over_budget(max_lines, max_points) == over
 
+    @pytest.mark.parametrize("max_lines, max_points, count", [(10, 10, 0), (1, 10, 2), (8, 1, 2), (2, 2, 1)])
+    def test_count_to_flatten(self, line_list_fix: LineList, max_lines: int, max_points: int, count: int) -> None:
+        """
+        Enough lines are counted to get under three quarters of budget
         """
-        line_list_fix.invert_lines_colors()
-        for line in line_list_fix._line_list:
-            # Lines were black before invert
-            assert line._color.red() == 255
-            assert line._color.green() == 255
-            assert line._color.blue() == 255
+        assert line_list_fix.count_to_flatten(max_lines, max_points, NO_BYTE_LIMIT) == count
+
+    def test_count_to_flatten_target(self) -> None:
+        """
+
+        """
+        line_list = LineList()
+        for i in range(10):
+            color_line = ColorLine()
+            color_line.add_point(QPoint(i, i))
+            line_list.add_line(color_line)
+        assert line_list.count_to_flatten(10, 100, NO_BYTE_LIMIT) == 3
+        assert line_list.count_to_flatten(8, 100, NO_BYTE_LIMIT) == 4
+
+    def test_count_to_flatten_batch(self) -> None:
+        """
+        Lines are counted a batch of points at a time
+        """
+        line_list = LineList()
+        for i in range(3):
+            color_line = ColorLine()
+            # Zigzag so no points are simplified away
+            color_line.add_points([QPoint(j, 10 * i + 5 * (j % 2)) for j in range(FLATTEN_BATCH // 2)])
+            line_list.add_line(color_line)
+        assert line_list.count_to_flatten(0, 0, NO_BYTE_LIMIT) == 2
+
+    def test_count_to_flatten_bytes(self, line_list_fix: LineList) -> None:
+        """
+        Lines whose chunks would take raster over budget are not counted
+        """
+        # Both lines touch the same 4 chunks around the origin
+        max_bytes = 4 * line_list_fix.raster_layer.chunk_bytes
+        assert line_list_fix.count_to_flatten(0, 0, max_bytes - 1) == 0
+        assert line_list_fix.count_to_flatten(0, 0, max_bytes) == 2
+        line_list_fix.flatten_lines(1)
+        assert line_list_fix.count_to_flatten(0, 0, max_bytes) == 1
+
+    def test_flatten_lines(self, line_list_fix: LineList) -> None:
+        """
+        Oldest lines move into the raster layer
+        """
+        old_line = ColorLine()
+        old_line.add_points([QPoint(10, 10), QPoint(20, 10)])
+        line_list_fix.insert_lines([(-1, old_line)])
+        flattened = line_list_fix.flatten_lines(1)
+        assert flattened == [old_line]
+        assert len(line_list_fix.line_list) == 2
+        assert old_line not in line_list_fix._index
+        assert line_list_fix.num_points == 2
+        assert len(line_list_fix.raster_layer) == 1
+        _, image = line_list_fix.raster_layer.chunks(QRect(0, 0, 1, 1))[0]
+        assert image.pixelColor(15, 10) == QColor('black')
+
+    def test_content_rect(self, line_list_fix: LineList) -> None:
+        """
+        Union grows on add and is only found again when an edge line is removed
+        """
+        assert line_list_fix.content_rect == QRect(QPoint(1, 1), QPoint(2, 2))
+        outer_line = ColorLine()
+        outer_line.add_points([QPoint(-10, 0), QPoint(40, 30)])
+        line_list_fix.add_line(outer_line)
+        assert line_list_fix.content_rect == QRect(QPoint(-10, 0), QPoint(40, 30))
+        entries = line_list_fix.remove_lines([line_list_fix.line_list[0]])
+        assert not line_list_fix._line_rect_stale
+        assert line_list_fix.content_rect == QRect(QPoint(-10, 0), QPoint(40, 30))
+        line_list_fix.remove_last_line()
+        assert line_list_fix._line_rect_stale
+        assert line_list_fix.content_rect == QRect(2, 2, 1, 1)
+        line_list_fix.insert_lines(entries)
+        assert line_list_fix.content_rect == QRect(QPoint(1, 1), QPoint(2, 2))
+        line_list_fix.remove_lines(list(line_list_fix.line_list))
+        assert line_list_fix.content_rect.isNull()
+
+    def test_content_rect_flattened(self, line_list_fix: LineList) -> None:
+        """
+        Flattened ink is still content
+        """
+        line_list_fix.flatten_lines(2)
+        assert line_list_fix.line_list == []
+        assert line_list_fix.content_rect == line_list_fix.raster_layer.ink_rect
+        assert line_list_fix.content_rect.contains(QRect(QPoint(1, 1), QPoint(2, 2)))
+
+    def test_get_bounds(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        assert line_list_fix.get_bounds(line_list_fix.line_list[1]) == QRect(2, 2, 1, 1)
+
+    def test_query_rect(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        assert line_list_fix.query_rect(QRect(0, 0, 5, 5)) == line_list_fix.line_list
+        assert line_list_fix.query_rect(QRect(2, 2, 5, 5)) == [line_list_fix.line_list[1]]
+        assert line_list_fix.query_rect(QRect(50, 50, 5, 5)) == []
+
+    def test_query_point(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        assert line_list_fix.query_point(2, 4, 2.0) == [line_list_fix.line_list[1]]
+        assert line_list_fix.query_point(2, 4, 1.0) == []
+
 
 
 if __name__ == "__main__":
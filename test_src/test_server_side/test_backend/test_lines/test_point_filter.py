@@ -0,0 +1,63 @@
+import pytest
+
+from src.server_side.backend.lines.point_filter import PointFilter
+
+
+@pytest.fixture
+def filter_fix() -> PointFilter:
+    return PointFilter(min_distance=2.0)
+
+
+class TestPointFilter:
+
+    def test_num_dropped_getter(self, filter_fix: PointFilter) -> None:
+        """
+
+        """
+        assert filter_fix.num_dropped == filter_fix._num_dropped == 0
+
+    def test_min_distance(self, filter_fix: PointFilter) -> None:
+        """
+
+        """
+        assert filter_fix.min_distance == 2.0
+        filter_fix.min_distance = 0.5
+        assert filter_fix.min_distance == 0.5
+        assert filter_fix.accept(0, 0)
+        # Closer than the old distance, further than the new one
+        assert filter_fix.accept(1, 0)
+
+    def test_reset(self, filter_fix: PointFilter) -> None:
+        """
+
+        """
+        assert filter_fix.accept(1, 1)
+        filter_fix.reset()
+        assert filter_fix._last_point is None
+        # Same point is accepted again after reset
+        assert filter_fix.accept(1, 1)
+
+    def test_accept(self, filter_fix: PointFilter) -> None:
+        """
+        First point always accepted. Duplicates and
+        points closer than min distance are dropped.
+        """
+        assert filter_fix.accept(10, 10)
+        assert not filter_fix.accept(10, 10)
+        assert not filter_fix.accept(11, 11)
+        assert filter_fix.accept(12, 10)
+        assert filter_fix._last_point == (12, 10)
+        assert filter_fix.num_dropped == 2
+
+    def test_accept_no_min_distance(self) -> None:
+        """
+        Only duplicates dropped
+        """
+        point_filter = PointFilter()
+        assert point_filter.accept(0, 0)
+        assert not point_filter.accept(0, 0)
+        assert point_filter.accept(0, 1)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,103 @@
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtGui import QColor
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.raster_layer import RasterLayer
+from src.server_side.backend.rendering.stroke_painter import PEN_WIDTH
+
+TEST_CHUNK_SIZE: int = 64
+
+
+@pytest.fixture
+def layer_fix() -> RasterLayer:
+    return RasterLayer(TEST_CHUNK_SIZE)
+
+
+def make_line(points: typing.List[QPoint], color: str = 'red') -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    color_line.color = QColor(color)
+    return color_line
+
+
+class TestRasterLayer:
+
+    def test_chunk_rect(self, layer_fix: RasterLayer) -> None:
+        """
+
+        """
+        assert layer_fix.chunk_rect((1, -1)) == QRect(64, -64, 64, 64)
+        assert list(layer_fix.chunk_keys(QRect(60, -4, 10, 10))) == [(0, -1), (1, -1), (0, 0), (1, 0)]
+
+    def test_add_lines(self, layer_fix: RasterLayer) -> None:
+        """
+        Only chunks with ink are kept and the rest stays transparent
+        """
+        layer_fix.add_lines([make_line([QPoint(10, 10), QPoint(100, 10)]), ColorLine()])
+        assert len(layer_fix) == 2
+        assert layer_fix.bounds() == [QRect(0, 0, 64, 64), QRect(64, 0, 64, 64)]
+        (first_rect, first_image), (second_rect, second_image) = layer_fix.chunks(QRect(0, 0, 200, 200))
+        assert first_image.pixelColor(20, 10) == QColor('red')
+        assert first_image.pixelColor(20, 30).alpha() == 0
+        assert second_image.pixelColor(30, 10) == QColor('red')
+        assert layer_fix.num_bytes == 2 * 64 * 64 * 4
+
+    def test_new_keys(self, layer_fix: RasterLayer) -> None:
+        """
+        Only chunks without ink count as new
+        """
+        color_line = make_line([QPoint(10, 10), QPoint(100, 10)])
+        assert layer_fix.new_keys(color_line) == {(0, 0), (1, 0)}
+        assert layer_fix.new_keys(ColorLine()) == set()
+        layer_fix.add_lines([make_line([QPoint(10, 10)])])
+        assert layer_fix.new_keys(color_line) == {(1, 0)}
+        assert layer_fix.chunk_bytes == 64 * 64 * 4
+
+    def test_add_lines_order(self, layer_fix: RasterLayer) -> None:
+        """
+        Later lines are painted on top
+        """
+        layer_fix.add_lines([make_line([QPoint(0, 10), QPoint(30, 10)], 'red'),
+                             make_line([QPoint(10, 0), QPoint(10, 30)], 'blue')])
+        _, image = layer_fix.chunks(QRect(0, 0, 1, 1))[0]
+        assert image.pixelColor(10, 10) == QColor('blue')
+
+    def test_chunks_are_copies(self, layer_fix: RasterLayer) -> None:
+        """
+        Chunks handed to other threads do not change when more ink is added
+        """
+        assert layer_fix.chunks(QRect(0, 0, 10, 10)) == []
+        layer_fix.add_lines([make_line([QPoint(10, 10)])])
+        _, image = layer_fix.chunks(QRect(0, 0, 10, 10))[0]
+        layer_fix.add_lines([make_line([QPoint(40, 40)])])
+        assert image.pixelColor(40, 40).alpha() == 0
+        _, new_image = layer_fix.chunks(QRect(0, 0, 10, 10))[0]
+        assert new_image.pixelColor(40, 40) == QColor('red')
+
+    def test_take_restore_chunks(self, layer_fix: RasterLayer) -> None:
+        """
+
+        """
+        layer_fix.add_lines([make_line([QPoint(10, 10)])])
+        ink_rect = layer_fix.ink_rect
+        chunks = layer_fix.take_chunks()
+        assert len(layer_fix) == 0
+        assert layer_fix.ink_rect.isNull()
+        layer_fix.restore_chunks(chunks, ink_rect)
+        assert len(layer_fix) == 1
+        assert layer_fix.ink_rect == ink_rect
+
+    def test_ink_rect(self, layer_fix: RasterLayer) -> None:
+        """
+        Ink rect is tighter than the chunks
+        """
+        assert layer_fix.ink_rect.isNull()
+        layer_fix.add_lines([make_line([QPoint(10, 10), QPoint(20, 10)]), make_line([QPoint(30, 40)])])
+        assert layer_fix.ink_rect == QRect(QPoint(10, 10), QPoint(30, 40)).adjusted(-PEN_WIDTH, -PEN_WIDTH,
+                                                                                    PEN_WIDTH, PEN_WIDTH)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.spatial_index import SpatialIndex
+
+
+def make_line(points: typing.List[QPoint]) -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    return color_line
+
+
+@pytest.fixture
+def index_fix() -> SpatialIndex:
+    return SpatialIndex(cell_size=10)
+
+
+class TestSpatialIndex:
+
+    def test_len_contains(self, index_fix: SpatialIndex) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(1, 1)])
+        assert len(index_fix) == 0
+        assert color_line not in index_fix
+        index_fix.insert(color_line)
+        assert len(index_fix) == 1
+        assert color_line in index_fix
+        # Equal but different line
+        assert color_line.make_copy() not in index_fix
+
+    def test_cell_range(self, index_fix: SpatialIndex) -> None:
+        """
+
+        """
+        cells = list(index_fix.cell_range(QRect(QPoint(-5, 5), QPoint(15, 9))))
+        assert cells == [(-1, 0), (0, 0), (1, 0)]
+
+    def test_insert(self, index_fix: SpatialIndex) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(5, 5), QPoint(25, 5)])
+        assert index_fix.insert(color_line) == 0
+        for cell in [(0, 0), (1, 0), (2, 0)]:
+            assert id(color_line) in index_fix._cells[cell]
+        assert index_fix.get_bounds(color_line) == color_line.bounding_rect()
+        # Explicit order is kept and next order moves past it
+        other_line = make_line([QPoint(1, 1)])
+        assert index_fix.insert(other_line, order=7) == 7
+        assert index_fix.get_order(other_line) == 7
+        assert index_fix.insert(make_line([QPoint(1, 1)])) == 8
+
+    def test_remove(self, index_fix: SpatialIndex) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(5, 5), QPoint(25, 5)])
+        index_fix.insert(color_line)
+        index_fix.remove(color_line)
+        assert color_line not in index_fix
+        assert index_fix._cells == {}
+        # Removing again is ignored
+        index_fix.remove(color_line)
+
+    def test_clear(self, index_fix: SpatialIndex) -> None:
+        """
+
+        """
+        index_fix.insert(make_line([QPoint(5, 5)]))
+        index_fix.clear()
+        assert len(index_fix) == 0
+        assert index_fix._cells == {}
+
+    def test_query_rect(self, index_fix: SpatialIndex) -> None:
+        """
+        Results are in paint order and exact bounds are checked
+        """
+        late_line = make_line([QPoint(0, 0), QPoint(8, 8)])
+        early_line = make_line([QPoint(1, 1), QPoint(2, 2)])
+        index_fix.insert(late_line, order=5)
+        index_fix.insert(early_line, order=1)
+        assert index_fix.query_rect(QRect(0, 0, 10, 10)) == [early_line, late_line]
+        # Same cell but outside early line bounds
+        assert index_fix.query_rect(QRect(6, 6, 2, 2)) == [late_line]
+        assert index_fix.query_rect(QRect()) == []
+
+    def test_query_rect_large(self, index_fix: SpatialIndex) -> None:
+        """
+        Rects covering more cells than are used scan the used cells
+        """
+        near_line = make_line([QPoint(0, 0), QPoint(8, 8)])
+        far_line = make_line([QPoint(5000, 5000), QPoint(5010, 5010)])
+        index_fix.insert(near_line)
+        index_fix.insert(far_line)
+        with patch.object(index_fix, 'cell_range') as patch_range:
+            assert index_fix.query_rect(QRect(-100000, -100000, 200000, 200000)) == [near_line, far_line]
+            assert index_fix.query_rect(QRect(-100000, -100000, 100010, 100010)) == [near_line]
+            patch_range.assert_not_called()
+
+    def test_query_point(self, index_fix: SpatialIndex) -> None:
+        """
+        Bounds hit but line itself is too far
+        """
+        diagonal = make_line([QPoint(0, 0), QPoint(20, 20)])
+        index_fix.insert(diagonal)
+        assert index_fix.query_point(10, 11, 2.0) == [diagonal]
+        assert index_fix.query_point(18, 2, 2.0) == []
+
+
+if __name__ == "__main__":
+    pass
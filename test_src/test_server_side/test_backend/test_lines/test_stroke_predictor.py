@@ -0,0 +1,100 @@
+import pytest
+import typing
+from PyQt5.QtCore import QPoint
+
+from src.server_side.backend.lines.stroke_predictor import StrokePredictor, PredictionStats, MAX_GAP
+
+
+@pytest.fixture
+def predictor_fix() -> StrokePredictor:
+    return StrokePredictor(predict_time=10)
+
+
+class TestStrokePredictor:
+
+    @pytest.mark.parametrize(["samples", "prediction"],
+                             [([(0, 0, 0)], None),
+                              ([(0, 0, 0), (10, 0, 10)], QPoint(20, 0)),
+                              ([(0, 0, 0), (0, 10, 10)], QPoint(0, 20)),
+                              # Speeding up from 1 to 2 pixels per millisecond
+                              ([(0, 0, 0), (10, 0, 10), (30, 0, 20)], QPoint(55, 0)),
+                              # Stopping so fast the extension would point back
+                              ([(0, 0, 0), (20, 0, 10), (22, 0, 20)], None),
+                              # Too far is cut to the max distance
+                              ([(0, 0, 0), (100, 0, 10)], QPoint(130, 0)),
+                              # Too slow to be seen
+                              ([(0, 0, 0), (0, 0, 10)], None),
+                              # Only the newest of samples at the same time is kept
+                              ([(0, 0, 0), (5, 0, 10), (10, 0, 10)], QPoint(20, 0)),
+                              # Samples before a pause are not used
+                              ([(0, 0, 0), (10, 0, 10), (10, 0, 10 + MAX_GAP + 1)], None),
+                              # Going back in time leaves two samples at the same time
+                              ([(0, 0, 0), (10, 0, 10), (20, 0, 0)], None),
+                              ([(0, 0, 0), (10, 0, 10), (20, 0, 20), (30, 0, 10)], None)])
+    def test_add_sample(self, predictor_fix: StrokePredictor, samples: typing.List[typing.Tuple[int, int, int]],
+                        prediction: typing.Optional[QPoint]) -> None:
+        """
+
+        """
+        for x, y, timestamp in samples:
+            predictor_fix.add_sample(x, y, timestamp)
+        assert predictor_fix.prediction == prediction
+        x, y, _ = samples[-1]
+        assert predictor_fix.anchor == QPoint(x, y)
+
+    @pytest.mark.parametrize("samples", [[(0, 0, 5), (10, 0, 5)], [(0, 0, 5), (10, 0, 10), (20, 0, 10)],
+                                         [(0, 0, 5), (10, 0, 5), (20, 0, 10)], [(0, 0, 10), (10, 0, 5)]])
+    def test_fit_motion_time(self, predictor_fix: StrokePredictor,
+                             samples: typing.List[typing.Tuple[int, int, int]]) -> None:
+        """
+        Samples at equal or out of order times give no motion
+        """
+        predictor_fix._samples.extend(samples)
+        assert predictor_fix.fit_motion() is None
+
+    def test_predict_time(self, predictor_fix: StrokePredictor) -> None:
+        """
+        Nothing is predicted or measured when prediction is off
+        """
+        predictor_fix.add_sample(0, 0, 0)
+        assert predictor_fix.add_sample(10, 0, 10) == QPoint(20, 0)
+        predictor_fix.predict_time = 0
+        assert predictor_fix.prediction is None
+        assert predictor_fix.add_sample(20, 0, 20) is None
+        assert predictor_fix.stats.num_errors == 0
+
+    def test_reset(self, predictor_fix: StrokePredictor) -> None:
+        """
+
+        """
+        predictor_fix.add_sample(0, 0, 0)
+        predictor_fix.add_sample(10, 0, 10)
+        predictor_fix.reset()
+        assert predictor_fix.prediction is None
+        assert predictor_fix.anchor is None
+        assert predictor_fix.add_sample(50, 50, 20) is None
+
+    def test_stats(self) -> None:
+        """
+        Predictions are measured against the next sample
+        and stats are shared between predictors
+        """
+        stats = PredictionStats()
+        predictor = StrokePredictor(predict_time=10, stats=stats)
+        other = StrokePredictor(predict_time=10, stats=stats)
+        predictor.add_sample(0, 0, 0)
+        predictor.add_sample(10, 0, 10)
+        predictor.add_sample(20, 0, 18)
+        # Sample further ahead than predicted is not measured
+        other.add_sample(0, 0, 0)
+        other.add_sample(10, 0, 10)
+        other.add_sample(40, 0, 40)
+        assert stats.num_errors == 1
+        assert stats.mean_error == pytest.approx(2.0)
+        assert stats.mean_lead > 0
+        stats.reset()
+        assert (stats.num_errors, stats.mean_error, stats.mean_lead) == (0, 0.0, 0.0)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,57 @@
+import pytest
+
+from src.server_side.backend.lines.stroke_width import StrokeWidth, MIN_WIDTH, MAX_WIDTH, SMOOTHING
+
+
+@pytest.fixture
+def width_fix() -> StrokeWidth:
+    return StrokeWidth(max_speed=2.0)
+
+
+class TestStrokeWidth:
+
+    def test_speed_getter(self, width_fix: StrokeWidth) -> None:
+        """
+
+        """
+        assert width_fix.speed == width_fix._speed == 0.0
+
+    def test_reset(self, width_fix: StrokeWidth) -> None:
+        """
+
+        """
+        width_fix.from_motion(0, 0, 0)
+        width_fix.from_motion(10, 0, 10)
+        width_fix.reset()
+        assert width_fix._last_sample is None
+        assert width_fix.speed == 0.0
+
+    @pytest.mark.parametrize(["pressure", "width"], [(0.0, MIN_WIDTH), (1.0, MAX_WIDTH), (0.5, 2.5), (1.5, MAX_WIDTH),
+                                                     (-1.0, MIN_WIDTH)])
+    def test_from_pressure(self, width_fix: StrokeWidth, pressure: float, width: float) -> None:
+        """
+
+        """
+        assert width_fix.from_pressure(pressure) == width
+
+    def test_from_motion(self, width_fix: StrokeWidth) -> None:
+        """
+        Faster moves are thinner and speed is smoothed
+        """
+        # First point has no speed
+        assert width_fix.from_motion(0, 0, 100) == MAX_WIDTH
+        width = width_fix.from_motion(30, 40, 150)
+        assert width_fix.speed == pytest.approx(SMOOTHING)
+        assert width == pytest.approx(MAX_WIDTH - (MAX_WIDTH - MIN_WIDTH) * SMOOTHING / 2.0)
+        # Same timestamp keeps the speed
+        assert width_fix.from_motion(40, 40, 150) == pytest.approx(width)
+        for i in range(1, 30):
+            width = width_fix.from_motion(40 + 100 * i, 40, 150 + 10 * i)
+        assert width == pytest.approx(MIN_WIDTH)
+        for i in range(1, 60):
+            width = width_fix.from_motion(3000, 40, 440 + 10 * i)
+        assert width == pytest.approx(MAX_WIDTH, abs=0.01)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,288 @@
+from unittest.mock import patch, MagicMock
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect, QByteArray
+from PyQt5.QtGui import QColor, QImage
+from pytestqt.qtbot import QtBot
+
+from src.server_side.backend.lines.history import RecolorCommand
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.rendering.export_renderer import ExportRenderer, WriteTask
+from src.server_side.backend.rendering.image_encoder import ImageEncoder
+from src.server_side.backend.rendering.stroke_painter import BACKGROUND_COLOR
+
+
+@pytest.fixture
+def renderer_fix(qtbot: QtBot) -> typing.Iterator[ExportRenderer]:
+    renderer = ExportRenderer()
+    yield renderer
+    renderer.wait_for_done()
+
+
+@pytest.fixture
+def line_list_fix() -> LineList:
+    line_list = LineList()
+    line_list.add_line(make_line([QPoint(10, 10), QPoint(90, 10)], 'red'))
+    line_list.add_line(make_line([QPoint(500, 500), QPoint(600, 500)], 'blue'))
+    return line_list
+
+
+def make_line(points: typing.List[QPoint], color: str) -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    color_line.color = QColor(color)
+    return color_line
+
+
+class TestExportRenderer:
+
+    def test_thread_pool(self, renderer_fix: ExportRenderer) -> None:
+        """
+        Exports never overlap
+        """
+        assert renderer_fix.thread_pool.maxThreadCount() == 1
+        assert renderer_fix.write_pool.maxThreadCount() == 1
+
+    def test_wait_for_done(self, renderer_fix: ExportRenderer) -> None:
+        """
+
+        """
+        with patch.object(renderer_fix.thread_pool, 'waitForDone') as patch_encode_wait:
+            with patch.object(renderer_fix.write_pool, 'waitForDone') as patch_write_wait:
+                renderer_fix.wait_for_done()
+                patch_encode_wait.assert_called_once()
+                patch_write_wait.assert_called_once()
+
+    def test_export_key(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Key changes with the lines and encoder settings
+        """
+        key = renderer_fix.export_key(line_list_fix, QRect(1, 2, 30, 40), 2.0, True)
+        assert key == (line_list_fix.version, (1, 2, 30, 40), 2.0, renderer_fix.encoder.name, True)
+        renderer_fix.encoder = ImageEncoder(max_bytes=1000)
+        assert renderer_fix.export_key(line_list_fix, QRect(1, 2, 30, 40), 2.0, True) != key
+        renderer_fix.encoder = ImageEncoder()
+        line_list_fix.remove_last_line()
+        assert renderer_fix.export_key(line_list_fix, QRect(1, 2, 30, 40), 2.0, True) != key
+
+    def test_make_task(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Only lines in rect are kept and later changes are not seen
+        """
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+        key = task.key
+        line_list_fix.add_line(make_line([QPoint(20, 20), QPoint(30, 30)], 'green'))
+        assert task._color_lines == [line_list_fix.line_list[0]]
+        assert task._line_bounds == [QRect(QPoint(10, 10), QPoint(90, 10))]
+        assert key[0] == line_list_fix.version - 1
+
+    def test_make_task_recolor(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Recoloring after the snapshot does not change the task
+        """
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+        color = task._color_lines[0].color
+        RecolorCommand(line_list_fix.line_list, QColor('green')).redo(line_list_fix)
+        assert task._color_lines[0].color == color
+        assert task._color_lines[0] is not line_list_fix.line_list[0]
+
+    def test_make_task_raster(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+
+        """
+        line_list_fix.flatten_lines(1)
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+        assert task._color_lines == []
+        assert len(task._chunks) == 1
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_render(self, renderer_fix: ExportRenderer, line_list_fix: LineList, dark: bool) -> None:
+        """
+        Image is scaled and inverted in dark mode like the screen
+        """
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 0.5, dark)
+        image = task.render()
+        assert image.size() == QRect(0, 0, 50, 50).size()
+        background = QColor(BACKGROUND_COLOR)
+        if dark:
+            background = QColor(255 - background.red(), 255 - background.green(), 255 - background.blue())
+        assert image.pixelColor(25, 30) == background
+        assert image.pixelColor(25, 5) != background
+        assert task.render(0.5).size() == QRect(0, 0, 25, 25).size()
+        assert task.image_size(0.5) == QRect(0, 0, 25, 25).size()
+
+    def test_render_strip(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Strips only paint lines that touch them and match the whole image
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 80), QPoint(90, 80)], 'blue'))
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 2.0, False)
+        image = task.render()
+        strip = QRect(0, 140, 200, 30)
+        assert task.strip_rect(2.0, strip).contains(QRect(0, 70, 100, 15))
+        with patch('src.server_side.backend.rendering.export_renderer.StrokePainter.render_image') as patch_render:
+            task.render(1.0, strip)
+            assert patch_render.call_args[0][1] == [line_list_fix.line_list[-1]]
+        assert task.render(1.0, strip) == image.copy(strip)
+
+    @pytest.mark.parametrize("success", [True, False])
+    def test_task_run(self, renderer_fix: ExportRenderer, line_list_fix: LineList, success: bool) -> None:
+        """
+        Failed encodes emit empty data
+        """
+        rect = QRect(0, 0, 100, 100) if success else QRect()
+        task = renderer_fix.make_task(line_list_fix, rect, 1.0, False)
+        with patch.object(renderer_fix, 'encoded_signal') as patch_signal:
+            task.run()
+            key, data, encode_time = patch_signal.emit.call_args[0]
+            assert key == task.key
+            assert data.isEmpty() is not success
+            assert encode_time >= 0
+            if success:
+                assert QImage.fromData(data, 'PNG').size() == QRect(0, 0, 100, 100).size()
+
+    def test_task_run_error(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Errors while encoding still emit so waiting exports finish
+        """
+        renderer_fix.encoder = MagicMock(spec=ImageEncoder)
+        renderer_fix.encoder.encode.side_effect = RuntimeError('encode failed')
+        task = renderer_fix.make_task(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+        with patch.object(renderer_fix, 'encoded_signal') as patch_signal:
+            with patch('traceback.print_exc') as patch_print:
+                task.run()
+                patch_print.assert_called_once()
+            key, data, _ = patch_signal.emit.call_args[0]
+            assert key == task.key
+            assert data.isEmpty()
+
+    @pytest.mark.parametrize("success", [True, False])
+    def test_write_task_run(self, renderer_fix: ExportRenderer, success: bool, tmp_path) -> None:
+        """
+        Image is written next to path and moved over it
+        """
+        path = str(tmp_path / 'image.png')
+        task = WriteTask(renderer_fix, 3, QByteArray(b'data'), path)
+        with patch.object(renderer_fix, 'export_finished_signal') as patch_signal:
+            with patch.object(renderer_fix, 'export_report_signal') as patch_report:
+                with patch('os.replace', side_effect=None if success else OSError('busy')) as patch_replace:
+                    task.run()
+                    patch_replace.assert_called_once_with(path + '.part', path)
+                patch_signal.emit.assert_called_once_with(3, success)
+                if success:
+                    patch_report.emit.assert_not_called()
+                else:
+                    patch_report.emit.assert_called_once_with(3, 'Image could not be written: busy')
+        assert (tmp_path / 'image.png.part').read_bytes() == b'data'
+
+    def test_export(self, renderer_fix: ExportRenderer, line_list_fix: LineList, qtbot: QtBot, tmp_path) -> None:
+        """
+
+        """
+        path = str(tmp_path / 'image.png')
+        with qtbot.waitSignal(renderer_fix.export_finished_signal) as blocker:
+            export_id = renderer_fix.export(line_list_fix, QRect(0, 0, 100, 100), 1.0, False, path)
+        assert blocker.args == [export_id, True]
+        image = QImage(path)
+        assert image.size() == QRect(0, 0, 100, 100).size()
+        assert image.pixelColor(50, 10) == QColor('red')
+        assert not (tmp_path / 'image.png.part').exists()
+        assert list(renderer_fix.cache.keys()) == [renderer_fix.export_key(line_list_fix, QRect(0, 0, 100, 100),
+                                                                           1.0, False)]
+
+    def test_export_cached(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Unchanged lines are only written, encoded ahead only the first time
+        """
+        key = renderer_fix.export_key(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+        data = QByteArray(b'data')
+        renderer_fix.cache[key] = (data, 5.0)
+        renderer_fix._prepared.add(key)
+        with patch.object(renderer_fix.thread_pool, 'start') as patch_start:
+            with patch.object(renderer_fix, 'write') as patch_write:
+                with patch.object(renderer_fix, 'report') as patch_report:
+                    first_id = renderer_fix.export(line_list_fix, QRect(0, 0, 100, 100), 1.0, False, 'path.png')
+                    second_id = renderer_fix.export(line_list_fix, QRect(0, 0, 100, 100), 1.0, False, 'path.png')
+                    patch_start.assert_not_called()
+                    assert [call[0] for call in patch_write.call_args_list] == [(first_id, data, 'path.png'),
+                                                                                (second_id, data, 'path.png')]
+                    assert [call[0] for call in patch_report.call_args_list] == [(first_id, data, 5.0, True),
+                                                                                 (second_id, data, None)]
+
+    @pytest.mark.parametrize("encode_time, ahead, message", [(35.4, True, 'encoded ahead in 35 ms'),
+                                                             (35.4, False, 'encoded in 35 ms'),
+                                                             (None, False, 'already encoded')])
+    def test_report(self, renderer_fix: ExportRenderer, encode_time: typing.Optional[float], ahead: bool,
+                    message: str) -> None:
+        """
+
+        """
+        with patch.object(renderer_fix, 'export_report_signal') as patch_report:
+            renderer_fix.report(2, QByteArray(b'0' * 2048), encode_time, ahead)
+            patch_report.emit.assert_called_once_with(2, f'Image is 2.0 KB, {message}')
+
+    @pytest.mark.parametrize("num_bytes, size", [(0, '0 bytes'), (900, '900 bytes'), (1024, '1.0 KB'),
+                                                 (1536, '1.5 KB'), (600000, '585.9 KB')])
+    def test_format_size(self, num_bytes: int, size: str) -> None:
+        """
+        Small images do not show as 0 KB
+        """
+        assert ExportRenderer.format_size(num_bytes) == size
+
+    def test_prepare(self, renderer_fix: ExportRenderer, line_list_fix: LineList) -> None:
+        """
+        Exports of an image being encoded ahead wait for it
+        """
+        with patch.object(renderer_fix.thread_pool, 'start') as patch_start:
+            assert renderer_fix.prepare(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+            assert not renderer_fix.prepare(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+            first_id = renderer_fix.export(line_list_fix, QRect(0, 0, 100, 100), 1.0, False, 'first.png')
+            second_id = renderer_fix.export(line_list_fix, QRect(0, 0, 100, 100), 1.0, False, 'second.png')
+            patch_start.assert_called_once()
+            key = patch_start.call_args[0][0].key
+        data = QByteArray(b'data')
+        with patch.object(renderer_fix, 'write') as patch_write:
+            with patch.object(renderer_fix, 'report') as patch_report:
+                renderer_fix.encoded_slot(key, data, 5.0)
+                assert [call[0] for call in patch_report.call_args_list] == [(first_id, data, 5.0, True),
+                                                                             (second_id, data, 5.0, True)]
+            assert [call[0] for call in patch_write.call_args_list] == [(first_id, data, 'first.png'),
+                                                                        (second_id, data, 'second.png')]
+        assert renderer_fix._waiting == {}
+        # Used by the waiting exports so later sends are not reported as encoded ahead
+        assert renderer_fix._prepared == set()
+        assert renderer_fix.cache[key] == (data, 5.0)
+        assert not renderer_fix.prepare(line_list_fix, QRect(0, 0, 100, 100), 1.0, False)
+
+    def test_encoded_slot_failed(self, renderer_fix: ExportRenderer) -> None:
+        """
+
+        """
+        key = (0, (0, 0, 10, 10), 1.0, renderer_fix.encoder.name, False)
+        renderer_fix._waiting[key] = [(4, 'path.png')]
+        with patch.object(renderer_fix, 'export_finished_signal') as patch_signal:
+            with patch.object(renderer_fix, 'export_report_signal') as patch_report:
+                renderer_fix.encoded_slot(key, QByteArray(), 5.0)
+                patch_signal.emit.assert_called_once_with(4, False)
+                patch_report.emit.assert_called_once_with(4, 'Image could not be encoded')
+        assert renderer_fix.cache == {}
+
+    def test_encoded_slot_evict(self, line_list_fix: LineList, qtbot: QtBot) -> None:
+        """
+        Least recently used images are dropped first
+        """
+        renderer = ExportRenderer(max_entries=2)
+        keys = [(version, (0, 0, 10, 10), 1.0, renderer.encoder.name, False) for version in range(3)]
+        renderer.encoded_slot(keys[0], QByteArray(b'0'), 5.0)
+        renderer._prepared.add(keys[1])
+        renderer.encoded_slot(keys[1], QByteArray(b'1'), 5.0)
+        assert renderer._prepared == {keys[1]}
+        renderer.cache.move_to_end(keys[0])
+        renderer.encoded_slot(keys[2], QByteArray(b'2'), 5.0)
+        assert list(renderer.cache.keys()) == [keys[0], keys[2]]
+        assert renderer._prepared == set()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,115 @@
+from unittest.mock import patch, MagicMock
+import pytest
+from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtGui import QRegion
+from PyQt5.QtWidgets import QWidget
+from pytestqt.qtbot import QtBot
+
+from src.server_side.backend.rendering.frame_scheduler import FrameScheduler
+
+
+@pytest.fixture
+def widget_fix(qtbot: QtBot) -> QWidget:
+    widget = QWidget()
+    qtbot.addWidget(widget)
+    return widget
+
+
+@pytest.fixture
+def scheduler_fix(widget_fix: QWidget) -> FrameScheduler:
+    scheduler = FrameScheduler(widget_fix, 50)
+    scheduler._clock = MagicMock()
+    scheduler._clock.elapsed.return_value = 1000
+    return scheduler
+
+
+class TestFrameScheduler:
+
+    @pytest.mark.parametrize(["frame_rate", "interval"], [(50, 20), (60, 17), (2000, 1), (0, 1000), (-30, 1000)])
+    def test_frame_rate(self, scheduler_fix: FrameScheduler, frame_rate: int, interval: int) -> None:
+        """
+
+        """
+        scheduler_fix.frame_rate = frame_rate
+        assert scheduler_fix.interval == interval
+
+    def test_request_coalesced(self, scheduler_fix: FrameScheduler, widget_fix: QWidget) -> None:
+        """
+        Requests while a frame waits are merged into one update
+        """
+        with patch.object(widget_fix, 'update') as patch_update:
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            scheduler_fix.request(QRect(20, 20, 10, 10))
+            assert scheduler_fix.pending
+            patch_update.assert_not_called()
+            scheduler_fix.frame()
+            region = QRegion(QRect(0, 0, 10, 10)).united(QRect(20, 20, 10, 10))
+            patch_update.assert_called_once_with(region)
+        assert (scheduler_fix.frames, scheduler_fix.coalesced_frames) == (1, 1)
+
+    def test_request_full(self, scheduler_fix: FrameScheduler, widget_fix: QWidget) -> None:
+        """
+        Whole widget is updated when any request has no rect
+        """
+        with patch.object(widget_fix, 'update') as patch_update:
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            scheduler_fix.request()
+            scheduler_fix.request(QRect(20, 20, 10, 10))
+            scheduler_fix.frame()
+            patch_update.assert_called_once_with()
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            scheduler_fix.frame()
+            patch_update.assert_called_with(QRegion(QRect(0, 0, 10, 10)))
+
+    def test_request_delay(self, scheduler_fix: FrameScheduler) -> None:
+        """
+        First frame is painted at once, next waits for the interval
+        """
+        with patch.object(scheduler_fix._timer, 'start') as patch_start:
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            patch_start.assert_called_once_with(0)
+            scheduler_fix.frame()
+            scheduler_fix._clock.elapsed.return_value = 1005
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            patch_start.assert_called_with(15)
+            scheduler_fix._clock.elapsed.return_value = 1100
+            scheduler_fix.frame()
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            patch_start.assert_called_with(20)
+
+    def test_dropped_frames(self, scheduler_fix: FrameScheduler) -> None:
+        """
+        Frames painted late count the intervals missed
+        """
+        scheduler_fix.request(QRect(0, 0, 10, 10))
+        scheduler_fix._clock.elapsed.return_value = 1010
+        scheduler_fix.frame()
+        assert scheduler_fix.dropped_frames == 0
+        scheduler_fix.request(QRect(0, 0, 10, 10))
+        # Due at 1030
+        scheduler_fix._clock.elapsed.return_value = 1075
+        scheduler_fix.frame()
+        assert scheduler_fix.dropped_frames == 2
+
+    def test_translate(self, scheduler_fix: FrameScheduler, widget_fix: QWidget) -> None:
+        """
+
+        """
+        with patch.object(widget_fix, 'update') as patch_update:
+            scheduler_fix.request(QRect(0, 0, 10, 10))
+            scheduler_fix.translate(QPoint(5, -5))
+            scheduler_fix.frame()
+            patch_update.assert_called_once_with(QRegion(QRect(5, -5, 10, 10)))
+
+    def test_timer(self, widget_fix: QWidget, qtbot: QtBot) -> None:
+        """
+        Frame is painted by the timer
+        """
+        scheduler = FrameScheduler(widget_fix)
+        scheduler.request(QRect(0, 0, 10, 10))
+        qtbot.waitUntil(lambda: scheduler.frames == 1)
+        assert not scheduler.pending
+
+
+if __name__ == "__main__":
+    pass
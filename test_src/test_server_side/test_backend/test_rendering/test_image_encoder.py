@@ -0,0 +1,178 @@
+from unittest.mock import MagicMock, patch
+import pytest
+from PyQt5.QtCore import QByteArray, QRect, QSize
+from PyQt5.QtGui import QColor, QImage
+
+from src.server_side.backend.models.color_select_model import COLORS
+from src.server_side.backend.rendering.image_encoder import ImageEncoder, ENCODE_STEPS, PALETTE_LEVELS, \
+    STRIP_BYTES
+from src.server_side.backend.rendering.stroke_painter import BACKGROUND_COLOR
+
+
+@pytest.fixture
+def encoder_fix() -> ImageEncoder:
+    return ImageEncoder(palette=[QColor('black'), QColor('red')])
+
+
+def make_image(size: int, dark_mode: bool = False) -> QImage:
+    image = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(ImageEncoder.background(dark_mode))
+    for x in range(size):
+        image.setPixelColor(x, size // 2, QColor('red'))
+        image.setPixelColor(x, size // 2 + 1, QColor(255, 128, 128))
+    return image
+
+
+class TestImageEncoder:
+
+    def test_name(self) -> None:
+        """
+        Images encoded with other settings are not the same
+        """
+        assert ImageEncoder().name != ImageEncoder(indexed=False).name
+        assert ImageEncoder().name != ImageEncoder(max_bytes=1000).name
+        assert ImageEncoder().name == ImageEncoder().name
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_background(self, dark: bool) -> None:
+        """
+
+        """
+        background = QColor(BACKGROUND_COLOR)
+        if dark:
+            background = QColor(255 - background.red(), 255 - background.green(), 255 - background.blue())
+        assert ImageEncoder.background(dark) == background
+
+    def test_color_table(self, encoder_fix: ImageEncoder) -> None:
+        """
+        Background first then shades ending at each color
+        """
+        table = encoder_fix.color_table(False)
+        assert table[0] == ImageEncoder.background(False).rgb()
+        assert table[PALETTE_LEVELS] == QColor('black').rgb()
+        assert table[2 * PALETTE_LEVELS] == QColor('red').rgb()
+        # White is the background, then inverted red
+        assert table[-1] == QColor('cyan').rgb()
+        assert len(table) == len(set(table)) == 3 * PALETTE_LEVELS + 1
+
+    def test_ink_colors(self, encoder_fix: ImageEncoder) -> None:
+        """
+
+        """
+        assert encoder_fix.ink_colors() == [QColor('black'), QColor('red'), QColor('white'), QColor('cyan')]
+        assert ImageEncoder(palette=[QColor('blue'), QColor('yellow')]).ink_colors() == [QColor('blue'),
+                                                                                       QColor('yellow')]
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_quantize_pen_colors(self, dark: bool) -> None:
+        """
+        Every pen color and its inverse is kept exactly in both
+        modes, ink drawn in the other mode shows inverted
+        """
+        encoder = ImageEncoder()
+        for name in COLORS:
+            color = QColor(name)
+            for ink in [color, QColor(255 - color.red(), 255 - color.green(), 255 - color.blue())]:
+                image = make_image(4, dark)
+                image.setPixelColor(1, 1, ink)
+                image = encoder.quantize(image, dark)
+                assert image.pixelColor(1, 1) == ink
+                assert image.pixelColor(0, 0) == ImageEncoder.background(dark)
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_quantize(self, encoder_fix: ImageEncoder, dark: bool) -> None:
+        """
+        Pixels map to the nearest entry and pure colors are kept
+        """
+        image = encoder_fix.quantize(make_image(20, dark), dark)
+        assert image.format() == QImage.Format_Indexed8
+        assert image.colorCount() == len(encoder_fix.color_table(dark))
+        assert image.pixelColor(5, 10) == QColor('red')
+        assert image.pixelColor(5, 0) == ImageEncoder.background(dark)
+        assert image.pixel(5, 11) in encoder_fix.color_table(dark)
+
+    def test_strip_height(self) -> None:
+        """
+        Strips stay in budget however wide the image
+        """
+        assert ImageEncoder.strip_height(100) == STRIP_BYTES // 400
+        assert ImageEncoder.strip_height(STRIP_BYTES) == 1
+        assert ImageEncoder.strip_height(0) > 0
+
+    @pytest.mark.parametrize("indexed", [True, False])
+    def test_encode(self, encoder_fix: ImageEncoder, indexed: bool) -> None:
+        """
+        Without a budget the image is encoded once, a strip at a time
+        """
+        encoder = ImageEncoder(palette=encoder_fix.palette, indexed=indexed)
+        image = make_image(50)
+        render = MagicMock(side_effect=lambda fraction, strip: image.copy(strip))
+        with patch('src.server_side.backend.rendering.image_encoder.STRIP_BYTES', 50 * 4 * 20):
+            data, scale = encoder.encode(render, lambda fraction: image.size(), False)
+        assert [call[0] for call in render.call_args_list] == [(1.0, QRect(0, 0, 50, 20)), (1.0, QRect(0, 20, 50, 20)),
+                                                               (1.0, QRect(0, 40, 50, 10))]
+        assert scale == 1.0
+        decoded = QImage.fromData(data, 'PNG')
+        assert decoded.size() == image.size()
+        assert (decoded.format() == QImage.Format_Indexed8) is indexed
+        assert decoded.pixelColor(5, 25) == QColor('red')
+        assert decoded.pixelColor(5, 0) == ImageEncoder.background(False)
+
+    def test_encode_empty(self, encoder_fix: ImageEncoder) -> None:
+        """
+
+        """
+        render = MagicMock()
+        data, _ = encoder_fix.encode(render, lambda fraction: QSize(), False)
+        assert data.isEmpty()
+        render.assert_not_called()
+
+    def test_encode_indexed_smaller(self, encoder_fix: ImageEncoder) -> None:
+        """
+
+        """
+        image = make_image(200)
+        render = lambda fraction, strip: image.copy(strip)
+        indexed_data, _ = encoder_fix.encode(render, lambda fraction: image.size(), False)
+        full_data, _ = ImageEncoder(indexed=False).encode(render, lambda fraction: image.size(), False)
+        assert indexed_data.size() < full_data.size()
+
+    def test_encode_budget(self) -> None:
+        """
+        Settings are searched in turn until image fits
+        """
+        encoder = ImageEncoder(max_bytes=100)
+        sizes = {1.0: 500, 0.75: 300, 0.5: 90}
+        with patch.object(ImageEncoder, 'encode_strips') as patch_strips:
+            patch_strips.side_effect = lambda render, fraction, image_size, quality, dark_mode, max_bytes: \
+                QByteArray(b'0' * sizes[fraction]) if sizes[fraction] <= max_bytes else None
+            data, scale = encoder.encode(MagicMock(), lambda fraction: QSize(10, 10), False)
+            assert [call[0][1:4:2] for call in patch_strips.call_args_list] == [(1.0, -1), (1.0, 0), (0.75, 0),
+                                                                               (0.5, 0)]
+        assert scale == 0.5
+        assert data.size() == 90
+
+    def test_encode_strips_over_budget(self, encoder_fix: ImageEncoder) -> None:
+        """
+        Encoding stops at the first strip over budget
+        """
+        image = make_image(100)
+        render = MagicMock(side_effect=lambda fraction, strip: image.copy(strip))
+        with patch('src.server_side.backend.rendering.image_encoder.STRIP_BYTES', 100 * 4 * 10):
+            assert encoder_fix.encode_strips(render, 1.0, image.size(), -1, False, 1) is None
+        render.assert_called_once()
+
+    def test_encode_over_budget(self) -> None:
+        """
+        Smallest setting is used if none fit
+        """
+        encoder = ImageEncoder(max_bytes=1)
+        render = MagicMock(side_effect=lambda fraction, strip: make_image(round(100 * fraction)).copy(strip))
+        data, scale = encoder.encode(render, lambda fraction: QSize(round(100 * fraction), round(100 * fraction)),
+                                     False)
+        assert scale == ENCODE_STEPS[-1][0]
+        assert QImage.fromData(data, 'PNG').width() == round(100 * ENCODE_STEPS[-1][0])
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,83 @@
+import pytest
+import struct
+import zlib
+from PyQt5.QtGui import QColor, QImage
+
+from src.server_side.backend.rendering.png_writer import PngWriter, PNG_SIGNATURE
+
+
+def make_image(width: int, height: int) -> QImage:
+    image = QImage(width, height, QImage.Format_RGB888)
+    image.fill(QColor('white'))
+    for x in range(width):
+        image.setPixelColor(x, height // 2, QColor('red'))
+    return image
+
+
+def chunk_types(data: bytes) -> list:
+    types = []
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, = struct.unpack('>I', data[position:position + 4])
+        chunk_type = data[position + 4:position + 8]
+        payload = data[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(chunk_type + payload)
+        types.append(chunk_type)
+        position += 12 + length
+    return types
+
+
+class TestPngWriter:
+
+    @pytest.mark.parametrize("width", [5, 8])
+    def test_rgb(self, width: int) -> None:
+        """
+        Strips of any width are written without row padding
+        """
+        image = make_image(width, 7)
+        writer = PngWriter(width, 7)
+        writer.add_rows(image.copy(0, 0, width, 4))
+        writer.add_rows(image.copy(0, 4, width, 3))
+        assert writer.num_rows == 7
+        data = writer.finish()
+        assert chunk_types(bytes(data)) == [b'IHDR', b'IDAT', b'IEND']
+        decoded = QImage.fromData(data, 'PNG').convertToFormat(QImage.Format_RGB888)
+        assert decoded == image
+
+    def test_indexed(self) -> None:
+        """
+
+        """
+        table = [QColor('white').rgb(), QColor('red').rgb()]
+        image = make_image(6, 6).convertToFormat(QImage.Format_Indexed8, table)
+        writer = PngWriter(6, 6, table)
+        writer.add_rows(image)
+        data = writer.finish()
+        assert chunk_types(bytes(data)) == [b'IHDR', b'PLTE', b'IDAT', b'IEND']
+        decoded = QImage.fromData(data, 'PNG')
+        assert decoded.format() == QImage.Format_Indexed8
+        assert decoded.colorTable() == table
+        assert decoded.pixelColor(2, 3) == QColor('red')
+        assert decoded.pixelColor(2, 0) == QColor('white')
+
+    def test_size(self) -> None:
+        """
+        Size grows as compressed rows are written
+        """
+        writer = PngWriter(500, 500, quality=100)
+        start_size = writer.size
+        writer.add_rows(make_image(500, 500))
+        assert writer.size > start_size
+
+    def test_finish_missing_rows(self) -> None:
+        """
+
+        """
+        writer = PngWriter(4, 4)
+        writer.add_rows(make_image(4, 2))
+        assert writer.finish().isEmpty()
+
+
+if __name__ == "__main__":
+    pass
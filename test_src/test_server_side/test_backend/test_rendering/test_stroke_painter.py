@@ -0,0 +1,332 @@
+from unittest.mock import patch, MagicMock
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPolygon
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.rendering.stroke_painter import StrokePainter, PEN_WIDTH, BACKGROUND_COLOR
+from src.server_side.backend.rendering.stroke_shape import StrokeShape
+
+
+@pytest.fixture
+def painter_fix() -> StrokePainter:
+    return StrokePainter()
+
+
+def make_line(points: typing.List[QPoint], color: str = 'black') -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    color_line.color = QColor(color)
+    return color_line
+
+
+def make_width_line(points: typing.List[QPoint], widths: typing.List[float], color: str = 'black') -> ColorLine:
+    color_line = ColorLine()
+    for point, width in zip(points, widths):
+        color_line.add_point(point, width)
+    color_line.color = QColor(color)
+    return color_line
+
+
+class TestStrokePainter:
+
+    def test_get_pen(self, painter_fix: StrokePainter) -> None:
+        """
+        Pens should be reused for the same color
+        """
+        pen = painter_fix.get_pen(QColor('red').rgba())
+        assert pen.color() == QColor('red')
+        assert pen.width() == PEN_WIDTH
+        assert painter_fix.get_pen(QColor('red').rgba()) is pen
+        assert painter_fix.get_pen(QColor('blue').rgba()) is not pen
+
+    def test_get_brush(self, painter_fix: StrokePainter) -> None:
+        """
+
+        """
+        brush = painter_fix.get_brush(QColor('red').rgba())
+        assert brush.color() == QColor('red')
+        assert painter_fix.get_brush(QColor('red').rgba()) is brush
+        assert painter_fix.get_brush(QColor('blue').rgba()) is not brush
+
+    @pytest.mark.parametrize("cosmetic", [True, False])
+    def test_is_filled(self, cosmetic: bool) -> None:
+        """
+        Cosmetic painters always use the pen
+        """
+        stroke_painter = StrokePainter(cosmetic=cosmetic)
+        assert not stroke_painter.is_filled(make_line([QPoint(1, 1)]))
+        assert stroke_painter.is_filled(make_width_line([QPoint(1, 1)], [2.0])) != cosmetic
+
+    @pytest.mark.parametrize("filled", [True, False])
+    def test_set_color(self, painter_fix: StrokePainter, filled: bool) -> None:
+        """
+
+        """
+        painter = MagicMock()
+        rgba = QColor('red').rgba()
+        painter_fix.set_color(rgba, filled, painter)
+        if filled:
+            painter.setPen.assert_called_once_with(Qt.NoPen)
+            painter.setBrush.assert_called_once_with(painter_fix.get_brush(rgba))
+        else:
+            painter.setPen.assert_called_once_with(painter_fix.get_pen(rgba))
+            painter.setBrush.assert_called_once_with(Qt.NoBrush)
+
+    def test_paint_line_filled(self, painter_fix: StrokePainter) -> None:
+        """
+        Outline is made once and reused
+        """
+        color_line = make_width_line([QPoint(1, 1), QPoint(20, 1)], [2.0, 4.0])
+        painter = MagicMock()
+        painter_fix.paint_line(color_line, painter)
+        shape = color_line.shape
+        outline = shape.outline(color_line)
+        painter_fix.paint_line(color_line, painter)
+        assert color_line.shape is shape
+        painter.drawPolygon.assert_called_with(outline, Qt.WindingFill)
+        assert painter.drawPolygon.call_count == 2
+        painter.drawPolyline.assert_not_called()
+
+    @pytest.mark.parametrize("cosmetic", [True, False])
+    def test_is_smooth(self, cosmetic: bool) -> None:
+        """
+        Cosmetic painters and short lines use straight segments
+        """
+        stroke_painter = StrokePainter(cosmetic=cosmetic)
+        color_line = make_line([QPoint(1, 1), QPoint(5, 1), QPoint(5, 5)])
+        assert not stroke_painter.is_smooth(color_line)
+        color_line.smooth = True
+        assert stroke_painter.is_smooth(color_line) != cosmetic
+        color_line.make_straight()
+        assert not stroke_painter.is_smooth(color_line)
+
+    def test_get_shape(self, painter_fix: StrokePainter) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(1, 1)])
+        color_line.smooth = True
+        shape = painter_fix.get_shape(color_line)
+        assert shape.smooth
+        assert color_line.shape is shape
+        assert painter_fix.get_shape(color_line) is shape
+
+    def test_draw_stroke(self, painter_fix: StrokePainter) -> None:
+        """
+        Live lines extend their shape
+        """
+        color_line = make_line([QPoint(1, 1), QPoint(5, 1), QPoint(5, 5)])
+        painter = MagicMock()
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            painter_fix.draw_stroke(color_line, painter, False)
+            patch_draw.assert_called_once_with(color_line, painter)
+        assert color_line.shape is None
+        color_line.smooth = True
+        painter_fix.draw_stroke(color_line, painter, False)
+        shape = color_line.shape
+        painter.drawPath.assert_called_once_with(shape.path(color_line))
+        color_line.add_point(QPoint(9, 9))
+        painter_fix.draw_stroke(color_line, painter, False)
+        assert color_line.shape is shape
+        assert shape.num_points == 4
+
+    def test_draw_stroke_finished(self, painter_fix: StrokePainter) -> None:
+        """
+        Finished lines only keep the finished shape
+        """
+        color_line = make_width_line([QPoint(1, 1), QPoint(5, 1), QPoint(5, 5)], [2.0, 3.0, 4.0])
+        painter = MagicMock()
+        painter_fix.draw_stroke(color_line, painter, True, finished=True)
+        shape = color_line.shape
+        assert shape._left_side is None
+        painter.drawPolygon.assert_called_once_with(shape.outline(color_line), Qt.WindingFill)
+        # Shape that is not up to date is replaced instead of extended
+        stale_shape = StrokeShape()
+        color_line.shape = stale_shape
+        color_line.add_point(QPoint(9, 9))
+        painter_fix.draw_stroke(color_line, painter, True, finished=True)
+        assert color_line.shape is not stale_shape
+        assert color_line.shape.num_points == 4
+
+    @pytest.mark.parametrize("points", [[], [QPoint(1, 1)], [QPoint(1, 1), QPoint(2, 2)]])
+    def test_paint_line(self, painter_fix: StrokePainter, points: typing.List[QPoint]) -> None:
+        """
+
+        """
+        color_line = make_line(points)
+        painter = MagicMock()
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            painter_fix.paint_line(color_line, painter)
+            if len(points) == 0:
+                painter.setPen.assert_not_called()
+                patch_draw.assert_not_called()
+            else:
+                painter.setPen.assert_called_once_with(painter_fix.get_pen(color_line.rgba))
+                patch_draw.assert_called_once_with(color_line, painter)
+
+    def test_paint_line_invert(self, painter_fix: StrokePainter) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(1, 1)], 'red')
+        painter = MagicMock()
+        painter_fix.paint_line(color_line, painter, invert=True)
+        painter.setPen.assert_called_once_with(painter_fix.get_pen(QColor('cyan').rgba()))
+
+    def test_paint_lines(self, painter_fix: StrokePainter) -> None:
+        """
+        Pen only changes between runs of different colors
+        """
+        lines = [make_line([QPoint(1, 1)], 'red'), make_line([QPoint(2, 2)], 'red'), make_line([], 'blue'),
+                 make_line([QPoint(3, 3)], 'blue'), make_line([QPoint(4, 4)], 'red')]
+        painter = MagicMock()
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            painter_fix.paint_lines(lines, painter)
+            assert painter.setPen.call_count == 3
+            # Order is kept and empty lines skipped
+            drawn = [call[0][0] for call in patch_draw.call_args_list]
+            assert drawn == [lines[0], lines[1], lines[3], lines[4]]
+
+    def test_paint_lines_filled(self, painter_fix: StrokePainter) -> None:
+        """
+        Painter state changes between pen and filled lines
+        """
+        lines = [make_width_line([QPoint(1, 1)], [2.0]), make_width_line([QPoint(2, 2)], [3.0]),
+                 make_line([QPoint(3, 3)]), make_width_line([QPoint(4, 4)], [2.0])]
+        painter = MagicMock()
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            painter_fix.paint_lines(lines, painter)
+            patch_draw.assert_called_once_with(lines[2], painter)
+        # Pen lines clear the brush
+        assert painter.setBrush.call_count == 3
+        assert painter.drawPolygon.call_count == 3
+
+    def test_paint_lines_filled_image(self, painter_fix: StrokePainter) -> None:
+        """
+        Width follows the points
+        """
+        image = painter_fix.render_image(QRect(0, 0, 50, 50),
+                                         [make_width_line([QPoint(5, 25), QPoint(45, 25)], [1.0, 8.0], 'red')])
+        assert image.pixelColor(40, 22) == QColor('red')
+        assert image.pixelColor(10, 22) == BACKGROUND_COLOR
+
+    def test_paint_lines_smooth_image(self, painter_fix: StrokePainter) -> None:
+        """
+        Smooth lines curve through their points
+        """
+        points = [QPoint(5, 40), QPoint(25, 10), QPoint(45, 40)]
+        straight_image = painter_fix.render_image(QRect(0, 0, 50, 50), [make_line(points, 'red')],
+                                                  antialias=False)
+        smooth_line = make_line(points, 'red')
+        smooth_line.smooth = True
+        smooth_image = painter_fix.render_image(QRect(0, 0, 50, 50), [smooth_line], antialias=False)
+        # Halfway between the points the curve bulges past the straight segment
+        assert straight_image.pixelColor(15, 25) == QColor('red')
+        assert smooth_image.pixelColor(15, 25) == BACKGROUND_COLOR
+        assert smooth_image.pixelColor(25, 10) == QColor('red')
+        # Not filled
+        assert smooth_image.pixelColor(25, 30) == BACKGROUND_COLOR
+
+    @pytest.mark.parametrize("points", [[QPoint(1, 1)], [QPoint(1, 1), QPoint(2, 2), QPoint(3, 1)]])
+    def test_draw_line(self, points: typing.List[QPoint]) -> None:
+        """
+        One draw call per line
+        """
+        color_line = make_line(points)
+        painter = MagicMock()
+        StrokePainter.draw_line(color_line, painter)
+        if len(points) == 1:
+            painter.drawPoint.assert_called_once_with(points[0].x(), points[0].y())
+            painter.drawPolyline.assert_not_called()
+        else:
+            painter.drawPolyline.assert_called_once_with(QPolygon(points))
+            painter.drawPoint.assert_not_called()
+
+    def test_paint_lines_image(self, painter_fix: StrokePainter) -> None:
+        """
+        Lines are actually rasterized
+        """
+        image = QImage(50, 50, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter_fix.paint_lines([make_line([QPoint(5, 25), QPoint(45, 25)], 'red')], painter)
+        painter.end()
+        assert image.pixelColor(25, 25) == QColor('red')
+        assert image.pixelColor(25, 10).alpha() == 0
+
+    def test_render_image(self, painter_fix: StrokePainter) -> None:
+        """
+        Lines are painted relative to the rect origin
+        """
+        rect = QRect(100, 200, 50, 50)
+        image = painter_fix.render_image(rect, [make_line([QPoint(105, 225), QPoint(145, 225)], 'red')])
+        assert image.size() == rect.size()
+        assert image.pixelColor(25, 25) == QColor('red')
+        assert image.pixelColor(25, 10) == BACKGROUND_COLOR
+
+    @pytest.mark.parametrize("antialias", [True, False])
+    def test_render_image_antialias(self, painter_fix: StrokePainter, antialias: bool) -> None:
+        """
+        Only antialiased edges blend into the background
+        """
+        image = painter_fix.render_image(QRect(0, 0, 50, 50), [make_line([QPoint(5, 5), QPoint(45, 30)], 'red')],
+                                         antialias=antialias)
+        colors = {image.pixel(x, y) for x in range(50) for y in range(50)}
+        assert (len(colors) > 2) is antialias
+
+    def test_render_image_chunks(self, painter_fix: StrokePainter) -> None:
+        """
+        Flattened ink is painted under lines
+        """
+        chunk = QImage(50, 50, QImage.Format_ARGB32_Premultiplied)
+        chunk.fill(Qt.transparent)
+        chunk.setPixelColor(10, 25, QColor('blue'))
+        chunk.setPixelColor(20, 25, QColor('blue'))
+        rect = QRect(100, 200, 50, 50)
+        image = painter_fix.render_image(rect, [make_line([QPoint(120, 215), QPoint(120, 235)], 'red')],
+                                         chunks=[(QRect(100, 200, 50, 50), chunk)])
+        assert image.pixelColor(10, 25) == QColor('blue')
+        assert image.pixelColor(20, 25) == QColor('red')
+        assert image.pixelColor(30, 25) == BACKGROUND_COLOR
+
+    def test_render_image_scaled(self, painter_fix: StrokePainter) -> None:
+        """
+        Lines smaller than a pixel are drawn as one dot
+        """
+        rect = QRect(0, 0, 100, 100)
+        tiny = make_line([QPoint(40, 40), QPoint(41, 42), QPoint(42, 40)], 'red')
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            image = painter_fix.render_image(rect, [tiny], 0.25)
+            patch_draw.assert_not_called()
+        assert image.size() == QRect(0, 0, 25, 25).size()
+        assert image.pixelColor(10, 10) != BACKGROUND_COLOR
+
+    def test_render_image_strip(self, painter_fix: StrokePainter) -> None:
+        """
+        Strips have the same pixels as the image rendered whole
+        """
+        rect = QRect(100, 200, 50, 50)
+        color_lines = [make_line([QPoint(105, 205), QPoint(145, 240)], 'red')]
+        image = painter_fix.render_image(rect, color_lines, 2.0)
+        strip = QRect(0, 37, 100, 20)
+        strip_image = painter_fix.render_image(rect, color_lines, 2.0, strip=strip)
+        assert strip_image.size() == strip.size()
+        assert strip_image == image.copy(strip)
+
+    def test_paint_lines_min_size(self, painter_fix: StrokePainter) -> None:
+        """
+
+        """
+        tiny = make_line([QPoint(1, 1), QPoint(2, 2)])
+        large = make_line([QPoint(1, 1), QPoint(20, 2)])
+        painter = MagicMock()
+        with patch.object(painter_fix, 'draw_line') as patch_draw:
+            painter_fix.paint_lines([tiny, large], painter, min_size=4)
+            patch_draw.assert_called_once_with(large, painter)
+            painter.drawPoint.assert_called_once_with(tiny.bounding_rect().center())
+
+
+if __name__ == "__main__":
+    pass
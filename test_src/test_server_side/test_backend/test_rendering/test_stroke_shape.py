@@ -0,0 +1,166 @@
+from unittest.mock import patch
+import pytest
+import typing
+from array import array
+from PyQt5.QtCore import QPoint, QPointF, Qt
+from PyQt5.QtGui import QPolygonF
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.rendering.stroke_shape import StrokeShape, CAP_POINTS, MAX_STEPS, curve_controls
+
+
+@pytest.fixture
+def shape_fix() -> StrokeShape:
+    return StrokeShape()
+
+
+def make_width_line(points: typing.List[QPoint], widths: typing.List[float]) -> ColorLine:
+    color_line = ColorLine()
+    for point, width in zip(points, widths):
+        color_line.add_point(point, width)
+    return color_line
+
+
+class TestStrokeShape:
+
+    def test_curve_controls(self) -> None:
+        """
+        Controls follow the neighbours and ends are repeated
+        """
+        coords = array('i', [0, 0, 6, 0, 12, 6, 12, 12])
+        assert curve_controls(coords, 0) == (1, 0, 4, 0)
+        assert curve_controls(coords, 1) == (8, 1, 11, 4)
+        assert curve_controls(coords, 2) == (12, 8, 12, 11)
+
+    def test_curve_controls_bounded(self) -> None:
+        """
+        Turning points do not overshoot the line bounds
+        """
+        coords = array('i', [0, 0, 10, 10, 9, 0])
+        c1x, c1y, c2x, c2y = curve_controls(coords, 0)
+        assert (c1x, c1y) == (pytest.approx(10 / 6), pytest.approx(10 / 6))
+        c1x, c1y, c2x, c2y = curve_controls(coords, 1)
+        assert c1x == 10
+        assert c1y == pytest.approx(10)
+
+    def test_smooth_getter(self) -> None:
+        """
+
+        """
+        assert StrokeShape(smooth=True).smooth
+        assert not StrokeShape().smooth
+
+    def test_path(self, shape_fix: StrokeShape) -> None:
+        """
+        One cubic segment per pair of points through every point
+        """
+        color_line = ColorLine()
+        color_line.add_points([QPoint(0, 0), QPoint(6, 0), QPoint(12, 6), QPoint(12, 12)])
+        path = shape_fix.path(color_line)
+        assert shape_fix.num_points == 4
+        assert path.elementCount() == 1 + 3 * 3
+        assert path.pointAtPercent(0) == QPointF(0, 0)
+        assert path.pointAtPercent(1) == QPointF(12, 12)
+        assert path.elementAt(6).x == 12 and path.elementAt(6).y == 6
+        assert shape_fix.path(color_line) is path
+
+    def test_path_tail(self, shape_fix: StrokeShape) -> None:
+        """
+        Adding points only makes the last segment again
+        """
+        color_line = ColorLine()
+        color_line.add_points([QPoint(0, 0), QPoint(6, 0)])
+        shape_fix.path(color_line)
+        assert shape_fix._num_settled == 0
+        for point in [QPoint(12, 6), QPoint(12, 12), QPoint(20, 12)]:
+            color_line.add_point(point)
+            incremental_path = shape_fix.path(color_line)
+        assert shape_fix._num_settled == 3
+        with patch('src.server_side.backend.rendering.stroke_shape.curve_controls',
+                   wraps=curve_controls) as patch_controls:
+            color_line.add_point(QPoint(20, 20))
+            incremental_path = shape_fix.path(color_line)
+            # One settled segment and the tail
+            assert patch_controls.call_count == 2
+        assert incremental_path == StrokeShape().path(color_line)
+
+    def test_path_dot(self, shape_fix: StrokeShape) -> None:
+        """
+
+        """
+        color_line = ColorLine()
+        color_line.add_point(QPoint(5, 5))
+        assert shape_fix.path(color_line).elementCount() == 1
+
+    def test_outline(self, shape_fix: StrokeShape) -> None:
+        """
+        Every segment is offset by half the width of its ends
+        """
+        color_line = make_width_line([QPoint(0, 0), QPoint(10, 0), QPoint(10, 20)], [2.0, 4.0, 6.0])
+        outline = shape_fix.outline(color_line)
+        # Two points per segment per side and the caps
+        assert outline.size() == 8 + 2 * (CAP_POINTS - 1)
+        assert outline[0] == QPointF(0, 1)
+        assert outline[1] == QPointF(10, 2)
+        assert outline[2].x() == pytest.approx(8)
+        assert outline[3].x() == pytest.approx(7)
+        assert outline[3].y() == pytest.approx(20)
+        assert outline.boundingRect().left() == pytest.approx(-1)
+        assert outline.boundingRect().bottom() == pytest.approx(23)
+        assert outline.containsPoint(QPointF(5, 0), Qt.WindingFill)
+        assert outline.containsPoint(QPointF(10, 15), Qt.WindingFill)
+        assert not outline.containsPoint(QPointF(5, 5), Qt.WindingFill)
+        assert shape_fix.outline(color_line) is outline
+
+    def test_outline_dot(self, shape_fix: StrokeShape) -> None:
+        """
+
+        """
+        outline = shape_fix.outline(make_width_line([QPoint(5, 5)], [4.0]))
+        assert outline.size() == CAP_POINTS * 2
+        assert outline.boundingRect() == QPolygonF([QPointF(3, 3), QPointF(7, 7)]).boundingRect()
+
+    @pytest.mark.parametrize("smooth", [True, False])
+    def test_outline_tail(self, smooth: bool) -> None:
+        """
+        Outline made while adding points is the same as made at once
+        """
+        shape = StrokeShape(smooth)
+        points = [QPoint(0, 0), QPoint(30, 0), QPoint(30, 20), QPoint(5, 40), QPoint(50, 45)]
+        widths = [1.0, 2.0, 3.0, 4.0, 2.0]
+        color_line = ColorLine()
+        for point, width in zip(points, widths):
+            color_line.add_point(point, width)
+            incremental_outline = shape.outline(color_line)
+        assert shape._num_settled == (3 if smooth else 4)
+        assert incremental_outline == StrokeShape(smooth).outline(color_line)
+
+    def test_outline_smooth(self) -> None:
+        """
+        Long curved segments are split into steps
+        """
+        color_line = make_width_line([QPoint(0, 0), QPoint(50, 20), QPoint(100, 0)], [2.0, 2.0, 2.0])
+        outline = StrokeShape(smooth=True).outline(color_line)
+        assert outline.size() == 2 * 2 * 2 * MAX_STEPS + 2 * (CAP_POINTS - 1)
+        # Curve bulges away from the straight segment
+        assert StrokeShape().outline(color_line).containsPoint(QPointF(25, 10), Qt.WindingFill)
+        assert not outline.containsPoint(QPointF(25, 10), Qt.WindingFill)
+        assert outline.boundingRect().bottom() <= 21
+
+    def test_release(self, shape_fix: StrokeShape) -> None:
+        """
+        Finished shape is kept and made again if points are added
+        """
+        color_line = make_width_line([QPoint(0, 0), QPoint(10, 0), QPoint(10, 20)], [2.0, 4.0, 6.0])
+        outline = shape_fix.outline(color_line)
+        shape_fix.release()
+        assert shape_fix._left_side is None
+        assert shape_fix._right_side is None
+        assert shape_fix._settled_path is None
+        assert shape_fix.outline(color_line) is outline
+        color_line.add_point(QPoint(30, 20))
+        assert shape_fix.outline(color_line) == StrokeShape().outline(color_line)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,446 @@
+from unittest.mock import patch, MagicMock
+import pytest
+import typing
+from PyQt5.QtCore import QPoint, QRect, QRectF
+from PyQt5.QtGui import QColor, QImage
+from pytestqt.qtbot import QtBot
+
+from src.server_side.backend.lines.line import ColorLine
+from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.rendering.stroke_painter import BACKGROUND_COLOR, PEN_WIDTH
+from src.server_side.backend.rendering.tile_cache import TileCache, TileRenderTask, MAX_TILES, VIEW_TILES
+
+TEST_TILE_SIZE: int = 64
+
+
+@pytest.fixture
+def line_list_fix() -> LineList:
+    return LineList()
+
+
+@pytest.fixture
+def cache_fix(line_list_fix: LineList) -> typing.Iterator[TileCache]:
+    cache = TileCache(line_list_fix, TEST_TILE_SIZE, use_threads=False)
+    yield cache
+    cache.wait_for_done()
+
+
+def make_line(points: typing.List[QPoint], color: str = 'red') -> ColorLine:
+    color_line = ColorLine()
+    color_line.add_points(points)
+    color_line.color = QColor(color)
+    return color_line
+
+
+class TestTileCache:
+
+    def test_tile_rect(self, cache_fix: TileCache) -> None:
+        """
+
+        """
+        assert cache_fix.tile_rect((0, 0, 0)) == QRect(0, 0, 64, 64)
+        assert cache_fix.tile_rect((0, 2, 1)) == QRect(128, 64, 64, 64)
+        assert cache_fix.tile_rect((0, -1, 0)) == QRect(-64, 0, 64, 64)
+
+    @pytest.mark.parametrize("rect, keys", [(QRect(0, 0, 64, 64), [(0, 0, 0)]),
+                                            (QRect(10, 10, 64, 10), [(0, 0, 0), (0, 1, 0)]),
+                                            (QRect(60, 60, 10, 10), [(0, 0, 0), (0, 1, 0), (0, 0, 1), (0, 1, 1)])])
+    def test_tile_keys(self, cache_fix: TileCache, rect: QRect, keys: typing.List[typing.Tuple[int, int, int]]) -> None:
+        """
+
+        """
+        assert list(cache_fix.tile_keys(rect)) == keys
+
+    def test_lines_for_tile(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Lines just outside tile still touch it through pen width
+        """
+        inside = make_line([QPoint(10, 10), QPoint(20, 20)])
+        edge = make_line([QPoint(65, 10), QPoint(80, 10)])
+        outside = make_line([QPoint(100, 10), QPoint(120, 10)])
+        for color_line in (inside, edge, outside):
+            line_list_fix.add_line(color_line)
+        assert cache_fix.lines_for_tile((0, 0, 0)) == [inside, edge]
+
+    def test_invalidate(self, cache_fix: TileCache) -> None:
+        """
+        Only cached tiles are marked dirty and their generation bumped
+        """
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.invalidate(QRect(10, 10, 64, 10))
+        assert cache_fix.dirty == {(0, 0, 0)}
+        assert cache_fix._generations == {(0, 0, 0): 1}
+        cache_fix.invalidate(QRect(10, 10, 5, 5))
+        assert cache_fix._generations == {(0, 0, 0): 2}
+
+    def test_clear(self, cache_fix: TileCache) -> None:
+        """
+
+        """
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.invalidate(QRect(0, 0, 5, 5))
+        cache_fix.clear()
+        assert cache_fix.tiles == {}
+        assert cache_fix.dirty == set()
+        assert cache_fix._generations == {(0, 0, 0): 2}
+
+    def test_render_tile(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+
+        """
+        line_list_fix.add_line(make_line([QPoint(70, 10), QPoint(120, 10)]))
+        cache_fix.render_tile((0, 1, 0))
+        cache_fix.invalidate(QRect(70, 10, 1, 1))
+        cache_fix.render_tile((0, 1, 0))
+        image = cache_fix.tiles[(0, 1, 0)]
+        assert image.size() == QRect(0, 0, 64, 64).size()
+        assert image.pixelColor(20, 10) == QColor('red')
+        assert image.pixelColor(20, 30) == BACKGROUND_COLOR
+        assert cache_fix.dirty == set()
+
+    def test_render_tile_raster(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Flattened ink is rendered with lines
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 10)], 'blue'))
+        line_list_fix.flatten_lines(1)
+        line_list_fix.add_line(make_line([QPoint(30, 0), QPoint(30, 20)]))
+        cache_fix.render_tile((0, 0, 0))
+        assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == QColor('blue')
+        assert cache_fix.tiles[(0, 0, 0)].pixelColor(30, 10) == QColor('red')
+
+    @pytest.mark.parametrize("pending", [True, False])
+    def test_commit_line(self, cache_fix: TileCache, line_list_fix: LineList, pending: bool) -> None:
+        """
+        Line is painted into existing tiles unless tile is being rendered
+        """
+        cache_fix.render_tile((0, 0, 0))
+        if pending:
+            cache_fix._pending.add((0, 0, 0))
+        color_line = make_line([QPoint(10, 10), QPoint(100, 10)])
+        line_list_fix.add_line(color_line)
+        cache_fix.commit_line(color_line, QRect(8, 8, 94, 4))
+        # Tile (0, 1, 0) was never rendered so it is left for paint
+        assert (0, 1, 0) not in cache_fix.tiles
+        if pending:
+            assert cache_fix.dirty == {(0, 0, 0)}
+            assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == BACKGROUND_COLOR
+        else:
+            assert cache_fix.dirty == set()
+            assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == QColor('red')
+
+    @pytest.mark.parametrize("antialias", [True, False])
+    def test_render_tile_draft(self, cache_fix: TileCache, line_list_fix: LineList, antialias: bool) -> None:
+        """
+        Tiles rendered without antialiasing are drafts
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 30)]))
+        cache_fix.antialias = antialias
+        with patch('src.server_side.backend.rendering.tile_cache.StrokePainter.render_image',
+                   return_value=QImage(64, 64, QImage.Format_RGB32)) as patch_render:
+            cache_fix.render_tile((0, 0, 0))
+            assert patch_render.call_args[0][4] is antialias
+        assert cache_fix.drafts == (set() if antialias else {(0, 0, 0)})
+
+    @pytest.mark.parametrize("antialias", [True, False])
+    def test_commit_line_draft(self, cache_fix: TileCache, line_list_fix: LineList, antialias: bool) -> None:
+        """
+        Lines painted into tiles without antialiasing make them drafts
+        """
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.antialias = antialias
+        color_line = make_line([QPoint(10, 10), QPoint(50, 30)])
+        line_list_fix.add_line(color_line)
+        cache_fix.commit_line(color_line, QRect(8, 8, 44, 24))
+        assert cache_fix.drafts == (set() if antialias else {(0, 0, 0)})
+
+    def test_refine(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Draft tiles are marked dirty and rendered again smooth
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 30)]))
+        cache_fix.antialias = False
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.render_tile((0, 1, 0))
+        cache_fix.drafts.add((0, 5, 5))
+        generation = cache_fix._generations.get((0, 0, 0), 0)
+        cache_fix.antialias = True
+        with patch.object(cache_fix, 'tile_ready_signal') as patch_ready:
+            cache_fix.refine()
+            assert patch_ready.emit.call_count == 2
+        assert cache_fix.dirty == {(0, 0, 0), (0, 1, 0)}
+        assert cache_fix._generations[(0, 0, 0)] == generation + 1
+        for key in list(cache_fix.dirty):
+            cache_fix.render_tile(key)
+        assert cache_fix.drafts == set()
+        assert cache_fix.dirty == set()
+
+    def test_make_task(self, cache_fix: TileCache, line_list_fix: LineList, qtbot: QtBot) -> None:
+        """
+
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 10)]))
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.invalidate(QRect(10, 10, 1, 1))
+        with qtbot.waitSignal(cache_fix.tile_ready_signal, timeout=2000) as blocker:
+            task = cache_fix.make_task((0, 0, 0))
+            # Tiles being rendered do not get another task
+            assert cache_fix.make_task((0, 0, 0)) is None
+            cache_fix.thread_pool.start(task)
+        assert blocker.args == [QRect(0, 0, 64, 64)]
+        assert cache_fix.dirty == set()
+        assert cache_fix._pending == set()
+        assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == QColor('red')
+
+    def test_wait_for_done(self, cache_fix: TileCache) -> None:
+        """
+        Tiles are rendered on the cache's own pool
+        """
+        assert cache_fix.thread_pool.parent() is cache_fix
+        with patch.object(cache_fix.thread_pool, 'waitForDone') as patch_wait:
+            cache_fix.wait_for_done()
+            patch_wait.assert_called_once()
+
+    def test_task_run(self, cache_fix: TileCache) -> None:
+        """
+
+        """
+        color_line = make_line([QPoint(10, 10), QPoint(50, 10)])
+        chunk = QImage(64, 64, QImage.Format_ARGB32_Premultiplied)
+        chunk.fill(QColor('blue'))
+        task = TileRenderTask(cache_fix, (0, 0, 0), 3, QRect(0, 0, 64, 64), [color_line],
+                              [(QRect(0, 0, 64, 64), chunk)], False)
+        with patch.object(cache_fix, 'tile_rendered_slot') as patch_slot:
+            cache_fix.tile_rendered_signal.disconnect()
+            cache_fix.tile_rendered_signal.connect(patch_slot)
+            task.run()
+            patch_slot.assert_called_once()
+            key, generation, image, antialias = patch_slot.call_args[0]
+            assert (key, generation, antialias) == ((0, 0, 0), 3, False)
+            assert image.pixelColor(20, 10) == QColor('red')
+            assert image.pixelColor(20, 30) == QColor('blue')
+
+    @pytest.mark.parametrize("stale", [True, False])
+    def test_tile_rendered_slot(self, cache_fix: TileCache, stale: bool) -> None:
+        """
+        Results of tiles that changed while rendering are dropped
+        """
+        cache_fix.render_tile((0, 0, 0))
+        old_image = cache_fix.tiles[(0, 0, 0)]
+        cache_fix.invalidate(QRect(0, 0, 1, 1))
+        cache_fix._pending.add((0, 0, 0))
+        generation = cache_fix._generations[(0, 0, 0)] - (1 if stale else 0)
+        new_image = QImage(64, 64, QImage.Format_RGB32)
+        with patch.object(cache_fix, 'tile_ready_signal') as patch_ready:
+            cache_fix.tile_rendered_slot((0, 0, 0), generation, new_image, True)
+            patch_ready.emit.assert_called_once_with(QRect(0, 0, 64, 64))
+        assert cache_fix._pending == set()
+        if stale:
+            assert cache_fix.tiles[(0, 0, 0)] is old_image
+            assert cache_fix.dirty == {(0, 0, 0)}
+        else:
+            assert cache_fix.tiles[(0, 0, 0)] is new_image
+            assert cache_fix.dirty == set()
+
+    def test_tile_rendered_slot_cleared(self, cache_fix: TileCache) -> None:
+        """
+
+        """
+        with patch.object(cache_fix, 'tile_ready_signal') as patch_ready:
+            cache_fix.tile_rendered_slot((0, 0, 0), 0, QImage(64, 64, QImage.Format_RGB32), True)
+            patch_ready.emit.assert_not_called()
+        assert cache_fix.tiles == {}
+
+    @pytest.mark.parametrize("use_threads", [True, False])
+    def test_paint(self, cache_fix: TileCache, use_threads: bool) -> None:
+        """
+        Missing tiles without ink render now, dirty tiles render on thread if enabled
+        """
+        cache_fix._use_threads = use_threads
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.invalidate(QRect(0, 0, 1, 1))
+        painter = MagicMock()
+        rect = QRect(32, 0, 64, 10)
+        with patch.object(cache_fix, 'render_tile', wraps=cache_fix.render_tile) as patch_render:
+            with patch.object(cache_fix, 'make_task', wraps=cache_fix.make_task) as patch_task:
+                with patch.object(cache_fix.thread_pool, 'start') as patch_start:
+                    cache_fix.paint(painter, rect)
+                rendered = [call[0][0] for call in patch_render.call_args_list]
+                if use_threads:
+                    tasked = [call[0][0] for call in patch_task.call_args_list]
+                    assert tasked == [(0, 0, 0), (0, 1, 0)]
+                    # Empty missing tile is filled now, only the dirty tile is started
+                    patch_start.assert_called_once()
+                    assert rendered == []
+                else:
+                    patch_task.assert_not_called()
+                    assert rendered == [(0, 0, 0), (0, 1, 0)]
+        # Only exposed part of each tile is drawn
+        assert painter.drawImage.call_count == 2
+        target, image, source = painter.drawImage.call_args_list[1][0]
+        assert target == QRectF(64, 0, 32, 10)
+        assert image is cache_fix.tiles[(0, 1, 0)]
+        assert source == QRectF(0, 0, 32, 10)
+
+    def test_paint_missing(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Missing tiles with ink render on thread and a cached level is painted until then
+        """
+        cache_fix._use_threads = True
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 10)]))
+        cache_fix.render_tile((1, 0, 0))
+        painter = MagicMock()
+        rect = QRect(0, 0, 32, 32)
+        with patch.object(cache_fix, 'render_tile') as patch_render:
+            with patch.object(cache_fix.thread_pool, 'start') as patch_start:
+                cache_fix.paint(painter, rect)
+                patch_render.assert_not_called()
+                patch_start.assert_called_once()
+        assert cache_fix._pending == {(0, 0, 0)}
+        painter.drawImage.assert_called_once()
+        target, image, source = painter.drawImage.call_args[0]
+        assert target == QRectF(0, 0, 32, 32)
+        assert image is cache_fix.tiles[(1, 0, 0)]
+        assert source == QRectF(0, 0, 16, 16)
+        # No placeholder without a level covering the tile
+        cache_fix.clear()
+        painter = MagicMock()
+        with patch.object(cache_fix.thread_pool, 'start'):
+            cache_fix.paint(painter, rect)
+        painter.drawImage.assert_not_called()
+
+    def test_make_task_missing(self, cache_fix: TileCache, line_list_fix: LineList, qtbot: QtBot) -> None:
+        """
+        Results of missing tiles are kept unless the tile changed while rendering
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 10)]))
+        with qtbot.waitSignal(cache_fix.tile_ready_signal, timeout=2000):
+            cache_fix.thread_pool.start(cache_fix.make_task((0, 0, 0)))
+            assert cache_fix.cached_levels() == {0}
+            cache_fix.invalidate(QRect(10, 10, 1, 1))
+        assert (0, 0, 0) not in cache_fix.tiles
+        with qtbot.waitSignal(cache_fix.tile_ready_signal, timeout=2000):
+            cache_fix.thread_pool.start(cache_fix.make_task((0, 0, 0)))
+        assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == QColor('red')
+        assert cache_fix.dirty == set()
+
+    def test_make_task_empty(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Missing tiles without lines or flattened ink are filled now
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 10), QPoint(50, 10)]))
+        line_list_fix.flatten_lines(1)
+        assert cache_fix.make_task((0, 5, 5)) is None
+        assert cache_fix.tiles[(0, 5, 5)].pixelColor(0, 0) == BACKGROUND_COLOR
+        assert isinstance(cache_fix.make_task((0, 0, 0)), TileRenderTask)
+        assert (0, 0, 0) not in cache_fix.tiles
+        assert cache_fix._pending == {(0, 0, 0)}
+
+    def test_paint_level(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+        Zoomed out tiles cover more of the world at the same resolution
+        """
+        line_list_fix.add_line(make_line([QPoint(10, 100), QPoint(250, 100)]))
+        painter = MagicMock()
+        cache_fix.paint(painter, QRect(0, 0, 256, 256), 2)
+        assert list(cache_fix.tiles) == [(2, 0, 0)]
+        target, image, source = painter.drawImage.call_args_list[0][0]
+        assert target == QRectF(0, 0, 256, 256)
+        assert source == QRectF(0, 0, 64, 64)
+        assert image.size() == QRect(0, 0, 64, 64).size()
+        assert image.pixelColor(30, 25) == QColor('red')
+        assert image.pixelColor(30, 20) == BACKGROUND_COLOR
+
+    @pytest.mark.parametrize("level, cosmetic", [(-1, False), (0, False), (1, True)])
+    def test_stroke_painter(self, cache_fix: TileCache, level: int, cosmetic: bool) -> None:
+        """
+        Zoomed out tiles do not scale the pen down
+        """
+        pen = cache_fix.stroke_painter(level).get_pen(QColor('red').rgba())
+        assert pen.isCosmetic() == cosmetic
+
+    @pytest.mark.parametrize("level, size", [(-2, 16), (0, 64), (3, 512)])
+    def test_level_size(self, cache_fix: TileCache, level: int, size: int) -> None:
+        """
+
+        """
+        assert cache_fix.level_size(level) == size
+        assert cache_fix.tile_rect((level, 1, 1)) == QRect(size, size, size, size)
+
+    def test_invalidate_levels(self, cache_fix: TileCache) -> None:
+        """
+        Every cached level is invalidated
+        """
+        cache_fix.render_tile((0, 1, 0))
+        cache_fix.render_tile((1, 0, 0))
+        cache_fix.render_tile((-1, 3, 0))
+        cache_fix.invalidate(QRect(70, 10, 1, 1))
+        assert cache_fix.dirty == {(0, 1, 0), (1, 0, 0)}
+
+    def test_invalidate_margin(self, cache_fix: TileCache) -> None:
+        """
+        Wider zoomed out pens reach into the next tile
+        """
+        assert cache_fix.level_margin(-1) == PEN_WIDTH
+        assert cache_fix.level_margin(3) == PEN_WIDTH * 8
+        cache_fix.render_tile((0, 1, 0))
+        cache_fix.render_tile((2, 1, 0))
+        cache_fix.invalidate(QRect(250, 10, 4, 4))
+        assert cache_fix.dirty == {(2, 1, 0)}
+
+    def test_commit_line_levels(self, cache_fix: TileCache, line_list_fix: LineList) -> None:
+        """
+
+        """
+        cache_fix.render_tile((0, 0, 0))
+        cache_fix.render_tile((1, 0, 0))
+        color_line = make_line([QPoint(10, 10), QPoint(50, 10)])
+        line_list_fix.add_line(color_line)
+        cache_fix.commit_line(color_line, QRect(8, 8, 44, 4))
+        assert cache_fix.tiles[(0, 0, 0)].pixelColor(20, 10) == QColor('red')
+        assert cache_fix.tiles[(1, 0, 0)].pixelColor(10, 5) == QColor('red')
+
+    def test_evict(self, line_list_fix: LineList) -> None:
+        """
+        Least recently painted tiles are dropped first
+        """
+        cache = TileCache(line_list_fix, TEST_TILE_SIZE, use_threads=False, max_tiles=2)
+        painter = MagicMock()
+        cache.paint(painter, QRect(0, 0, 10, 10))
+        cache.paint(painter, QRect(64, 0, 10, 10))
+        cache.invalidate(QRect(64, 0, 1, 1))
+        cache.paint(painter, QRect(0, 0, 10, 10))
+        cache.paint(painter, QRect(128, 0, 10, 10))
+        assert list(cache.tiles) == [(0, 0, 0), (0, 2, 0)]
+        assert cache.dirty == set()
+
+    def test_fit_view(self, line_list_fix: LineList) -> None:
+        """
+        Max follows the tiles a view can show and extra tiles are dropped
+        """
+        cache = TileCache(line_list_fix, TEST_TILE_SIZE, use_threads=False)
+        assert cache.max_tiles == MAX_TILES
+        painter = MagicMock()
+        for x in range(0, 4 * TEST_TILE_SIZE, TEST_TILE_SIZE):
+            cache.paint(painter, QRect(x, 0, 10, 10))
+        cache.fit_view(TEST_TILE_SIZE, TEST_TILE_SIZE // 2)
+        # Three tiles across and two down at half size
+        assert cache.max_tiles == VIEW_TILES * 3 * 2
+        cache.fit_view(1, 1)
+        assert cache.max_tiles == VIEW_TILES * 2 * 2
+        assert list(cache.tiles) == [(0, 0, 0), (0, 1, 0), (0, 2, 0), (0, 3, 0)][-cache.max_tiles:]
+
+    def test_evict_draft(self, line_list_fix: LineList) -> None:
+        """
+
+        """
+        cache = TileCache(line_list_fix, TEST_TILE_SIZE, use_threads=False, max_tiles=1)
+        cache.antialias = False
+        painter = MagicMock()
+        cache.paint(painter, QRect(0, 0, 10, 10))
+        cache.paint(painter, QRect(64, 0, 10, 10))
+        assert cache.drafts == {(0, 1, 0)}
+
+
+if __name__ == "__main__":
+    pass
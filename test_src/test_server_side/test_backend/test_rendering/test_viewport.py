@@ -0,0 +1,84 @@
+import pytest
+from PyQt5.QtCore import QPoint, QPointF, QRect
+
+from src.server_side.backend.rendering.viewport import Viewport, MIN_ZOOM, MAX_ZOOM
+
+
+@pytest.fixture
+def viewport_fix() -> Viewport:
+    return Viewport()
+
+
+class TestViewport:
+
+    def test_to_world(self, viewport_fix: Viewport) -> None:
+        """
+
+        """
+        assert viewport_fix.to_world(QPoint(10, 20)) == QPoint(10, 20)
+        viewport_fix.pan(QPoint(-100, 50))
+        viewport_fix.zoom_at(QPointF(0, 0), 2.0)
+        assert viewport_fix.to_world(QPoint(10, 20)) == QPoint(105, -40)
+        assert viewport_fix.to_world(QPointF(12, 22)) == QPoint(106, -39)
+
+    def test_rects(self, viewport_fix: Viewport) -> None:
+        """
+        Mapped rects cover the whole source rect
+        """
+        viewport_fix.pan(QPoint(-100, 0))
+        viewport_fix.zoom_at(QPointF(0, 0), 0.5)
+        world_rect = viewport_fix.to_world_rect(QRect(0, 0, 50, 50))
+        assert world_rect == QRect(100, 0, 100, 100)
+        assert viewport_fix.to_widget_rect(world_rect) == QRect(0, 0, 50, 50)
+        assert viewport_fix.transform.map(QPointF(100, 0)) == QPointF(0, 0)
+
+    def test_pan(self, viewport_fix: Viewport) -> None:
+        """
+        Drag distance is in widget pixels
+        """
+        viewport_fix.zoom_at(QPointF(0, 0), 2.0)
+        viewport_fix.pan(QPoint(20, -10))
+        assert viewport_fix.origin == QPointF(-10, 5)
+
+    def test_zoom_at(self, viewport_fix: Viewport) -> None:
+        """
+        World point under zoom point stays fixed
+        """
+        point = QPointF(30, 40)
+        before = viewport_fix.to_world(point)
+        assert viewport_fix.zoom_at(point, 1.5)
+        assert viewport_fix.zoom == 1.5
+        assert viewport_fix.to_world(point) == before
+
+    @pytest.mark.parametrize("factor, zoom", [(1000.0, MAX_ZOOM), (0.0001, MIN_ZOOM)])
+    def test_zoom_limits(self, viewport_fix: Viewport, factor: float, zoom: float) -> None:
+        """
+
+        """
+        assert viewport_fix.zoom_at(QPointF(0, 0), factor)
+        assert viewport_fix.zoom == zoom
+        assert not viewport_fix.zoom_at(QPointF(0, 0), factor)
+
+    @pytest.mark.parametrize("zoom, level", [(MAX_ZOOM, -2), (1.5, -1), (1.0, 0), (0.75, 0), (0.3, 1),
+                                             (MIN_ZOOM, 6)])
+    def test_level(self, viewport_fix: Viewport, zoom: float, level: int) -> None:
+        """
+        Tiles are never scaled up
+        """
+        viewport_fix.zoom_at(QPointF(0, 0), zoom)
+        assert viewport_fix.level == level
+        assert 2.0 ** -level >= viewport_fix.zoom
+
+    def test_reset(self, viewport_fix: Viewport) -> None:
+        """
+
+        """
+        viewport_fix.pan(QPoint(5, 5))
+        viewport_fix.zoom_at(QPointF(0, 0), 2.0)
+        viewport_fix.reset()
+        assert viewport_fix.zoom == 1.0
+        assert viewport_fix.origin == QPointF(0, 0)
+
+
+if __name__ == "__main__":
+    pass
@@ -1,17 +1,25 @@
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 import pytest
 import typing
 import os
 from PyQt5 import QtCore
-from PyQt5.QtCore import QPoint, Qt, QLine, QRect
-from PyQt5.QtGui import QColor, QPixmap, QPainter
+from PyQt5.QtCore import QPoint, QPointF, Qt, QRect, QEvent
+from PyQt5.QtGui import QColor, QPainter, QImage, QMouseEvent, QWheelEvent, QTouchDevice
+from PyQt5.QtWidgets import QPinchGesture
 from pytestqt.qtbot import QtBot
 
-from src.server_side.backend.configs.drawing_surface_config import DARK_KEY
+from src.server_side.backend.configs.drawing_surface_config import DARK_KEY, COMPRESS_KEY, FLATTEN_LINES_KEY, \
+    FLATTEN_POINTS_KEY, VARIABLE_WIDTH_KEY, SMOOTH_KEY, REFINE_DELAY_KEY, PREDICT_KEY, EXPORT_IDLE_KEY, \
+    EXPORT_BYTES_KEY, EXPORT_PALETTE_KEY, EXPORT_SCALE_KEY, EXPORT_CROP_KEY, FLATTEN_BYTES_KEY, \
+    FRAME_RATE_KEY, MIN_MOVE_KEY
 from src.server_side.backend.lines.line import ColorLine
 from src.server_side.backend.lines.line_list import LineList
+from src.server_side.backend.lines.history import AddCommand, ClearCommand
+from src.server_side.backend.lines.point_filter import PointFilter
+from src.server_side.backend.lines.stroke_width import StrokeWidth, MAX_WIDTH
 from src.server_side.ui.drawing_surface import DrawingSurface
-from src.server_side.ui.drawing_surface import IMAGE_PATH, IMAGE_NAME
+from src.server_side.ui.drawing_surface import IMAGE_PATH, IMAGE_NAME, PEN_WIDTH, EXPORT_MARGIN
+from src.server_side.backend.rendering.viewport import ZOOM_STEP
 
 
 @pytest.fixture
@@ -34,6 +42,40 @@ def line_list_fix() -> LineList:
     return line_list
 
 
+def make_touch_event(event_type: QEvent.Type,
+                     touches: typing.List[typing.Tuple[int, Qt.TouchPointState, QPoint, QPoint]],
+                     timestamp: int = 0, pressure: typing.Optional[float] = None) -> MagicMock:
+    """
+    Touch points cannot be created from python so the event is mocked
+
+    Args:
+        event_type: One of the touch event types
+        touches: The id, state, position and last position of every touch point
+        timestamp: The event time in milliseconds
+        pressure: The pressure of every touch point, None if device has no pressure
+
+    Returns:
+         The mock touch event
+    """
+    touch_points = []
+    for touch_id, state, pos, last_pos in touches:
+        touch_point = MagicMock()
+        touch_point.id.return_value = touch_id
+        touch_point.state.return_value = state
+        touch_point.pos.return_value = QPointF(pos)
+        touch_point.lastPos.return_value = QPointF(last_pos)
+        touch_point.pressure.return_value = pressure
+        touch_points.append(touch_point)
+    event = MagicMock()
+    event.type.return_value = event_type
+    event.touchPoints.return_value = touch_points
+    event.timestamp.return_value = timestamp
+    event.device.return_value.capabilities.return_value = QTouchDevice.Position
+    if pressure is not None:
+        event.device.return_value.capabilities.return_value |= QTouchDevice.Pressure
+    return event
+
+
 class TestDrawingSurface:
 
     @pytest.mark.parametrize("button", [Qt.LeftButton, Qt.RightButton])
@@ -43,13 +85,450 @@ class TestDrawingSurface:
         """
         p = QPoint()
         with patch('PyQt5.QtGui.QMouseEvent.pos', return_value=p) as mock_pos:
-            qtbot.mousePress(ds, button)
-            if button == Qt.LeftButton:
-                assert p == ds._current_line.points[-1]
-                assert ds._current_line.color is ds._selected_color
+            with patch.object(ds._frame_scheduler, 'request') as patch_update:
+                qtbot.mousePress(ds, button)
+                if button == Qt.LeftButton:
+                    assert p == ds._current_line.points[-1]
+                    assert ds._current_line.color == ds._selected_color
+                    patch_update.assert_called_once_with(ds.dirty_rect(p, p))
+                else:
+                    # Right button pans
+                    assert ds._pan_point == p
+                    assert len(ds._current_line.points) == 0
+                    patch_update.assert_not_called()
+
+    def test_mouse_press_event_zoomed(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Points are stored in world coordinates
+        """
+        ds.viewport.pan(QPoint(-100, -50))
+        ds.viewport.zoom_at(QPoint(0, 0), 2.0)
+        qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(20, 40))
+        assert ds._current_line.points == [QPoint(110, 70)]
+        # Jitter is dropped by its size on screen
+        assert ds._point_filter.min_distance == pytest.approx(ds._config[MIN_MOVE_KEY] / 2.0)
+
+    @pytest.mark.parametrize(["zoom", "expected"], [(1.0, 1.5), (2.0, 0.75), (0.5, 3.0)])
+    def test_min_move_distance(self, ds: DrawingSurface, zoom: float, expected: float) -> None:
+        """
+
+        """
+        ds._config[MIN_MOVE_KEY] = 1.5
+        ds.viewport.zoom_at(QPoint(0, 0), zoom)
+        assert ds.min_move_distance() == pytest.approx(expected)
+
+    def test_touch_event_zoomed(self, ds: DrawingSurface) -> None:
+        """
+        Each finger filters jitter by its size on screen
+        """
+        ds.viewport.zoom_at(QPoint(0, 0), 0.5)
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(0, Qt.TouchPointPressed, QPoint(10, 10),
+                                                             QPoint(10, 10))]))
+        assert ds._touch_filters[0].min_distance == pytest.approx(ds._config[MIN_MOVE_KEY] * 2.0)
+
+    def test_pan_drag(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+
+        """
+        with patch.object(ds, 'pan_view') as patch_pan:
+            qtbot.mousePress(ds, Qt.RightButton, pos=QPoint(50, 50))
+            event = QMouseEvent(QEvent.MouseMove, QPointF(60, 45), Qt.NoButton, Qt.RightButton, Qt.NoModifier)
+            ds.mouseMoveEvent(event)
+            patch_pan.assert_called_once_with(QPoint(10, -5))
+            assert ds._pan_point == QPoint(60, 45)
+            assert ds._pending_points == []
+            qtbot.mouseRelease(ds, Qt.RightButton, pos=QPoint(60, 45))
+            assert ds._pan_point is None
+        assert len(ds._all_lines.line_list) == 0
+
+    def test_pan_view(self, ds: DrawingSurface) -> None:
+        """
+        Contents are scrolled instead of fully repainted
+        """
+        with patch.object(ds, 'scroll') as patch_scroll:
+            with patch.object(ds._frame_scheduler, 'translate') as patch_translate:
+                ds.pan_view(QPoint(0, 0))
+                patch_scroll.assert_not_called()
+                ds.pan_view(QPoint(10, -5))
+                patch_scroll.assert_called_once_with(10, -5)
+                # Waiting repaints move with the contents
+                patch_translate.assert_called_once_with(QPoint(10, -5))
+        assert ds.viewport.origin == QPointF(-10, 5)
+
+    @pytest.mark.parametrize("changed", [True, False])
+    def test_zoom_view(self, ds: DrawingSurface, changed: bool) -> None:
+        """
+
+        """
+        with patch.object(ds.viewport, 'zoom_at', return_value=changed) as patch_zoom:
+            with patch.object(ds._frame_scheduler, 'request') as patch_update:
+                ds.zoom_view(QPoint(5, 5), 2.0)
+                patch_zoom.assert_called_once_with(QPoint(5, 5), 2.0)
+                assert patch_update.called == changed
+
+    def test_close_event(self, ds: DrawingSurface) -> None:
+        """
+        Threads are waited for so the surface can be deleted
+        """
+        with patch.object(ds, 'wait_for_threads') as patch_wait:
+            ds.close()
+            patch_wait.assert_called_once()
+
+    def test_wait_for_threads(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        with patch.object(ds.export_renderer, 'wait_for_done') as patch_export:
+            with patch.object(ds._tile_cache, 'wait_for_done') as patch_tiles:
+                ds.wait_for_threads()
+                patch_export.assert_called_once()
+                patch_tiles.assert_called_once()
+
+    def test_resize_event(self, ds: DrawingSurface) -> None:
+        """
+        Tile cache keeps enough tiles for the new size
+        """
+        with patch.object(ds._tile_cache, 'fit_view') as patch_fit:
+            ds.resize(800, 600)
+            patch_fit.assert_called_with(800, 600)
+
+    @pytest.mark.parametrize("delta", [120, -240, 0])
+    def test_wheel_event(self, ds: DrawingSurface, delta: int) -> None:
+        """
+
+        """
+        event = QWheelEvent(QPointF(30, 40), QPointF(30, 40), QPoint(0, 0), QPoint(0, delta), Qt.NoButton,
+                            Qt.NoModifier, Qt.NoScrollPhase, False)
+        with patch.object(ds, 'zoom_view') as patch_zoom:
+            ds.wheelEvent(event)
+            if delta == 0:
+                patch_zoom.assert_not_called()
             else:
-                mock_pos.assert_not_called()
-                assert len(ds._current_line.points) == 0
+                patch_zoom.assert_called_once_with(QPoint(30, 40), ZOOM_STEP ** (delta / 120))
+
+    @pytest.mark.parametrize("flags", [QPinchGesture.ScaleFactorChanged, QPinchGesture.CenterPointChanged])
+    def test_gesture_event(self, ds: DrawingSurface, flags: QPinchGesture.ChangeFlags) -> None:
+        """
+        Pinch zooms and moving the pinch pans
+        """
+        pinch = MagicMock()
+        pinch.changeFlags.return_value = flags
+        pinch.centerPoint.return_value = QPointF(ds.mapToGlobal(QPoint(40, 40)))
+        pinch.lastCenterPoint.return_value = QPointF(ds.mapToGlobal(QPoint(30, 35)))
+        pinch.scaleFactor.return_value = 1.5
+        event = MagicMock()
+        event.gesture.return_value = pinch
+        with patch.object(ds, 'pan_view') as patch_pan:
+            with patch.object(ds, 'zoom_view') as patch_zoom:
+                assert ds.gesture_event(event)
+                if flags == QPinchGesture.ScaleFactorChanged:
+                    patch_zoom.assert_called_once_with(QPoint(40, 40), 1.5)
+                    patch_pan.assert_not_called()
+                else:
+                    patch_pan.assert_called_once_with(QPoint(10, 5))
+                    patch_zoom.assert_not_called()
+        event.accept.assert_called_once_with(pinch)
+        event.gesture.return_value = None
+        assert not ds.gesture_event(event)
+
+    def test_gesture_event_touch_drawing(self, ds: DrawingSurface) -> None:
+        """
+        Fingers that are writing do not zoom
+        """
+        pinch = MagicMock()
+        pinch.changeFlags.return_value = QPinchGesture.ScaleFactorChanged
+        event = MagicMock()
+        event.gesture.return_value = pinch
+        ds.start_touch_line(0, QPoint(10, 10))
+        with patch.object(ds, 'zoom_view') as patch_zoom:
+            assert ds.gesture_event(event)
+            patch_zoom.assert_not_called()
+        event.accept.assert_called_once_with(pinch)
+
+    @pytest.mark.parametrize(["event_type", "buttons", "drafting"],
+                             [(QEvent.MouseButtonPress, Qt.LeftButton, True), (QEvent.MouseMove, Qt.LeftButton, True),
+                              (QEvent.MouseMove, Qt.NoButton, False), (QEvent.Wheel, Qt.NoButton, True),
+                              (QEvent.TabletMove, Qt.NoButton, True), (QEvent.Paint, Qt.NoButton, False)])
+    def test_event_drafting(self, ds: DrawingSurface, event_type: QEvent.Type, buttons: Qt.MouseButtons,
+                            drafting: bool) -> None:
+        """
+        Input renders tiles fast, hovering does not
+        """
+        event = MagicMock()
+        event.type.return_value = event_type
+        event.buttons.return_value = buttons
+        with patch('PyQt5.QtWidgets.QFrame.event', return_value=True):
+            with patch.object(ds, 'start_drafting') as patch_drafting:
+                ds.event(event)
+                assert patch_drafting.called is drafting
+
+    def test_start_drafting(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Tiles are refined once input stops
+        """
+        ds._refine_timer.setInterval(10)
+        ds._flatten_timer.start()
+        ds.start_drafting()
+        assert not ds._tile_cache.antialias
+        assert ds._refine_timer.isActive()
+        assert not ds._flatten_timer.isActive()
+        with patch.object(ds._tile_cache, 'refine') as patch_refine:
+            qtbot.waitUntil(lambda: patch_refine.called)
+        assert ds._tile_cache.antialias
+
+    def test_refine_slot(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        ds._tile_cache.antialias = False
+        with patch.object(ds._tile_cache, 'refine') as patch_refine:
+            ds.refine_slot()
+            patch_refine.assert_called_once()
+        assert ds._tile_cache.antialias
+        assert not ds._flatten_timer.isActive()
+
+    def test_refine_slot_flatten(self, ds: DrawingSurface) -> None:
+        """
+        Flattening starts once idle if lines are over budget
+        """
+        ds._config[FLATTEN_LINES_KEY] = 0
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._all_lines.add_line(line)
+        with patch.object(ds._tile_cache, 'refine'):
+            ds.refine_slot()
+        assert ds._flatten_timer.isActive()
+
+    @pytest.mark.parametrize("event_type", [QEvent.TouchBegin, QEvent.TouchUpdate, QEvent.TouchEnd,
+                                            QEvent.TouchCancel])
+    def test_event_touch(self, ds: DrawingSurface, event_type: QEvent.Type) -> None:
+        """
+
+        """
+        event = make_touch_event(event_type, [])
+        with patch.object(ds, 'touch_event', return_value=True) as patch_touch:
+            assert ds.event(event)
+            patch_touch.assert_called_once_with(event)
+
+    def test_touch_event_fingers(self, ds: DrawingSurface) -> None:
+        """
+        Every finger draws and commits its own line
+        """
+        ds.selected_color = QColor('blue')
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(0, Qt.TouchPointPressed, QPoint(10, 10), QPoint(10, 10)),
+                                                            (1, Qt.TouchPointPressed, QPoint(200, 50), QPoint(200, 50))]))
+        assert ds._touch_lines[0].points == [QPoint(10, 10)]
+        assert ds._touch_lines[1].points == [QPoint(200, 50)]
+        assert ds._touch_lines[0].color == QColor('blue')
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            event = make_touch_event(QEvent.TouchUpdate, [(0, Qt.TouchPointMoved, QPoint(30, 10), QPoint(10, 10)),
+                                                          (1, Qt.TouchPointStationary, QPoint(200, 50),
+                                                           QPoint(200, 50))])
+            assert ds.touch_event(event)
+            event.accept.assert_called_once()
+            # Only the moved finger is repainted
+            patch_update.assert_called_once_with(ds.dirty_rect(QPoint(10, 10), QPoint(30, 10)))
+        assert ds._touch_lines[0].points == [QPoint(10, 10), QPoint(30, 10)]
+        with patch.object(ds, 'commit_line') as patch_commit:
+            ds.touch_event(make_touch_event(QEvent.TouchUpdate,
+                                            [(0, Qt.TouchPointReleased, QPoint(30, 10), QPoint(30, 10)),
+                                             (1, Qt.TouchPointMoved, QPoint(200, 80), QPoint(200, 50))]))
+            finished_line = ds._all_lines.line_list[-1]
+            patch_commit.assert_called_once_with(finished_line)
+        assert finished_line.points == [QPoint(10, 10), QPoint(30, 10)]
+        assert list(ds._touch_lines.keys()) == [1]
+        ds.touch_event(make_touch_event(QEvent.TouchEnd, [(1, Qt.TouchPointReleased, QPoint(230, 90),
+                                                           QPoint(200, 80))]))
+        assert ds._touch_lines == {}
+        assert ds._all_lines.line_list[-1].points == [QPoint(200, 50), QPoint(200, 80), QPoint(230, 90)]
+        # Each finger can be undone on its own
+        ds.undo_line_slot()
+        assert ds._all_lines.line_list == [finished_line]
+
+    @pytest.mark.parametrize("cancel", [True, False])
+    def test_touch_event_prediction(self, ds: DrawingSurface, cancel: bool) -> None:
+        """
+        Every finger has its own predictor, dropped with its line
+        """
+        ds._config[PREDICT_KEY] = 10
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(0, Qt.TouchPointPressed, QPoint(10, 10), QPoint(10, 10))],
+                                        timestamp=0))
+        ds.touch_event(make_touch_event(QEvent.TouchUpdate, [(0, Qt.TouchPointMoved, QPoint(30, 10), QPoint(10, 10)),
+                                                             (1, Qt.TouchPointPressed, QPoint(50, 50), QPoint(50, 50))],
+                                        timestamp=10))
+        predictor = ds._touch_predictors[0]
+        assert predictor.prediction == QPoint(50, 10)
+        assert ds._touch_predictors[1].prediction is None
+        if cancel:
+            ds.touch_event(make_touch_event(QEvent.TouchCancel, []))
+            assert ds._touch_predictors == {}
+        else:
+            ds.touch_event(make_touch_event(QEvent.TouchUpdate,
+                                            [(0, Qt.TouchPointReleased, QPoint(40, 10), QPoint(30, 10))],
+                                            timestamp=20))
+            assert list(ds._touch_predictors.keys()) == [1]
+            # Line ends at the real point, not the prediction
+            assert ds._all_lines.line_list[-1].points[-1] == QPoint(40, 10)
+        assert predictor.prediction is None
+
+    def test_touch_event_many_fingers(self, ds: DrawingSurface) -> None:
+        """
+        Ten fingers at once each repaint once per event
+        """
+        pressed = [(touch_id, Qt.TouchPointPressed, QPoint(10 + 30 * touch_id, 10), QPoint(10 + 30 * touch_id, 10))
+                   for touch_id in range(10)]
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, pressed))
+        moved = [(touch_id, Qt.TouchPointMoved, QPoint(10 + 30 * touch_id, 60), QPoint(10 + 30 * touch_id, 10))
+                 for touch_id in range(10)]
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            ds.touch_event(make_touch_event(QEvent.TouchUpdate, moved))
+            assert patch_update.call_count == 10
+        released = [(touch_id, Qt.TouchPointReleased, pos, pos) for touch_id, _, pos, _ in moved]
+        ds.touch_event(make_touch_event(QEvent.TouchEnd, released))
+        assert len(ds._all_lines.line_list) == 10
+        assert ds._touch_lines == {}
+
+    def test_touch_event_cancel(self, ds: DrawingSurface) -> None:
+        """
+        Cancelled lines are not committed
+        """
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(0, Qt.TouchPointPressed, QPoint(10, 10),
+                                                             QPoint(10, 10))]))
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            assert ds.touch_event(make_touch_event(QEvent.TouchCancel, []))
+            patch_update.assert_called_once_with(ds.dirty_rect(QPoint(10, 10), QPoint(10, 10)))
+        assert ds._touch_lines == {}
+        assert ds._all_lines.line_list == []
+
+    def test_touch_event_eraser(self, ds: DrawingSurface) -> None:
+        """
+        Every finger erases along its own path
+        """
+        ds.set_eraser_slot(True)
+        with patch.object(ds, 'erase_along') as patch_erase:
+            ds.touch_event(make_touch_event(QEvent.TouchUpdate,
+                                            [(0, Qt.TouchPointPressed, QPoint(10, 10), QPoint(10, 10)),
+                                             (1, Qt.TouchPointMoved, QPoint(100, 40), QPoint(100, 20))]))
+            assert [call[0][0] for call in patch_erase.call_args_list] == [[QPoint(10, 10)], [QPoint(100, 40)]]
+        line = ColorLine()
+        line.add_points([QPoint(90, 30), QPoint(110, 30)])
+        ds._history.execute(AddCommand([line]))
+        # Path between reports crosses the line
+        ds.touch_event(make_touch_event(QEvent.TouchUpdate, [(1, Qt.TouchPointMoved, QPoint(100, 60),
+                                                              QPoint(100, 0))]))
+        assert ds._all_lines.line_list == []
+        assert ds._touch_lines == {}
+
+    def test_touch_event_pressure(self, ds: DrawingSurface) -> None:
+        """
+        Finger width comes from pressure when the panel has it
+        and from speed otherwise
+        """
+        ds._config[VARIABLE_WIDTH_KEY] = True
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(0, Qt.TouchPointPressed, QPoint(10, 10),
+                                                             QPoint(10, 10))], pressure=0.0))
+        assert ds._touch_lines[0].widths == [1.0]
+        ds.touch_event(make_touch_event(QEvent.TouchUpdate, [(0, Qt.TouchPointMoved, QPoint(30, 10),
+                                                              QPoint(10, 10))], pressure=1.0))
+        assert ds._touch_lines[0].widths == [1.0, MAX_WIDTH]
+        ds.touch_event(make_touch_event(QEvent.TouchBegin, [(1, Qt.TouchPointPressed, QPoint(50, 50),
+                                                             QPoint(50, 50))], timestamp=100))
+        assert ds._touch_lines[1].widths == [MAX_WIDTH]
+        ds.touch_event(make_touch_event(QEvent.TouchUpdate, [(1, Qt.TouchPointMoved, QPoint(100, 50),
+                                                              QPoint(50, 50))], timestamp=110))
+        assert ds._touch_lines[1].widths[-1] < MAX_WIDTH
+        ds.touch_event(make_touch_event(QEvent.TouchEnd, [(0, Qt.TouchPointReleased, QPoint(30, 10), QPoint(30, 10)),
+                                                          (1, Qt.TouchPointReleased, QPoint(100, 50),
+                                                           QPoint(100, 50))]))
+        assert ds._touch_widths == {}
+
+    @pytest.mark.parametrize("event_type", [QEvent.TabletPress, QEvent.TabletRelease])
+    def test_tablet_event(self, ds: DrawingSurface, event_type: QEvent.Type) -> None:
+        """
+        Pressure is kept for the mouse event Qt makes from the tablet event
+        """
+        event = MagicMock()
+        event.type.return_value = event_type
+        event.pressure.return_value = 0.25
+        ds.tabletEvent(event)
+        event.ignore.assert_called_once()
+        assert ds._tablet_pressure == (None if event_type == QEvent.TabletRelease else 0.25)
+
+    @pytest.mark.parametrize("source", [Qt.MouseEventNotSynthesized, Qt.MouseEventSynthesizedByQt])
+    def test_mouse_width(self, ds: DrawingSurface, source: Qt.MouseEventSource) -> None:
+        """
+        Pressure is only used for mouse events made from tablet events
+        """
+        ds._tablet_pressure = 1.0
+        event = MagicMock()
+        event.source.return_value = source
+        event.localPos.return_value = QPointF(10, 20)
+        event.timestamp.return_value = 5
+        with patch.object(ds, 'input_width', return_value=3.0) as patch_width:
+            assert ds.mouse_width(event) == 3.0
+            pressure = 1.0 if source == Qt.MouseEventSynthesizedByQt else None
+            patch_width.assert_called_once_with(ds._stroke_width, QPointF(10, 20), 5, pressure)
+
+    @pytest.mark.parametrize("variable", [True, False])
+    def test_input_width(self, ds: DrawingSurface, variable: bool) -> None:
+        """
+
+        """
+        ds._config[VARIABLE_WIDTH_KEY] = variable
+        stroke_width = StrokeWidth()
+        if variable:
+            assert ds.input_width(stroke_width, QPointF(0, 0), 0, 1.0) == MAX_WIDTH
+            assert ds.input_width(stroke_width, QPointF(0, 0), 0, None) == MAX_WIDTH
+            assert ds.input_width(stroke_width, QPointF(100, 0), 10, None) < MAX_WIDTH
+        else:
+            assert ds.input_width(stroke_width, QPointF(0, 0), 0, 1.0) is None
+
+    @pytest.mark.parametrize("variable", [True, False])
+    def test_mouse_events_width(self, ds: DrawingSurface, qtbot: QtBot, variable: bool) -> None:
+        """
+        Mouse lines get one width per point
+        """
+        ds._config[VARIABLE_WIDTH_KEY] = variable
+        qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+        event = QMouseEvent(QEvent.MouseMove, QPointF(30, 15), Qt.NoButton, Qt.LeftButton, Qt.NoModifier)
+        ds.mouseMoveEvent(event)
+        ds.flush_pending_points()
+        assert ds._current_line.num_points == 2
+        assert len(ds._current_line.widths) == (2 if variable else 0)
+
+    def test_reset_view_slot(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        ds.viewport.zoom_at(QPoint(10, 10), 2.0)
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            ds.reset_view_slot()
+            patch_update.assert_called_once()
+        assert ds.viewport.zoom == 1.0
+        assert ds.viewport.origin == QPointF(0, 0)
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_mouse_press_event_dark(self, ds: DrawingSurface, qtbot: QtBot, dark: bool) -> None:
+        """
+        Line colors are stored as they look in light mode
+        """
+        ds._config[DARK_KEY] = dark
+        ds.selected_color = QColor('red')
+        qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+        expected = QColor('cyan') if dark else QColor('red')
+        assert ds._current_line.color == expected
+
+    @pytest.mark.parametrize("smooth", [True, False])
+    def test_set_line_style(self, ds: DrawingSurface, smooth: bool) -> None:
+        """
+        New lines follow the smoothing config
+        """
+        ds._config[SMOOTH_KEY] = smooth
+        color_line = ColorLine()
+        ds.set_line_style(color_line)
+        assert color_line.smooth == smooth
+        ds.start_touch_line(0, QPoint(10, 10))
+        assert ds._touch_lines[0].smooth == smooth
 
     @pytest.mark.parametrize("button", [Qt.LeftButton, Qt.RightButton])
     def test_mouse_release_event_1(self, ds: DrawingSurface, qtbot: QtBot, button: Qt.MouseButton) -> None:
@@ -59,14 +538,23 @@ class TestDrawingSurface:
         initial_num_lines = len(ds._all_lines.line_list)
         points = [QPoint(1, 1), QPoint(2, 2)]
         ds._current_line.add_points(points)
-        qtbot.mouseRelease(ds, button)
-        if button == Qt.LeftButton:
-            final_num_lines = len(ds._all_lines.line_list)
-            assert final_num_lines == initial_num_lines + 1
-            assert points == ds._all_lines.line_list[-1].points
-        else:
-            final_num_lines = len(ds._all_lines.line_list)
-            assert final_num_lines == initial_num_lines
+        current_line = ds._current_line
+        with patch.object(ds, 'commit_line') as patch_commit:
+            with patch.object(ColorLine, 'make_copy') as patch_copy:
+                qtbot.mouseRelease(ds, button)
+                patch_copy.assert_not_called()
+            if button == Qt.LeftButton:
+                final_num_lines = len(ds._all_lines.line_list)
+                assert final_num_lines == initial_num_lines + 1
+                assert points == ds._all_lines.line_list[-1].points
+                # Line is handed over without copying
+                assert ds._all_lines.line_list[-1] is current_line
+                assert ds._current_line is not current_line
+                patch_commit.assert_called_once_with(ds._all_lines.line_list[-1])
+            else:
+                final_num_lines = len(ds._all_lines.line_list)
+                assert final_num_lines == initial_num_lines
+                patch_commit.assert_not_called()
 
     @pytest.mark.parametrize("mock_points_list", [[QPoint(1, 1), QPoint(1, 2)], []])
     def test_mouse_release_event_2(self, ds: DrawingSurface, qtbot: QtBot, mock_points_list) -> None:
@@ -80,7 +568,7 @@ class TestDrawingSurface:
             final_num_lines = len(ds._all_lines.line_list)
             assert final_num_lines == initial_num_lines + 1
             assert mock_points_list == ds._all_lines.line_list[-1].points
-            assert len(ds._current_line.points) == 0
+            assert ds._current_line.num_points == 0
         else:
             with patch('src.server_side.ui.drawing_surface.DrawingSurface.handle_no_points_error') as mock_handle:
                 qtbot.mouseRelease(ds, Qt.LeftButton)
@@ -88,26 +576,234 @@ class TestDrawingSurface:
                 final_num_lines = len(ds._all_lines.line_list)
                 assert final_num_lines == initial_num_lines
 
-    @pytest.mark.parametrize("button", [Qt.LeftButton, Qt.RightButton])
-    def test_mouse_move_event(self, ds: DrawingSurface, qtbot: QtBot, button: Qt.MouseButton) -> None:
+    @pytest.mark.parametrize("buttons", [Qt.LeftButton, Qt.NoButton])
+    def test_mouse_move_event(self, ds: DrawingSurface, buttons: Qt.MouseButtons) -> None:
+        """
+        Moves are queued until flushed
+        """
+        event = QMouseEvent(QEvent.MouseMove, QPointF(30, 15), Qt.NoButton, buttons, Qt.NoModifier)
+        with patch.object(ds._input_timer, 'start') as patch_start:
+            ds.mouseMoveEvent(event)
+            ds.mouseMoveEvent(event)
+            if buttons == Qt.LeftButton:
+                assert ds._pending_points == [QPoint(30, 15), QPoint(30, 15)]
+                patch_start.assert_called()
+            else:
+                assert ds._pending_points == []
+                patch_start.assert_not_called()
+        assert ds._current_line.num_points == 0
+
+    def test_flush_pending_points(self, ds: DrawingSurface) -> None:
+        """
+        Duplicate and close points are dropped and one
+        update covers all new segments
+        """
+        ds._point_filter = PointFilter(min_distance=2.0)
+        ds._point_filter.accept(10, 10)
+        ds._current_line.add_point(QPoint(10, 10))
+        ds._pending_points = [QPoint(30, 15), QPoint(30, 15), QPoint(31, 15), QPoint(50, 40)]
+        ds._pending_widths = [None, None, None, None]
+        ds._pending_times = [8, 8, 12, 16]
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            with patch.object(ds, 'predict') as patch_predict:
+                ds.flush_pending_points()
+                assert ds._current_line.points == [QPoint(10, 10), QPoint(30, 15), QPoint(50, 40)]
+                assert ds._pending_points == []
+                assert ds._pending_widths == []
+                assert ds._pending_times == []
+                expected = ds.dirty_rect(QPoint(10, 10), QPoint(30, 15)).united(
+                    ds.dirty_rect(QPoint(30, 15), QPoint(50, 40)))
+                patch_update.assert_called_once_with(expected)
+                # Only points added to line are predicted from
+                assert [call[0][1:] for call in patch_predict.call_args_list] == [(QPoint(30, 15), 8),
+                                                                                   (QPoint(50, 40), 16)]
+                # Nothing queued, nothing to repaint
+                patch_update.reset_mock()
+                ds.flush_pending_points()
+                patch_update.assert_not_called()
+
+    def test_predict(self, ds: DrawingSurface) -> None:
+        """
+        Old and new extensions are repainted
         """
+        predictor = ds._predictor
+        predictor.predict_time = 10
+        ds.predict(predictor, QPoint(10, 10), 0)
+        assert predictor.prediction is None
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            ds.predict(predictor, QPoint(20, 10), 10)
+            assert predictor.prediction == QPoint(30, 10)
+            patch_update.assert_called_once_with(ds.dirty_rect(QPoint(20, 10), QPoint(30, 10)))
+            ds.predict(predictor, QPoint(30, 10), 20)
+            expected = ds.dirty_rect(QPoint(20, 10), QPoint(30, 10)).united(
+                ds.dirty_rect(QPoint(30, 10), QPoint(40, 10)))
+            patch_update.assert_called_with(expected)
+            patch_update.reset_mock()
+            ds.clear_prediction(predictor)
+            patch_update.assert_called_once_with(ds.dirty_rect(QPoint(30, 10), QPoint(40, 10)))
+        assert predictor.prediction is None
 
+    def test_paint_prediction(self, ds: DrawingSurface) -> None:
         """
-        pass
+        Extension is painted from the last point in the line style
+        """
+        color_line = ColorLine()
+        color_line.add_points([QPoint(10, 10), QPoint(20, 10)])
+        color_line.add_point(QPoint(30, 10), 3.0)
+        color_line.color = QColor('blue')
+        predictor = MagicMock()
+        predictor.anchor = QPoint(30, 10)
+        predictor.prediction = QPoint(40, 10)
+        painter = MagicMock()
+        with patch.object(ds, 'paint_line') as patch_paint:
+            ds.paint_prediction(color_line, predictor, painter, True)
+            extension, used_painter, invert = patch_paint.call_args[0]
+            assert extension.points == [QPoint(30, 10), QPoint(40, 10)]
+            assert extension.widths == [3.0, 3.0]
+            assert extension.color == QColor('blue')
+            assert (used_painter, invert) == (painter, True)
+            predictor.prediction = None
+            ds.paint_prediction(color_line, predictor, painter)
+            patch_paint.assert_called_once()
+        assert color_line.num_points == 3
 
-    def test_paint_event1(self, ds: DrawingSurface, qtbot: QtBot, line_list_fix: LineList) -> None:
+    def test_prediction_not_committed(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Predicted extension is dropped when the line is finished
+        """
+        ds._predictor.predict_time = 16
+        qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+        for x in range(20, 80, 10):
+            qtbot.mouseMove(ds, QPoint(x, 10))
+            qtbot.wait(5)
+        ds.flush_pending_points()
+        last_point = ds._current_line.points[-1]
+        qtbot.mouseRelease(ds, Qt.LeftButton, pos=last_point)
+        assert ds._predictor.prediction is None
+        assert ds._all_lines.line_list[-1].points[-1] == last_point
+
+    def test_eraser_mouse_events(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Eraser mode erases instead of drawing
+        """
+        ds.set_eraser_slot(True)
+        with patch.object(ds, 'erase_along') as patch_erase:
+            qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+            patch_erase.assert_called_once_with([QPoint(10, 10)])
+            ds._pending_points = [QPoint(20, 20)]
+            ds.flush_pending_points()
+            patch_erase.assert_called_with([QPoint(20, 20)])
+            assert ds._pending_points == []
+            with patch.object(ds, 'handle_no_points_error') as patch_handle:
+                qtbot.mouseRelease(ds, Qt.LeftButton, pos=QPoint(20, 20))
+                patch_handle.assert_not_called()
+        assert ds._current_line.num_points == 0
+        assert len(ds._all_lines.line_list) == 0
+        assert ds._last_erase_point is None
+
+    def test_recolor_mouse_events(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Recolor mode recolors instead of drawing
+        """
+        ds.set_recolor_slot(True)
+        with patch.object(ds, 'recolor_along') as patch_recolor:
+            qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+            patch_recolor.assert_called_once_with([QPoint(10, 10)])
+            ds._pending_points = [QPoint(20, 20)]
+            ds.flush_pending_points()
+            patch_recolor.assert_called_with([QPoint(20, 20)])
+            qtbot.mouseRelease(ds, Qt.LeftButton, pos=QPoint(20, 20))
+        assert ds._current_line.num_points == 0
+        assert len(ds._all_lines.line_list) == 0
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_stored_color(self, ds: DrawingSurface, dark: bool) -> None:
+        """
+
+        """
+        ds._config[DARK_KEY] = dark
+        ds._selected_color = QColor(255, 0, 0)
+        assert ds.stored_color() == (QColor(0, 255, 255) if dark else QColor(255, 0, 0))
+
+    def test_recolor_along(self, ds: DrawingSurface) -> None:
+        """
+        Lines crossed get the selected color, lines already
+        that color are left alone
+        """
+        crossed_line = ColorLine()
+        crossed_line.add_points([QPoint(100, 0), QPoint(100, 200)])
+        red_line = ColorLine()
+        red_line.color = QColor('red')
+        red_line.add_points([QPoint(120, 0), QPoint(120, 200)])
+        far_line = ColorLine()
+        far_line.add_points([QPoint(300, 0), QPoint(300, 200)])
+        for color_line in [crossed_line, red_line, far_line]:
+            ds._history.execute(AddCommand([color_line]))
+        ds._selected_color = QColor('red')
+        with patch.object(ds, 'recolor_lines') as patch_recolor:
+            ds.recolor_along([QPoint(50, 100), QPoint(150, 100)])
+            patch_recolor.assert_called_once_with([crossed_line], QColor('red'))
+
+    def test_erase_along(self, ds: DrawingSurface) -> None:
+        """
+        Lines crossed between samples are erased too
+        """
+        crossed_line = ColorLine()
+        crossed_line.add_points([QPoint(100, 0), QPoint(100, 200)])
+        far_line = ColorLine()
+        far_line.add_points([QPoint(300, 0), QPoint(300, 200)])
+        ds._all_lines.add_line(crossed_line)
+        ds._all_lines.add_line(far_line)
+        with patch.object(ds, 'invalidate_lines') as patch_invalidate:
+            ds.erase_along([QPoint(50, 100), QPoint(150, 100)])
+            patch_invalidate.assert_called_once_with([crossed_line])
+            assert ds._all_lines.line_list == [far_line]
+            assert ds._last_erase_point == QPoint(150, 100)
+            # Nothing hit
+            patch_invalidate.reset_mock()
+            ds.erase_along([QPoint(200, 100)])
+            patch_invalidate.assert_not_called()
+        # Erase can be undone
+        ds.undo_line_slot()
+        assert [id(color_line) for color_line in ds._all_lines.line_list] == [id(crossed_line), id(far_line)]
+
+    def test_mouse_move_flushed(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Queued moves are added once events are processed
+        """
+        qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(10, 10))
+        event = QMouseEvent(QEvent.MouseMove, QPointF(30, 15), Qt.NoButton, Qt.LeftButton, Qt.NoModifier)
+        ds.mouseMoveEvent(event)
+        qtbot.waitUntil(lambda: ds._current_line.num_points == 2)
+        assert ds._current_line.points[-1] == QPoint(30, 15)
+
+    def test_paint_event1(self, ds: DrawingSurface, qtbot: QtBot) -> None:
         """
         Test with points in line
         """
         ds._current_line.add_points([QPoint(1, 1), QPoint(2, 2)])
-        ds._all_lines = line_list_fix
-        num_old_lines = len(ds._all_lines.line_list)
-        total_lines = 1 + num_old_lines
         with patch.object(ds, 'paint_line') as patch_paint_line:
-            with patch('PyQt5.QtWidgets.QWidget.update') as patch_update:
-                ds.repaint()
-                assert patch_paint_line.call_count == total_lines
-                patch_update.assert_called_once()
+            with patch.object(ds._tile_cache, 'paint') as patch_tiles_paint:
+                with patch.object(ds._frame_scheduler, 'request') as patch_update:
+                    ds.repaint()
+                    # Previous lines come from cached tiles
+                    patch_tiles_paint.assert_called_once()
+                    assert patch_tiles_paint.call_args[0][1:] == (ds.rect(), 0)
+                    patch_paint_line.assert_called_once()
+                    assert patch_paint_line.call_args[0][0] is ds._current_line
+                    # Paint no longer schedules another paint
+                    patch_update.assert_not_called()
+
+    def test_paint_event_touch(self, ds: DrawingSurface) -> None:
+        """
+        Unfinished finger lines are painted over tiles
+        """
+        ds.start_touch_line(0, QPoint(10, 10))
+        ds.start_touch_line(1, QPoint(50, 50))
+        with patch.object(ds, 'paint_line') as patch_paint_line:
+            ds.repaint()
+            painted_lines = [call[0][0] for call in patch_paint_line.call_args_list]
+            assert painted_lines == [ds._current_line, ds._touch_lines[0], ds._touch_lines[1]]
 
     def test_paint_event2(self, ds: DrawingSurface, qtbot: QtBot, line_list_fix: LineList) -> None:
         """
@@ -116,52 +812,62 @@ class TestDrawingSurface:
         with patch.object(ds, 'paint_line') as patch_paint_line:
             patch_paint_line.side_effect = AssertionError
             with patch.object(ds, 'handle_no_points_error') as patch_handle:
-                with patch('PyQt5.QtWidgets.QWidget.update') as patch_update:
+                with patch.object(ds._frame_scheduler, 'request') as patch_update:
                     ds.repaint()
                     patch_handle.assert_called_once()
-                    patch_update.assert_called_once()
+                    patch_update.assert_not_called()
+
+    def test_commit_line(self, ds: DrawingSurface) -> None:
+        """
 
-    @pytest.mark.parametrize("test_points", [[], [QPoint(1, 1)], [QPoint(1, 1), QPoint(2, 2)]])
-    def test_paint_line(self, ds: DrawingSurface, qtbot: QtBot, line_list_fix: LineList,
-                        test_points: typing.List[QPoint]) -> None:
+        """
+        color_line = ColorLine()
+        color_line.add_points([QPoint(5, 5), QPoint(5, 20)])
+        with patch.object(ds._tile_cache, 'commit_line') as patch_commit:
+            ds.commit_line(color_line)
+            patch_commit.assert_called_once_with(color_line, ds.dirty_rect(QPoint(5, 5), QPoint(5, 20)))
+
+    def test_invalidate_region(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        rect = QRect(10, 10, 20, 20)
+        with patch.object(ds._tile_cache, 'invalidate') as patch_invalidate:
+            with patch.object(ds._frame_scheduler, 'request') as patch_update:
+                ds.invalidate_region(rect)
+                patch_invalidate.assert_called_once_with(rect)
+                patch_update.assert_called_once_with(rect)
+
+    def test_tile_ready_slot(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        rect = QRect(0, 0, 256, 256)
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            ds._tile_cache.tile_ready_signal.emit(rect)
+            patch_update.assert_called_once_with(rect)
+
+    def test_paint_line(self, ds: DrawingSurface) -> None:
         """
 
         """
         test_line = ColorLine()
-        test_line.add_points(test_points)
-        with patch('PyQt5.QtGui.QPainter.drawPoint') as patch_draw_point:
-            with patch.object(ds, 'line_generator') as patch_generator:
-                if len(test_line.points) == 2:
-                    patch_generator.return_value = [QLine(test_line.points[0], test_line.points[1])]
-                with patch('PyQt5.QtGui.QPainter.drawLine') as patch_draw_line:
-                    painter = QPainter(ds)
-                    ds.paint_line(test_line, painter)
-                    if len(test_line.points) == 0:
-                        patch_draw_point.assert_not_called()
-                        patch_draw_line.assert_not_called()
-                    elif len(test_line.points) == 1:
-                        patch_draw_point.assert_called_with(test_line.points[0])
-                    else:
-                        patch_generator.assert_called_once_with(test_line.points)
-                        patch_draw_line.assert_called_once_with(patch_generator.return_value[0])
-                    painter.end()
+        with patch.object(ds._stroke_painter, 'paint_line') as patch_paint_line:
+            painter = QPainter(ds)
+            ds.paint_line(test_line, painter)
+            patch_paint_line.assert_called_once_with(test_line, painter, False)
+            painter.end()
 
-    @pytest.mark.parametrize("points", [[QPoint(1, 1), QPoint(2, 2), QPoint(3, 3)], [QPoint()]])
-    def test_line_generator(self, points: typing.List[QPoint]) -> None:
+    @pytest.mark.parametrize(["start", "end"], [(QPoint(5, 5), QPoint(5, 5)), (QPoint(20, 10), QPoint(10, 30))])
+    def test_dirty_rect(self, start: QPoint, end: QPoint) -> None:
         """
 
         """
-        ds = DrawingSurface
-        if len(points) == 1:
-            with pytest.raises(AssertionError):
-                for _ in ds.line_generator(points):
-                    pass
-        else:
-            i = 0
-            for line in ds.line_generator(points):
-                assert isinstance(line, QtCore.QLine)
-                assert line == QLine(points[i], points[i + 1])
-                i += 1
+        rect = DrawingSurface.dirty_rect(start, end)
+        assert rect.contains(start)
+        assert rect.contains(end)
+        assert rect.left() == min(start.x(), end.x()) - PEN_WIDTH
+        assert rect.bottom() == max(start.y(), end.y()) + PEN_WIDTH
 
     @staticmethod
     def test_handle_no_points_error() -> None:
@@ -171,40 +877,112 @@ class TestDrawingSurface:
         ds = DrawingSurface
         ds.handle_no_points_error()
 
-    @pytest.mark.parametrize(['success', 'exists'], [(True, True), (False, False)])
-    def test_save_whiteboard_image(self, ds: DrawingSurface, success: bool, exists: bool) -> None:
-        """
-        success and exists are independent
-        """
-        with patch.object(ds, 'get_whiteboard_pixmap') as patch_get_pixmap:
-            with patch('PyQt5.QtGui.QPixmap.save') as patch_save_pixmap:
-                with patch('os.mkdir') as patch_mkdir:
-                    with patch('os.path.exists') as patch_exists:
-                        patch_exists.return_value = exists
-                        patch_get_pixmap.return_value = QPixmap()
-                        patch_save_pixmap.return_value = success
-                        got_pixmap = ds.save_whiteboard_image()
-                        if not patch_exists.return_value:
-                            patch_mkdir.assert_called_once_with(IMAGE_PATH)
-                        else:
-                            patch_mkdir.assert_not_called()
-                        save_path = os.path.join(IMAGE_PATH, IMAGE_NAME)
-                        assert '/static/' in save_path
-                        patch_save_pixmap.assert_called_once_with(save_path, "PNG")
-                        assert got_pixmap == success
-
-    def test_get_whiteboard_pixmap(self, ds: DrawingSurface) -> None:
-        """
-
-        """
-        with patch('PyQt5.QtWidgets.QFrame.rect') as patch_rect:
-            with patch('PyQt5.QtWidgets.QFrame.grab') as patch_grab:
-                patch_rect.return_value = QRect()
-                patch_grab.return_value = QPixmap()
-                pixmap = ds.get_whiteboard_pixmap()
-                patch_rect.assert_called_once()
-                patch_grab.assert_called_once_with(patch_rect.return_value)
-                assert pixmap == patch_grab.return_value
+    @pytest.mark.parametrize('exists', [True, False])
+    def test_save_whiteboard_image(self, ds: DrawingSurface, exists: bool) -> None:
+        """
+        Lines in view are exported at the view scale
+        """
+        ds.viewport.zoom_at(QPoint(0, 0), 2.0)
+        ds._config[EXPORT_SCALE_KEY] = 1.0
+        with patch.object(ds._export_renderer, 'export', return_value=5) as patch_export:
+            with patch('os.mkdir') as patch_mkdir:
+                with patch('os.path.exists') as patch_exists:
+                    patch_exists.return_value = exists
+                    assert ds.save_whiteboard_image() == 5
+                    if not patch_exists.return_value:
+                        patch_mkdir.assert_called_once_with(IMAGE_PATH)
+                    else:
+                        patch_mkdir.assert_not_called()
+                    save_path = os.path.join(IMAGE_PATH, IMAGE_NAME)
+                    assert '/static/' in save_path
+                    patch_export.assert_called_once_with(ds._all_lines, ds.viewport.to_world_rect(ds.rect()),
+                                                         2.0, ds._config[DARK_KEY], save_path)
+
+    def test_save_whiteboard_image_drawing(self, ds: DrawingSurface, qtbot: QtBot, tmp_path) -> None:
+        """
+        Drawing goes on while an image is saved
+        """
+        ds._config[EXPORT_SCALE_KEY] = 1.0
+        ds._config[EXPORT_CROP_KEY] = True
+        color_line = ColorLine()
+        color_line.add_points([QPoint(10, 10), QPoint(100, 10)])
+        ds._all_lines.add_line(color_line)
+        with patch('src.server_side.ui.drawing_surface.IMAGE_PATH', str(tmp_path)):
+            with qtbot.waitSignal(ds.export_renderer.export_finished_signal) as blocker:
+                export_id = ds.save_whiteboard_image()
+                qtbot.mousePress(ds, Qt.LeftButton, pos=QPoint(50, 50))
+                qtbot.mouseRelease(ds, Qt.LeftButton, pos=QPoint(50, 50))
+        assert blocker.args == [export_id, True]
+        assert len(ds._all_lines.line_list) == 2
+        # Cropped to the line and margin inside the view
+        assert QImage(str(tmp_path / IMAGE_NAME)).size() == QRect(QPoint(0, 0), QPoint(100 + EXPORT_MARGIN,
+                                                                                       10 + EXPORT_MARGIN)).size()
+
+    def test_prepare_export_slot(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Lines in view are encoded once painting stops
+        """
+        ds._export_timer.setInterval(10)
+        ds._config[EXPORT_SCALE_KEY] = 1.0
+        with patch.object(ds._export_renderer, 'prepare') as patch_prepare:
+            ds.repaint()
+            assert ds._export_timer.isActive()
+            qtbot.waitUntil(lambda: patch_prepare.called)
+            patch_prepare.assert_called_once_with(ds._all_lines, ds.viewport.to_world_rect(ds.rect()),
+                                                  ds.viewport.zoom, ds._config[DARK_KEY])
+
+    def test_export_view(self, ds: DrawingSurface) -> None:
+        """
+        Export scale sizes the image relative to the screen
+        """
+        ds.viewport.zoom_at(QPoint(0, 0), 2.0)
+        ds._config[EXPORT_SCALE_KEY] = 0.5
+        ds._config[EXPORT_CROP_KEY] = True
+        assert ds.export_view() == (ds.viewport.to_world_rect(ds.rect()), 1.0)
+
+    @pytest.mark.parametrize("crop", [True, False])
+    def test_export_view_crop(self, ds: DrawingSurface, crop: bool) -> None:
+        """
+        Ink in view is cropped with a margin in screen pixels
+        """
+        ds.viewport.zoom_at(QPoint(0, 0), 2.0)
+        ds._config[EXPORT_CROP_KEY] = crop
+        color_line = ColorLine()
+        color_line.add_points([QPoint(100, 100), QPoint(150, 120)])
+        ds._all_lines.add_line(color_line)
+        rect, _ = ds.export_view()
+        if crop:
+            margin = EXPORT_MARGIN // 2
+            assert rect == QRect(QPoint(100 - margin, 100 - margin), QPoint(150 + margin, 120 + margin))
+        else:
+            assert rect == ds.viewport.to_world_rect(ds.rect())
+
+    def test_export_view_out_of_view(self, ds: DrawingSurface) -> None:
+        """
+        Ink out of view is never sent
+        """
+        ds._config[EXPORT_CROP_KEY] = True
+        color_line = ColorLine()
+        color_line.add_points([QPoint(-50, 10), QPoint(30, 10)])
+        ds._all_lines.add_line(color_line)
+        far_line = ColorLine()
+        far_line.add_points([QPoint(-5000, -5000)])
+        ds._all_lines.add_line(far_line)
+        view_rect = ds.viewport.to_world_rect(ds.rect())
+        rect, _ = ds.export_view()
+        assert view_rect.contains(rect)
+
+    def test_save_unchanged(self, ds: DrawingSurface, qtbot: QtBot, tmp_path) -> None:
+        """
+        Saving an unchanged board does not encode again
+        """
+        with patch('src.server_side.ui.drawing_surface.IMAGE_PATH', str(tmp_path)):
+            ds.prepare_export_slot()
+            qtbot.waitUntil(lambda: len(ds.export_renderer.cache) == 1)
+            with patch.object(ds.export_renderer.thread_pool, 'start') as patch_start:
+                with qtbot.waitSignal(ds.export_renderer.export_finished_signal):
+                    ds.save_whiteboard_image()
+                patch_start.assert_not_called()
 
     @pytest.mark.parametrize('exists', [True, False])
     def test_delete_wb_image(self, ds: DrawingSurface, exists: bool) -> None:
@@ -228,36 +1006,258 @@ class TestDrawingSurface:
 
         """
         if isinstance(line, ColorLine):
-            ds._all_lines._line_list.append(line)
+            line = line.make_copy()
+            line.add_points([QPoint(10, 10), QPoint(40, 60)])
+            ds._history.execute(AddCommand([line]))
         orig_line_length = len(ds._all_lines._line_list)
-        with patch('PyQt5.QtWidgets.QWidget.update') as patch_update:
+        with patch.object(ds, 'invalidate_lines') as patch_invalidate:
             ds.undo_line_slot()
             new_line_length = len(ds._all_lines._line_list)
             if line:
                 # Line length will be 1
-                patch_update.assert_called_once()
+                patch_invalidate.assert_called_once_with([line])
                 assert new_line_length == orig_line_length - 1
             else:
-                patch_update.assert_not_called()
+                patch_invalidate.assert_not_called()
                 assert new_line_length == orig_line_length
 
+    @pytest.mark.parametrize("undone", [True, False])
+    def test_redo_line_slot(self, ds: DrawingSurface, undone: bool) -> None:
+        """
+
+        """
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._history.execute(AddCommand([line]))
+        if undone:
+            ds.undo_line_slot()
+        with patch.object(ds, 'invalidate_lines') as patch_invalidate:
+            ds.redo_line_slot()
+            if undone:
+                patch_invalidate.assert_called_once_with([line])
+            else:
+                patch_invalidate.assert_not_called()
+        assert ds._all_lines.line_list == [line]
+
+    def test_clear_slot(self, ds: DrawingSurface, line_list_fix: LineList) -> None:
+        """
+        Clear can be undone
+        """
+        with patch.object(ds, 'invalidate_lines') as patch_invalidate:
+            ds.clear_slot()
+            patch_invalidate.assert_not_called()
+            lines = list(line_list_fix.line_list)
+            ds._history.execute(AddCommand(lines))
+            ds.clear_slot()
+            patch_invalidate.assert_called_once_with(lines)
+        assert ds._all_lines.line_list == []
+        ds.undo_line_slot()
+        assert len(ds._all_lines.line_list) == len(lines)
+
+    def test_clear_slot_raster(self, ds: DrawingSurface) -> None:
+        """
+        Flattened ink is cleared and restored with the lines
+        """
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._all_lines.add_line(line)
+        ds._all_lines.flatten_lines(1)
+        with patch.object(ds, 'invalidate_region') as patch_region:
+            ds.clear_slot()
+            patch_region.assert_called_once_with(QRect(0, 0, 256, 256))
+        assert len(ds._all_lines.raster_layer) == 0
+        ds.undo_line_slot()
+        assert len(ds._all_lines.raster_layer) == 1
+
+    def test_flatten_old_lines(self, ds: DrawingSurface) -> None:
+        """
+        Only the oldest lines history no longer references are flattened
+        """
+        ds._config[FLATTEN_LINES_KEY] = 2
+        ds._config[FLATTEN_POINTS_KEY] = 1000
+        lines = []
+        for i in range(5):
+            line = ColorLine()
+            line.add_points([QPoint(10, 10 + 10 * i), QPoint(40, 10 + 10 * i)])
+            lines.append(line)
+        for line in lines[:2]:
+            ds._all_lines.add_line(line)
+        for line in lines[2:]:
+            ds._history.execute(AddCommand([line]))
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
+            assert ds.flatten_old_lines() == 2
+            patch_update.assert_not_called()
+        # 4 lines are needed to reach the target but only the first 2 are free
+        assert ds._all_lines.line_list == lines[2:]
+        assert len(ds._all_lines.raster_layer) == 1
+        ds._config[FLATTEN_LINES_KEY] = 10
+        ds._history.clear()
+        assert ds.flatten_old_lines() == 0
+        assert ds._all_lines.line_list == lines[2:]
+
+    def test_flatten_old_lines_bytes(self, ds: DrawingSurface) -> None:
+        """
+        Lines stay as points once flattened ink is over its memory budget
+        """
+        ds._config[FLATTEN_LINES_KEY] = 0
+        ds._config[FLATTEN_BYTES_KEY] = 0
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._all_lines.add_line(line)
+        assert ds.flatten_old_lines() == 0
+        assert ds._all_lines.line_list == [line]
+
+    @pytest.mark.parametrize("num_flattened", [0, 3])
+    def test_flatten_slot(self, ds: DrawingSurface, num_flattened: int) -> None:
+        """
+        Batches go on until there is nothing left to flatten
+        """
+        with patch.object(ds, 'flatten_old_lines', return_value=num_flattened) as patch_flatten:
+            ds.flatten_slot()
+            patch_flatten.assert_called_once()
+        assert ds._flatten_timer.isActive() == (num_flattened > 0)
+
+    def test_flatten_old_lines_referenced(self, ds: DrawingSurface) -> None:
+        """
+        Nothing is flattened while the oldest line can still be undone
+        """
+        ds._config[FLATTEN_LINES_KEY] = 1
+        lines = []
+        for i in range(3):
+            line = ColorLine()
+            line.add_points([QPoint(10, 10 * i), QPoint(40, 10 * i)])
+            lines.append(line)
+            ds._history.execute(AddCommand([line]))
+        ds.flatten_old_lines()
+        assert ds._all_lines.line_list == lines
+        assert len(ds._all_lines.raster_layer) == 0
+
+    def test_invalidate_command(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._all_lines.add_line(line)
+        ds._all_lines.flatten_lines(1)
+        command = ClearCommand(ds._all_lines)
+        with patch.object(ds, 'invalidate_lines') as patch_lines:
+            with patch.object(ds, 'invalidate_region') as patch_region:
+                ds.invalidate_command(command)
+                patch_lines.assert_called_once_with([])
+                patch_region.assert_called_once_with(QRect(0, 0, 256, 256))
+
+    def test_recolor_lines(self, ds: DrawingSurface) -> None:
+        """
+
+        """
+        line = ColorLine()
+        line.add_points([QPoint(10, 10), QPoint(40, 60)])
+        ds._history.execute(AddCommand([line]))
+        with patch.object(ds, 'invalidate_lines') as patch_invalidate:
+            ds.recolor_lines([line], QColor())
+            patch_invalidate.assert_not_called()
+            ds.recolor_lines([line], QColor('red'))
+            new_line = ds._all_lines.line_list[0]
+            patch_invalidate.assert_called_once_with([line, new_line])
+        assert new_line.color == QColor('red')
+        assert line.color == QColor('black')
+        ds.undo_line_slot()
+        assert ds._all_lines.line_list == [line]
+        assert ds._all_lines.line_list[0] is line
+
+    def test_invalidate_lines(self, ds: DrawingSurface) -> None:
+        """
+        Tiles are invalidated per line and one region is repainted
+        """
+        first_line = ColorLine()
+        first_line.add_points([QPoint(10, 10), QPoint(20, 20)])
+        second_line = ColorLine()
+        second_line.add_points([QPoint(300, 300)])
+        with patch.object(ds._tile_cache, 'invalidate') as patch_invalidate:
+            with patch.object(ds._frame_scheduler, 'request') as patch_update:
+                ds.invalidate_lines([])
+                patch_update.assert_not_called()
+                ds.invalidate_lines([first_line, second_line])
+                first_rect = ds.dirty_rect(QPoint(10, 10), QPoint(20, 20))
+                second_rect = ds.dirty_rect(QPoint(300, 300), QPoint(300, 300))
+                assert [call[0][0] for call in patch_invalidate.call_args_list] == [first_rect, second_rect]
+                patch_update.assert_called_once_with(first_rect.united(second_rect))
+
+    @pytest.mark.parametrize("checked", [True, False])
+    def test_set_recolor_slot(self, ds: DrawingSurface, checked: bool) -> None:
+        """
+
+        """
+        ds._last_erase_point = QPoint(1, 1)
+        ds.set_recolor_slot(checked)
+        assert ds._recolor_mode == checked
+        assert ds._last_erase_point is None
+
+    @pytest.mark.parametrize("checked", [True, False])
+    def test_set_eraser_slot(self, ds: DrawingSurface, checked: bool) -> None:
+        """
+
+        """
+        ds._last_erase_point = QPoint(1, 1)
+        ds.set_eraser_slot(checked)
+        assert ds._eraser_mode == checked
+        assert ds._last_erase_point is None
+
     @pytest.mark.parametrize("dark", [True, False])
     def test_toggle_dark_slot(self, ds: DrawingSurface, dark: bool) -> None:
         """
-
+        Stored line colors and cached tiles are untouched
         """
         ds._config[DARK_KEY] = dark
         new_color = "white" if dark else "black"
-        with patch.object(ds._all_lines, 'invert_lines_colors') as patch_invert:
-            with patch('PyQt5.QtWidgets.QFrame.update') as patch_update:
+        color_line = ColorLine()
+        color_line.add_point(QPoint(1, 1))
+        ds._all_lines.add_line(color_line)
+        orig_rgba = color_line.rgba
+        with patch.object(ds._tile_cache, 'invalidate') as patch_invalidate:
+            with patch.object(ds._frame_scheduler, 'request') as patch_update:
                 with patch('PyQt5.QtWidgets.QFrame.setStyleSheet') as patch_set:
                     orig_mode = ds._config[DARK_KEY]
                     ds.toggle_dark_slot()
-                    patch_invert.assert_called_once()
+                    patch_invalidate.assert_not_called()
                     patch_update.assert_called_once()
                     patch_set.assert_called_once_with(f"background-color: {new_color};")
                     new_mode = ds._config[DARK_KEY]
                     assert orig_mode != new_mode
+                    assert color_line.rgba == orig_rgba
+
+    @pytest.mark.parametrize("dark", [True, False])
+    def test_paint_event_dark(self, ds: DrawingSurface, qtbot: QtBot, dark: bool) -> None:
+        """
+        Dark mode is applied while blitting
+        """
+        ds._config[DARK_KEY] = dark
+        color_line = ColorLine()
+        color_line.add_points([QPoint(10, 50), QPoint(100, 50)])
+        ds._all_lines.add_line(color_line)
+        ds.commit_line(color_line)
+        image = ds.grab().toImage()
+        background = QColor('black') if dark else QColor('white')
+        line_color = QColor('white') if dark else QColor('black')
+        assert image.pixelColor(50, 20) == background
+        assert image.pixelColor(50, 50) == line_color
+
+    def test_paint_event_zoomed(self, ds: DrawingSurface, qtbot: QtBot) -> None:
+        """
+        Lines are painted through the viewport
+        """
+        color_line = ColorLine()
+        color_line.add_points([QPoint(10, 50), QPoint(100, 50)])
+        ds._all_lines.add_line(color_line)
+        ds.viewport.pan(QPoint(20, 0))
+        ds.viewport.zoom_at(QPoint(0, 0), 2.0)
+        ds.grab()
+        # Tiles with ink are rendered on threads
+        qtbot.waitUntil(lambda: len(ds._tile_cache._pending) == 0)
+        image = ds.grab().toImage()
+        assert image.pixelColor(100, 100) == QColor('black')
+        assert image.pixelColor(100, 50) == QColor('white')
 
     @pytest.mark.parametrize("dark", [True, False])
     def test_apply_config(self, ds: DrawingSurface, dark: bool) -> None:
@@ -265,12 +1265,27 @@ class TestDrawingSurface:
 
         """
         ds._config[DARK_KEY] = dark
+        ds._config[COMPRESS_KEY] = not dark
+        ds._config[REFINE_DELAY_KEY] = 123
+        ds._config[PREDICT_KEY] = 0
+        ds._config[EXPORT_IDLE_KEY] = 456
+        ds._config[EXPORT_BYTES_KEY] = 789
+        ds._config[EXPORT_PALETTE_KEY] = dark
+        ds._config[FRAME_RATE_KEY] = 0
         color = "black" if dark else "white"
-        with patch('PyQt5.QtWidgets.QFrame.update') as patch_update:
+        with patch.object(ds._frame_scheduler, 'request') as patch_update:
             with patch('PyQt5.QtWidgets.QFrame.setStyleSheet') as patch_set:
-                ds.apply_config()
-                patch_update.assert_called_once()
-                patch_set.assert_called_once_with(f"background-color: {color};")
+                with patch('PyQt5.QtWidgets.QApplication.setAttribute') as patch_attribute:
+                    ds.apply_config()
+                    patch_update.assert_called_once()
+                    patch_set.assert_called_once_with(f"background-color: {color};")
+                    patch_attribute.assert_called_once_with(Qt.AA_CompressHighFrequencyEvents, not dark)
+        assert ds._refine_timer.interval() == 123
+        assert ds._predictor.predict_time == 0
+        assert ds._export_timer.interval() == 456
+        assert ds.export_renderer.encoder.max_bytes == 789
+        assert ds.export_renderer.encoder.indexed is dark
+        assert ds._frame_scheduler.interval == 1000
 
     def test_save_config(self, ds: DrawingSurface) -> None:
         """
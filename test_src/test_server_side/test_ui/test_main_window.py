@@ -12,6 +12,8 @@ from src.server_side.ui.main_window import WhiteboardMW, IMAGE_PAGE
 @pytest.fixture
 def mw(qtbot: QtBot) -> WhiteboardMW:
     mw = WhiteboardMW()
+    # Closed so its threads are waited for, mw only sees the mock
+    qtbot.addWidget(mw._drawing_surface)
     mw._client_controller = MagicMock()
     mw._drawing_surface = MagicMock()
     mw._qr_widget = MagicMock()
@@ -34,6 +36,8 @@ class TestWhiteboardMW:
                     with patch.object(mw._drawing_surface, 'undo_line_slot') as patch_undo_line_slot:
                         with patch.object(mw._drawing_surface, 'toggle_dark_slot') as patch_toggle_dark_slot:
                             with patch.object(mw, 'show_qr_slot') as patch_qr_slot:
+                                patch_eraser_slot = mw._drawing_surface.set_eraser_slot
+                                patch_recolor_slot = mw._drawing_surface.set_recolor_slot
                                 mw.connect_signals()
                                 mw._drawing_toolbar._color_combobox.currentIndexChanged.emit(1)
                                 patch_update_color_slot.assert_called_once()
@@ -43,10 +47,34 @@ class TestWhiteboardMW:
                                 patch_dial_finish_slot.assert_called_once()
                                 mw._drawing_toolbar._undo_line_action.trigger()
                                 patch_undo_line_slot.assert_called_once()
+                                mw._drawing_toolbar.eraser_action.trigger()
+                                patch_eraser_slot.assert_called_once_with(True)
+                                mw._drawing_toolbar.recolor_action.trigger()
+                                patch_eraser_slot.assert_called_with(False)
+                                patch_recolor_slot.assert_called_once_with(True)
                                 mw._drawing_toolbar.dark_mode_action.trigger()
                                 patch_toggle_dark_slot.assert_called_once()
                                 mw._drawing_toolbar._show_qr_action.trigger()
                                 patch_qr_slot.assert_called_once()
+                                export_signal = mw._drawing_surface.export_renderer.export_finished_signal
+                                export_signal.connect.assert_called_once_with(mw.export_finished_slot)
+                                report_signal = mw._drawing_surface.export_renderer.export_report_signal
+                                report_signal.connect.assert_called_once_with(mw.export_report_slot)
+
+    def test_connect_history_signals(self, mw: WhiteboardMW) -> None:
+        """
+
+        """
+        with patch.object(mw._drawing_surface, 'redo_line_slot') as patch_redo_slot:
+            with patch.object(mw._drawing_surface, 'clear_slot') as patch_clear_slot:
+                with patch.object(mw._drawing_surface, 'reset_view_slot') as patch_reset_slot:
+                    mw.connect_signals()
+                    mw._drawing_toolbar.redo_line_action.trigger()
+                    patch_redo_slot.assert_called_once()
+                    mw._drawing_toolbar.clear_action.trigger()
+                    patch_clear_slot.assert_called_once()
+                    mw._drawing_toolbar.reset_view_action.trigger()
+                    patch_reset_slot.assert_called_once()
 
     def test_set_server(self, mw: WhiteboardMW) -> None:
         """
@@ -128,17 +156,36 @@ class TestWhiteboardMW:
     @pytest.mark.parametrize("save_success", [True, False])
     def test_send_whiteboard(self, mw: WhiteboardMW, save_success: bool) -> None:
         """
-
+        Image is sent once it has been saved
         """
         with patch.object(mw._drawing_surface, 'save_whiteboard_image') as patch_save:
             with patch.object(mw._server.twilio_client, 'send_to_all') as patch_send:
-                patch_save.return_value = save_success
+                patch_save.return_value = 7
                 mw.send_whiteboard(['111', '222'])
                 patch_save.assert_called_once()
-                if patch_save.return_value:
+                patch_send.assert_not_called()
+                assert mw._pending_sends == {7: ['111', '222']}
+                mw.export_finished_slot(7, save_success)
+                if save_success:
                     patch_send.assert_called_once_with(IMAGE_PAGE, ['111', '222'])
                 else:
                     patch_send.assert_not_called()
+                assert mw._pending_sends == {}
+
+    def test_export_finished_slot_unknown(self, mw: WhiteboardMW) -> None:
+        """
+        Exports not started by a send are ignored
+        """
+        with patch.object(mw._server.twilio_client, 'send_to_all') as patch_send:
+            mw.export_finished_slot(3, True)
+            patch_send.assert_not_called()
+
+    def test_export_report_slot(self, mw: WhiteboardMW) -> None:
+        """
+
+        """
+        mw.export_report_slot(3, 'Image is 12.0 KB, encoded in 5 ms')
+        assert mw.statusBar().currentMessage() == 'Image is 12.0 KB, encoded in 5 ms'
 
     def test_add_recipient_slot(self, mw: WhiteboardMW) -> None:
         """
@@ -156,20 +203,21 @@ class TestWhiteboardMW:
         """
 
         """
-        mw._server.ngrok_client._connected_already = connected_already
-        mw._server.ngrok_client._public_url = 'test_url'
-        with patch.object(mw._qr_widget, 'set_qr_code') as patch_set:
-            with patch.object(mw._qr_widget, 'show') as patch_show:
-                with patch.object(mw, 'show_message') as patch_show_message:
-                    mw.show_qr_slot()
-                    if connected_already:
-                        patch_set.assert_called_once()
-                        patch_show.assert_called_once()
-                        patch_show_message.assert_not_called()
-                    else:
-                        patch_set.assert_not_called()
-                        patch_show.assert_not_called()
-                        patch_show_message.assert_called_once()
+        # Restored so closing mw does not disconnect a real ngrok tunnel
+        with patch.object(mw._server.ngrok_client, '_connected_already', connected_already):
+            with patch.object(mw._server.ngrok_client, '_public_url', 'test_url'):
+                with patch.object(mw._qr_widget, 'set_qr_code') as patch_set:
+                    with patch.object(mw._qr_widget, 'show') as patch_show:
+                        with patch.object(mw, 'show_message') as patch_show_message:
+                            mw.show_qr_slot()
+                            if connected_already:
+                                patch_set.assert_called_once()
+                                patch_show.assert_called_once()
+                                patch_show_message.assert_not_called()
+                            else:
+                                patch_set.assert_not_called()
+                                patch_show.assert_not_called()
+                                patch_show_message.assert_called_once()
 
     def test_show_message(self, mw: WhiteboardMW, qtbot: QtBot) -> None:
         """
@@ -206,6 +254,7 @@ class TestWhiteboardMW:
                                 patch_stop_client.assert_called_once()
                                 patch_wait.assert_called_once()
                                 patch_close_sock.assert_called_once()
+                                mw._drawing_surface.wait_for_threads.assert_called_once()
                                 patch_delete.assert_called_once()
                                 patch_save.assert_called_once()
 
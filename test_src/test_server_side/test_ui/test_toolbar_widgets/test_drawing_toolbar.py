@@ -39,6 +39,34 @@ class TestDrawingToolBar:
                     patch_new.assert_called_once()
                     patch_set.assert_called_once_with(True)
 
+    @pytest.mark.parametrize("name", ['eraser', 'recolor'])
+    def test_make_brush_actions(self, tb_fix: DrawingToolBar, name: str) -> None:
+        """
+
+        """
+        with patch.object(tb_fix, f'load_{name}_icon') as patch_load:
+            with patch('PyQt5.QtWidgets.QAction.__new__') as patch_new:
+                with patch.object(patch_new.return_value, 'setIconVisibleInMenu') as patch_set:
+                    with patch.object(patch_new.return_value, 'setCheckable') as patch_checkable:
+                        _ = getattr(tb_fix, f'make_{name}_action')()
+                        patch_load.assert_called_once()
+                        patch_new.assert_called_once()
+                        patch_set.assert_called_once_with(True)
+                        patch_checkable.assert_called_once_with(True)
+
+    @pytest.mark.parametrize("name", ['redo', 'clear', 'reset_view'])
+    def test_make_button_actions(self, tb_fix: DrawingToolBar, name: str) -> None:
+        """
+
+        """
+        with patch.object(tb_fix, f'load_{name}_icon') as patch_load:
+            with patch('PyQt5.QtWidgets.QAction.__new__') as patch_new:
+                with patch.object(patch_new.return_value, 'setIconVisibleInMenu') as patch_set:
+                    _ = getattr(tb_fix, f'make_{name}_action')()
+                    patch_load.assert_called_once()
+                    patch_new.assert_called_once()
+                    patch_set.assert_called_once_with(True)
+
     def test_make_qr_action(self, tb_fix: DrawingToolBar) -> None:
         """
 
@@ -79,6 +107,24 @@ class TestDrawingToolBar:
             tb_fix.load_undo_icon()
             patch_new.assert_called_once()
 
+    @pytest.mark.parametrize("name", ['eraser', 'recolor'])
+    def test_load_brush_icons(self, tb_fix: DrawingToolBar, name: str) -> None:
+        """
+
+        """
+        with patch('PyQt5.QtGui.QIcon.__new__') as patch_new:
+            getattr(tb_fix, f'load_{name}_icon')()
+            patch_new.assert_called_once()
+
+    @pytest.mark.parametrize("name", ['redo', 'clear', 'reset_view'])
+    def test_load_button_icons(self, tb_fix: DrawingToolBar, name: str) -> None:
+        """
+
+        """
+        with patch('PyQt5.QtGui.QIcon.__new__') as patch_new:
+            getattr(tb_fix, f'load_{name}_icon')()
+            patch_new.assert_called_once()
+
     def test_load_qr_icon(self, tb_fix: DrawingToolBar) -> None:
         """
 
@@ -116,6 +162,55 @@ class TestDrawingToolBar:
         assert tb_fix._undo_line_action is tb_fix.undo_line_action
         assert isinstance(tb_fix.undo_line_action, QAction)
 
+    def test_eraser_action_getter(self, tb_fix: DrawingToolBar) -> None:
+        """
+
+        """
+        assert tb_fix._eraser_action is tb_fix.eraser_action
+        assert isinstance(tb_fix.eraser_action, QAction)
+        assert tb_fix.eraser_action.isCheckable()
+
+    def test_recolor_action_getter(self, tb_fix: DrawingToolBar) -> None:
+        """
+
+        """
+        assert tb_fix._recolor_action is tb_fix.recolor_action
+        assert isinstance(tb_fix.recolor_action, QAction)
+        assert tb_fix.recolor_action.isCheckable()
+
+    def test_reset_view_action_getter(self, tb_fix: DrawingToolBar) -> None:
+        """
+
+        """
+        assert tb_fix._reset_view_action is tb_fix.reset_view_action
+        assert isinstance(tb_fix.reset_view_action, QAction)
+        assert not tb_fix.reset_view_action.isCheckable()
+
+    def test_brush_actions_exclusive(self, tb_fix: DrawingToolBar) -> None:
+        """
+        Checking one brush unchecks the other and both can be off
+        """
+        tb_fix.eraser_action.trigger()
+        tb_fix.recolor_action.trigger()
+        assert not tb_fix.eraser_action.isChecked()
+        assert tb_fix.recolor_action.isChecked()
+        tb_fix.recolor_action.trigger()
+        assert not tb_fix.recolor_action.isChecked()
+
+    def test_redo_line_action_getter(self, tb_fix: DrawingToolBar) -> None:
+        """
+
+        """
+        assert tb_fix._redo_line_action is tb_fix.redo_line_action
+        assert isinstance(tb_fix.redo_line_action, QAction)
+
+    def test_clear_action_getter(self, tb_fix: DrawingToolBar) -> None:
+        """
+
+        """
+        assert tb_fix._clear_action is tb_fix.clear_action
+        assert isinstance(tb_fix.clear_action, QAction)
+
     def test_show_qr_action_getter(self, tb_fix: DrawingToolBar) -> None:
         """
 